@@ -13,18 +13,48 @@ try:
 except ImportError as e:
     failed_modules.append(('utils', str(e)))
 
+try:
+    from GraphReasoning.text_store import *
+    available_modules.append('text_store')
+except ImportError as e:
+    failed_modules.append(('text_store', str(e)))
+
+try:
+    from GraphReasoning.graph_snapshot import *
+    available_modules.append('graph_snapshot')
+except ImportError as e:
+    failed_modules.append(('graph_snapshot', str(e)))
+
 try:
     from GraphReasoning.graph_tools import *
     available_modules.append('graph_tools')
 except ImportError as e:
     failed_modules.append(('graph_tools', str(e)))
 
+try:
+    from GraphReasoning.embedding_cache import *
+    available_modules.append('embedding_cache')
+except ImportError as e:
+    failed_modules.append(('embedding_cache', str(e)))
+
+try:
+    from GraphReasoning.embedding_index import *
+    available_modules.append('embedding_index')
+except ImportError as e:
+    failed_modules.append(('embedding_index', str(e)))
+
 try:
     from GraphReasoning.graph_analysis import *
     available_modules.append('graph_analysis')
 except ImportError as e:
     failed_modules.append(('graph_analysis', str(e)))
 
+try:
+    from GraphReasoning.llm_cache import *
+    available_modules.append('llm_cache')
+except ImportError as e:
+    failed_modules.append(('llm_cache', str(e)))
+
 try:
     from GraphReasoning.graph_generation import *
     available_modules.append('graph_generation')
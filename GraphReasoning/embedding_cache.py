@@ -0,0 +1,115 @@
+import time
+import hashlib
+
+import numpy as np
+
+from GraphReasoning.sqlite_store import SQLiteCache
+
+# Persistent, content-addressed cache for text embeddings.
+#
+# Entries are keyed on sha256(model name, tokenizer name, text), stored as float32 blobs
+# in a single SQLite file and evicted least-recently-used once max_entries is exceeded.
+# Node strings that were embedded once (in any run, for any graph) are then read back
+# instead of running the transformer again:
+#
+#   cache = EmbeddingCache('./embedding_cache.sqlite', max_entries=1_000_000)
+#   set_embedding_cache(cache)        # used by every embed_texts call from now on
+#   ...
+#   print(cache.stats())
+
+def embedding_model_key(tokenizer, model):
+    """
+    Identify an embedding model and its tokenizer by name, e.g. for use in cache keys.
+    """
+    model_name = getattr(model, 'name_or_path', None)
+    if not model_name:
+        config = getattr(model, 'config', None)
+        model_name = getattr(config, '_name_or_path', None) or type(model).__name__
+    tokenizer_name = getattr(tokenizer, 'name_or_path', None) or type(tokenizer).__name__
+    return str(model_name), str(tokenizer_name)
+
+class EmbeddingCache(SQLiteCache):
+    """
+    Disk-backed LRU cache of text embeddings in SQLite.
+
+    Parameters:
+    - path (str): SQLite file. Use ':memory:' for a cache that only lives in this process.
+    - max_entries (int or None): Maximum number of cached vectors, None for no limit.
+    - enabled (bool): If False, lookups always miss and nothing is written.
+
+    Attributes:
+    - hits, misses (int): Lookup counters since creation or the last reset_stats().
+    """
+
+    table = 'embeddings'
+
+    def __init__(self, path='./embedding_cache.sqlite', max_entries=1000000, enabled=True):
+        super().__init__(path, ["CREATE TABLE IF NOT EXISTS embeddings ("
+                                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)",
+                                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"],
+                         max_entries=max_entries, enabled=enabled)
+
+    @staticmethod
+    def make_key(model_name, tokenizer_name, text):
+        return hashlib.sha256(f"{model_name}\0{tokenizer_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts, model_name, tokenizer_name):
+        """
+        Look up embeddings for a list of texts.
+
+        Returns:
+        - dict {position in texts: np.ndarray of shape (d,)} for the texts found in the cache.
+        """
+        if not self.enabled:
+            self.misses += len(texts)
+            return {}
+
+        keys = [self.make_key(model_name, tokenizer_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            found.update(self._select_in("SELECT key, vector FROM embeddings WHERE key IN ({})", keys))
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+
+        result = {}
+        for position, key in enumerate(keys):
+            if key in found:
+                result[position] = np.frombuffer(found[key], dtype=np.float32)
+        self.hits += len(result)
+        self.misses += len(keys) - len(result)
+        return result
+
+    def put_many(self, texts, vectors, model_name, tokenizer_name):
+        """
+        Store embeddings for a list of texts, then evict the least recently used entries
+        if the cache grew beyond max_entries. Of a batch larger than max_entries, only the
+        last max_entries texts are stored.
+        """
+        if not self.enabled or len(texts) == 0:
+            return
+        rows = self._limit_batch([(self.make_key(model_name, tokenizer_name, text),
+                                   np.asarray(vector, dtype=np.float32).tobytes())
+                                  for text, vector in zip(texts, vectors)])
+        with self._lock:
+            now = self._write_time()
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                                   [(key, vector, now) for key, vector in rows])
+            self._evict()
+            self._conn.commit()
+
+# Cache used by embed_texts when no cache is passed explicitly
+_default_embedding_cache = None
+
+def set_embedding_cache(cache):
+    """
+    Set (or with None, unset) the embedding cache used by all embedding calls.
+    """
+    global _default_embedding_cache
+    _default_embedding_cache = cache
+    return cache
+
+def get_embedding_cache():
+    return _default_embedding_cache
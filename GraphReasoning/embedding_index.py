@@ -0,0 +1,412 @@
+import json
+import numpy as np
+import time
+
+from tqdm import tqdm
+
+# Approximate nearest-neighbour (ANN) index for keyword-to-node matching.
+#
+# IVFIndex is a pure-NumPy inverted-file index: node vectors are L2-normalized and
+# assigned to the closest of n_lists k-means centroids (spherical k-means, i.e. cosine
+# similarity). A query only scores the vectors in its n_probe closest lists, so a lookup
+# costs O(n_lists + n_probe * N / n_lists) instead of O(N).
+#
+# The index can be used as a drop-in backend for find_best_fitting_node_list, e.g.
+#
+#   index = IVFIndex().build(node_embeddings)
+#   find_best_fitting_node_list(keyword, node_embeddings, tokenizer, model, 5, index=index)
+
+def _normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def _embeddings_to_matrix(embeddings):
+    """
+    Convert an embeddings dict {node: array} into (list of node ids, (N, d) float32 matrix).
+    """
+    node_ids = list(embeddings.keys())
+    if len(node_ids) == 0:
+        return node_ids, np.zeros((0, 0), dtype=np.float32)
+    if hasattr(embeddings, 'matrix'):
+        # Embedding stores already hold one contiguous matrix
+        return node_ids, np.asarray(embeddings.matrix, dtype=np.float32)
+    matrix = np.vstack([np.asarray(embeddings[node], dtype=np.float32).reshape(1, -1) for node in node_ids])
+    return node_ids, matrix
+
+def _top_k(similarities, k):
+    """
+    Indices of the k largest similarities, sorted in descending order.
+    """
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(similarities):
+        top = np.argpartition(-similarities, k - 1)[:k]
+    else:
+        top = np.arange(len(similarities))
+    return top[np.argsort(-similarities[top], kind='stable')]
+
+def spherical_kmeans(vectors, n_clusters, n_iter=20, seed=0, chunk_size=65536, verbatim=False):
+    """
+    k-means on the unit sphere (cosine similarity) in pure NumPy.
+
+    Args:
+    - vectors (np.ndarray): (N, d) L2-normalized vectors.
+    - n_clusters (int): Number of centroids.
+    - n_iter (int): Number of Lloyd iterations.
+    - seed (int): Random seed for the centroid initialization.
+    - chunk_size (int): Rows assigned per block, bounds memory to chunk_size x n_clusters.
+
+    Returns:
+    - centroids (np.ndarray of shape (n_clusters, d)), assignments (np.ndarray of shape (N,)).
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, min(n_clusters, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    iterations = range(n_iter)
+    if verbatim:
+        iterations = tqdm(iterations, desc="k-means")
+
+    for _ in iterations:
+        assignments = assign_to_centroids(vectors, centroids, chunk_size=chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Re-seed empty clusters with random vectors so that no list stays unused
+        empty = np.where(counts == 0)[0]
+        if len(empty) > 0:
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = _normalize_rows(sums)
+
+    assignments = assign_to_centroids(vectors, centroids, chunk_size=chunk_size)
+    return centroids, assignments
+
+def assign_to_centroids(vectors, centroids, chunk_size=65536):
+    """
+    Index of the most similar centroid for every row of vectors, computed in row blocks.
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over node embeddings with build, save/load and
+    incremental insert/delete.
+
+    Parameters:
+    - n_lists (int or None): Number of inverted lists (k-means centroids). Defaults to about sqrt(N).
+    - n_probe (int): Number of lists scanned per query. Higher is more accurate and slower.
+    - n_iter (int): k-means iterations used by build.
+    - train_size (int or None): Number of vectors the centroids are trained on. Defaults to 256 per list.
+    - seed (int): Random seed.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=20, train_size=None, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = None
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.node_ids = []
+        self.assignments = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.node_to_row = {}
+        self._lists = []
+
+    def __len__(self):
+        return len(self.node_to_row)
+
+    def __contains__(self, node):
+        return node in self.node_to_row
+
+    def build(self, embeddings, verbatim=False):
+        """
+        Train the coarse quantizer and index all vectors of an embeddings dict {node: array}.
+        Returns the index itself.
+        """
+        node_ids, matrix = _embeddings_to_matrix(embeddings)
+        if len(node_ids) == 0:
+            raise ValueError("Cannot build an index from empty embeddings.")
+        vectors = _normalize_rows(matrix)
+
+        n_lists = self.n_lists or int(np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        train_size = self.train_size or 256 * n_lists
+
+        rng = np.random.default_rng(self.seed)
+        if train_size < len(vectors):
+            train = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        else:
+            train = vectors
+
+        start_time = time.time()
+        self.centroids, _ = spherical_kmeans(train, n_lists, n_iter=self.n_iter, seed=self.seed, verbatim=verbatim)
+        self.n_lists = len(self.centroids)
+
+        self.vectors = vectors
+        self.node_ids = node_ids
+        self.assignments = assign_to_centroids(vectors, self.centroids)
+        self.alive = np.ones(len(vectors), dtype=bool)
+        self.node_to_row = {node: row for row, node in enumerate(node_ids)}
+        self._rebuild_lists()
+
+        if verbatim:
+            print(f"Built IVF index with {len(self)} vectors in {self.n_lists} lists in {time.time() - start_time:.2f} s")
+        return self
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignments, kind='stable')
+        bounds = np.searchsorted(self.assignments[order], np.arange(self.n_lists + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+
+    def add(self, embeddings):
+        """
+        Insert (or replace) the vectors of an embeddings dict {node: array}. The centroids
+        are kept fixed, so call build again if the data distribution drifts a lot.
+        """
+        if self.centroids is None:
+            return self.build(embeddings)
+
+        node_ids, matrix = _embeddings_to_matrix(embeddings)
+        if len(node_ids) == 0:
+            return self
+        self.remove([node for node in node_ids if node in self.node_to_row])
+
+        vectors = _normalize_rows(matrix)
+        assignments = assign_to_centroids(vectors, self.centroids)
+        first_row = len(self.node_ids)
+        rows = np.arange(first_row, first_row + len(node_ids))
+
+        self.vectors = np.vstack([self.vectors, vectors]) if len(self.vectors) else vectors
+        self.node_ids.extend(node_ids)
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self.alive = np.concatenate([self.alive, np.ones(len(node_ids), dtype=bool)])
+        for node, row in zip(node_ids, rows):
+            self.node_to_row[node] = row
+
+        for list_id in np.unique(assignments):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], rows[assignments == list_id]])
+        return self
+
+    def remove(self, nodes):
+        """
+        Delete nodes from the index. Rows are tombstoned and dropped by compact().
+        """
+        for node in nodes:
+            row = self.node_to_row.pop(node, None)
+            if row is not None:
+                self.alive[row] = False
+
+        if len(self.alive) > 0 and (~self.alive).sum() > 0.5 * len(self.alive):
+            self.compact()
+        return self
+
+    def compact(self):
+        """
+        Physically drop deleted rows and renumber the inverted lists.
+        """
+        keep = np.where(self.alive)[0]
+        self.vectors = self.vectors[keep]
+        self.node_ids = [self.node_ids[row] for row in keep]
+        self.assignments = self.assignments[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.node_to_row = {node: row for row, node in enumerate(self.node_ids)}
+        self._rebuild_lists()
+        return self
+
+    def search(self, query_embedding, k=5, n_probe=None, exact=False):
+        """
+        Approximate cosine-similarity top-k search.
+
+        Args:
+        - query_embedding (np.ndarray): Query vector, any shape that flattens to (d,).
+        - k (int): Number of nodes to return.
+        - n_probe (int or None): Override the number of lists scanned for this query.
+        - exact (bool): Scan all vectors instead (used as the reference for recall).
+
+        Returns:
+        - List of tuples (node, similarity), sorted by descending similarity, the same
+          format as find_best_fitting_node_list.
+        """
+        if len(self) == 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).flatten()
+        query = query / max(np.linalg.norm(query), 1e-12)
+
+        if exact:
+            candidates = np.where(self.alive)[0]
+        else:
+            n_probe = min(n_probe or self.n_probe, self.n_lists)
+            probe = _top_k(self.centroids @ query, n_probe)
+            candidates = np.concatenate([self._lists[list_id] for list_id in probe])
+            candidates = candidates[self.alive[candidates]]
+
+        similarities = self.vectors[candidates] @ query
+        top = _top_k(similarities, k)
+        return [(self.node_ids[candidates[i]], float(similarities[i])) for i in top]
+
+    def similar_pairs(self, similarity_threshold, max_neighbors=None, n_probe=None, max_block_elements=2**25):
+        """
+        Approximate all-pairs similarity join: every pair of indexed nodes with cosine
+        similarity above similarity_threshold. Members of each inverted list are only
+        compared with the members of the n_probe lists whose centroids are closest, in
+        row blocks of at most max_block_elements similarities.
+
+        Args:
+        - similarity_threshold (float): Minimum cosine similarity (exclusive).
+        - max_neighbors (int or None): Keep at most this many neighbours per node, which
+          bounds memory to O(N * max_neighbors) on very dense clusters.
+        - n_probe (int or None): Number of neighbouring lists compared, defaults to self.n_probe.
+
+        Returns:
+        - rows_1, rows_2 (np.ndarray): Row indices into self.node_ids, each pair once with rows_1 < rows_2.
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        centroid_similarities = self.centroids @ self.centroids.T
+
+        rows_1 = []
+        rows_2 = []
+        for list_id in range(self.n_lists):
+            members = self._lists[list_id]
+            members = members[self.alive[members]]
+            if len(members) == 0:
+                continue
+            probe = _top_k(centroid_similarities[list_id], n_probe)
+            candidates = np.concatenate([self._lists[probe_id] for probe_id in probe])
+            candidates = candidates[self.alive[candidates]]
+            candidate_vectors = self.vectors[candidates]
+
+            block_size = max(1, max_block_elements // max(len(candidates), 1))
+            for start in range(0, len(members), block_size):
+                block = members[start:start + block_size]
+                similarities = self.vectors[block] @ candidate_vectors.T
+                similarities[block[:, None] == candidates[None, :]] = -np.inf  # no self pairs
+
+                if max_neighbors is not None and max_neighbors < len(candidates):
+                    top = np.argpartition(-similarities, max_neighbors - 1, axis=1)[:, :max_neighbors]
+                    top_similarities = np.take_along_axis(similarities, top, axis=1)
+                    r, c = np.nonzero(top_similarities > similarity_threshold)
+                    rows_1.append(block[r])
+                    rows_2.append(candidates[top[r, c]])
+                else:
+                    r, c = np.nonzero(similarities > similarity_threshold)
+                    rows_1.append(block[r])
+                    rows_2.append(candidates[c])
+
+        if not rows_1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        rows_1 = np.concatenate(rows_1)
+        rows_2 = np.concatenate(rows_2)
+
+        # Each pair may be found from both ends, keep it once as (smaller row, larger row)
+        low = np.minimum(rows_1, rows_2)
+        high = np.maximum(rows_1, rows_2)
+        pairs = np.unique(np.stack([low, high], axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    def save(self, path):
+        """
+        Save the index to a single .npz file. Node ids (str or int) are stored as JSON,
+        so the file loads without pickle.
+        """
+        self.compact()
+        node_ids_json = np.frombuffer(json.dumps(list(self.node_ids), default=lambda value: value.item()).encode('utf-8'), dtype=np.uint8)
+        np.savez(path, centroids=self.centroids, vectors=self.vectors, assignments=self.assignments,
+                 node_ids_json=node_ids_json,
+                 params=np.array([self.n_lists, self.n_probe, self.n_iter, self.seed], dtype=np.int64))
+        return path
+
+    @classmethod
+    def load(cls, path, allow_pickle=False):
+        """
+        Load an index written by save. Files from older versions stored the node ids as a
+        pickled object array and only load with allow_pickle=True (from trusted sources);
+        save them again to convert.
+        """
+        with np.load(path, allow_pickle=allow_pickle) as data:
+            arrays = {name: data[name] for name in data.files}
+        n_lists, n_probe, n_iter, seed = (int(x) for x in arrays['params'])
+        index = cls(n_lists=n_lists, n_probe=n_probe, n_iter=n_iter, seed=seed)
+        index.centroids = arrays['centroids']
+        index.vectors = arrays['vectors']
+        index.assignments = arrays['assignments']
+        if 'node_ids_json' in arrays:
+            index.node_ids = json.loads(arrays['node_ids_json'].tobytes().decode('utf-8'))
+        else:
+            index.node_ids = list(arrays['node_ids'])
+        index.alive = np.ones(len(index.node_ids), dtype=bool)
+        index.node_to_row = {node: row for row, node in enumerate(index.node_ids)}
+        index._rebuild_lists()
+        return index
+
+def build_node_index(embeddings, n_lists=None, n_probe=8, verbatim=False, **kwargs):
+    """
+    Build an IVFIndex over node embeddings. Convenience wrapper around IVFIndex.build.
+    """
+    return IVFIndex(n_lists=n_lists, n_probe=n_probe, **kwargs).build(embeddings, verbatim=verbatim)
+
+def measure_recall_at_k(index, k=5, n_queries=200, noise=0.0, seed=0, queries=None, verbatim=True):
+    """
+    Measure recall@k of the approximate search against exact search on the same index.
+
+    With queries=None, queries are sampled from the indexed vectors, optionally perturbed
+    with Gaussian noise of relative magnitude noise, so that the measurement needs no extra
+    data. The node a query was sampled from is left out of both result lists: otherwise every
+    query trivially finds itself (its own list is always probed) and recall is overstated.
+    Held-out vectors, e.g. embeddings of real keywords, can be passed as queries instead.
+
+    Args:
+    - queries (np.ndarray or None): (Q, d) held-out query vectors.
+
+    Returns:
+    - recall (float): Mean fraction of the exact top-k found by the approximate search.
+    - timings (dict): Mean query time in seconds for approximate and exact search.
+    """
+    rng = np.random.default_rng(seed)
+    if queries is not None:
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        queries = queries[rng.choice(len(queries), min(n_queries, len(queries)), replace=False)]
+        excluded = [None] * len(queries)
+    else:
+        rows = np.where(index.alive)[0]
+        rows = rows[rng.choice(len(rows), min(n_queries, len(rows)), replace=False)]
+        queries = index.vectors[rows]
+        excluded = [index.node_ids[row] for row in rows]
+
+    hits = 0
+    total = 0
+    time_ann = 0.0
+    time_exact = 0.0
+    for query, own_node in zip(queries, excluded):
+        if noise > 0:
+            query = query + noise * rng.normal(size=query.shape).astype(np.float32) / np.sqrt(len(query))
+        n = k if own_node is None else k + 1
+
+        start_time = time.time()
+        approx = index.search(query, n)
+        time_ann += time.time() - start_time
+
+        start_time = time.time()
+        exact = index.search(query, n, exact=True)
+        time_exact += time.time() - start_time
+
+        approx = [node for node, _ in approx if node != own_node][:k]
+        exact = [node for node, _ in exact if node != own_node][:k]
+        hits += len(set(approx) & set(exact))
+        total += len(exact)
+
+    recall = hits / max(total, 1)
+    timings = {'ann': time_ann / max(len(queries), 1), 'exact': time_exact / max(len(queries), 1)}
+    if verbatim:
+        print(f"recall@{k} = {recall:.4f} over {len(queries)} queries, "
+              f"ANN {timings['ann'] * 1e3:.3f} ms/query, exact {timings['exact'] * 1e3:.3f} ms/query")
+    return recall, timings
@@ -126,10 +126,158 @@ def euclidean_distance(vec1, vec2):
     """Calculate the Euclidean distance between two vectors."""
     return np.linalg.norm(np.array(vec1) - np.array(vec2))
 
-def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, source, target, node_embeddings, top_k=3, second_hop=False,
-                                   data_dir='./', save_files=True, verbatim=False,):
-    G = deepcopy(G)
+from heapq import heappop, heappush
+
+def embedding_distances_to(node_embeddings, target):
+    """
+    Cosine distance (1 - cosine similarity) of every embedded node to target, from the cached
+    normalized embedding matrix in one matrix-vector product. The matrix of a plain dict is
+    rebuilt on every call; pass as_node_embeddings(node_embeddings) to reuse it.
+
+    Returns:
+    - distances (np.ndarray): One entry per matrix row plus a last entry of 1.0 for nodes
+      without an embedding.
+    - row_of (dict): {node: row}; use row_of.get(node, -1) to index distances.
+    """
+    node_embeddings = as_node_embeddings(node_embeddings)  # build the matrix of a plain dict once for both calls
+    _, matrix = get_embedding_matrix(node_embeddings)
+    row_of = get_embedding_row_index(node_embeddings)
+    distances = np.append(1.0 - matrix @ matrix[row_of[target]], np.float32(1.0))
+    return distances, row_of
+
+def _reconstruct_path(parent, node):
+    path = [node]
+    while parent[node] is not None:
+        node = parent[node]
+        path.append(node)
+    return path[::-1]
+
+def embedding_astar_path(G, source, target, node_embeddings, heuristic_weight=4.0, max_steps=None, seed=None):
+    """
+    A* search from source to target with hop costs and the embedding distance to the target as
+    heuristic: a node n is expanded in order of hops(source, n) + heuristic_weight * (1 - cos(n, target)).
+    The distances of all nodes are computed once, as one matrix-vector product, from the
+    embedding matrix cached for node_embeddings (see embedding_distances_to).
+
+    Args:
+    - heuristic_weight (float): Weight of the embedding distance (at most 2) against the number of
+      hops. Larger values follow the embeddings more greedily and expand fewer nodes; 0 is a BFS.
+    - max_steps (int or None): Maximum number of node expansions, None for no limit.
+    - seed (int or None): Seed for breaking ties between equally scored nodes (by order if None).
+
+    Returns:
+    - path (list) or None if there is no path within the step budget.
+    """
+    if source not in G or target not in G:
+        return None
+    distances, row_of = embedding_distances_to(node_embeddings, target)
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    hops = {source: 0}
+    parent = {source: None}
+    closed = set()
+    counter = 0
+    heap = [(heuristic_weight * float(distances[row_of.get(source, -1)]), 0.0, counter, source)]
+    steps = 0
+    while heap:
+        _, _, _, node = heappop(heap)
+        if node in closed:
+            continue
+        if node == target:
+            return _reconstruct_path(parent, node)
+        closed.add(node)
+        steps += 1
+        if max_steps is not None and steps > max_steps:
+            return None
+
+        neighbors = [neighbor for neighbor in G.neighbors(node)
+                     if neighbor not in closed and hops.get(neighbor, float('inf')) > hops[node] + 1]
+        if not neighbors:
+            continue
+        rows = np.fromiter((row_of.get(neighbor, -1) for neighbor in neighbors), dtype=np.int64, count=len(neighbors))
+        priorities = (hops[node] + 1 + heuristic_weight * distances[rows]).tolist()
+        ties = rng.random(len(neighbors)).tolist() if rng is not None else [0.0] * len(neighbors)
+        for neighbor, priority, tie in zip(neighbors, priorities, ties):
+            hops[neighbor] = hops[node] + 1
+            parent[neighbor] = node
+            counter += 1
+            heappush(heap, (priority, tie, counter, neighbor))
+    return None
+
+def embedding_beam_path(G, source, target, node_embeddings, beam_width=8, max_steps=None, seed=None):
+    """
+    Beam search from source to target: at every level, only the beam_width newly reached nodes
+    closest to the target in embedding space are expanded. Faster than A* on large graphs, but it
+    can miss a path that a wider beam (or embedding_astar_path) would find. The embedding
+    distances are computed as in embedding_astar_path.
+
+    Args:
+    - beam_width (int): Number of nodes kept per level.
+    - max_steps (int or None): Maximum number of node expansions, None for no limit.
+    - seed (int or None): Seed for breaking ties between equally scored nodes (by order if None).
+
+    Returns:
+    - path (list) or None.
+    """
+    if source not in G or target not in G:
+        return None
+    distances, row_of = embedding_distances_to(node_embeddings, target)
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    parent = {source: None}
+    frontier = [source]
+    steps = 0
+    while frontier:
+        reached = {}
+        for node in frontier:
+            steps += 1
+            if max_steps is not None and steps > max_steps:
+                return None
+            for neighbor in G.neighbors(node):
+                if neighbor not in parent and neighbor not in reached:
+                    if neighbor == target:
+                        parent[neighbor] = node
+                        return _reconstruct_path(parent, neighbor)
+                    reached[neighbor] = node
+        if not reached:
+            return None
+
+        candidates = list(reached)
+        rows = np.fromiter((row_of.get(node, -1) for node in candidates), dtype=np.int64, count=len(candidates))
+        ties = rng.random(len(candidates)) if rng is not None else np.arange(len(candidates))
+        keep = np.lexsort((ties, distances[rows]))[:beam_width]
+        frontier = [candidates[i] for i in keep]
+        for node in frontier:
+            parent[node] = reached[node]
+    return None
+
+def _copy_attribute_values(subgraph):
+    # Give a subgraph copy its own attribute containers (e.g. 'texts' lists): G.subgraph(...).copy()
+    # and add_edge(**data) copy the attribute dicts but share the values, so changing a list of the
+    # result would change G as well. One level is copied, as copy.copy does; strings and numbers are
+    # immutable and stay shared.
+    def detach(data):
+        for key, value in list(data.items()):
+            if isinstance(value, (list, dict, set)):
+                data[key] = copy.copy(value)
+    detach(subgraph.graph)
+    for _, data in subgraph.nodes(data=True):
+        detach(data)
+    for _, _, data in subgraph.edges(data=True):
+        detach(data)
+    return subgraph
 
+def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, source, target, node_embeddings, top_k=3, second_hop=False,
+                                   data_dir='./', save_files=True, verbatim=False,
+                                   method='greedy', beam_width=8, max_steps=None, heuristic_weight=4.0, seed=None):
+    # G is only read, so it can be a large graph or a read-only view (e.g. G.subgraph(...)); only the
+    # returned subgraph is copied, with its own attribute values, so changing it leaves G unchanged.
+    # method='greedy' is the randomized greedy walk with backtracking (top_k); 'astar' and 'beam' use
+    # embedding_astar_path / embedding_beam_path with the normalized embedding matrix as heuristic,
+    # within max_steps node expansions. seed makes all three methods reproducible.
+
+    # Matching source and target and the search share one embedding matrix, also for a plain dict
+    node_embeddings = as_node_embeddings(node_embeddings)
     if verbatim:
         print ("Original: ", source, "-->", target)
     source=find_best_fitting_node_list(source, node_embeddings  , embedding_tokenizer, embedding_model, 5)[0][0].strip()
@@ -142,9 +290,15 @@ def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, sour
         """Estimate distance from current to target using embeddings."""
         return euclidean_distance(node_embeddings[current], node_embeddings[target])
 
+    rng = random.Random(seed) if seed is not None else random
+
     def sample_path(current, visited):
         path = [current]
+        steps = 0
         while current != target:
+            steps += 1
+            if max_steps is not None and steps > max_steps:
+                return None
             neighbors = [(neighbor, heuristic(neighbor, target)) for neighbor in G.neighbors(current) if neighbor not in visited]
             if not neighbors:
                 # Dead end reached, backtrack if possible
@@ -158,7 +312,7 @@ def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, sour
             else:
                 neighbors.sort(key=lambda x: x[1])
                 top_neighbors = neighbors[:top_k] if len(neighbors) > top_k else neighbors
-                next_node = random.choice(top_neighbors)[0]
+                next_node = rng.choice(top_neighbors)[0]
     
                 path.append(next_node)
                 visited.add(next_node)  # Mark the node as visited
@@ -170,8 +324,17 @@ def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, sour
                     return None 
         return path
 
-    visited = set([source])  # Initialize visited nodes set
-    path = sample_path(source, visited)
+    if method == 'greedy':
+        visited = set([source])  # Initialize visited nodes set
+        path = sample_path(source, visited)
+    elif method == 'astar':
+        path = embedding_astar_path(G, source, target, node_embeddings, heuristic_weight=heuristic_weight,
+                                    max_steps=max_steps, seed=seed)
+    elif method == 'beam':
+        path = embedding_beam_path(G, source, target, node_embeddings, beam_width=beam_width,
+                                   max_steps=max_steps, seed=seed)
+    else:
+        raise ValueError(f"Unknown path search method: {method}")
     if path is None:
         print (f"No path found between {source} and {target}")
         return None, None,None, None,None 
@@ -186,7 +349,7 @@ def heuristic_path_with_embeddings(G, embedding_tokenizer, embedding_model, sour
                     for second_hop_neighbor in G.neighbors(neighbor):
                         subgraph_nodes.add(second_hop_neighbor)
 
-    subgraph = G.subgraph(subgraph_nodes).copy()
+    subgraph = _copy_attribute_values(G.subgraph(subgraph_nodes).copy())
     
     if save_files:
         time_part = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -242,11 +405,8 @@ def find_shortest_path (G,source='graphene', target='complexity', verbatim=True,
     nx.write_graphml(path_graph, graph_GraphML)
 
     return path, path_graph , shortest_path_length, fname, graph_GraphML
-def find_shortest_path_with2hops (G, source='graphene', target='complexity',
-                                 second_hop=True,#otherwise just neighbors
-                                  verbatim=True,data_dir='./', save_files=True,
-                                 ):
-    # Find the shortest path between two nodes
+def _shortest_path_with_hops_nx(G, source, target, second_hop=True):
+    # Plain networkx version, for graphs that have no CSR snapshot (multigraphs, mixed node ids)
     path = nx.shortest_path(G, source=source, target=target)
     
     # Initialize a set to keep track of all nodes within 2 hops
@@ -261,9 +421,67 @@ def find_shortest_path_with2hops (G, source='graphene', target='complexity',
             if second_hop:
                 for second_neighbor in G.neighbors(neighbor):
                     nodes_within_2_hops.add(second_neighbor)
+    return path, nodes_within_2_hops
+
+def find_shortest_path_with2hops (G, source='graphene', target='complexity',
+                                 second_hop=True,#otherwise just neighbors
+                                  verbatim=True,data_dir='./', save_files=True,
+                                  max_neighbors=None, seed=None, use_snapshot=None, snapshot=None,
+                                 ):
+    """
+    Shortest path between source and target plus every node within 2 hops (1 if not second_hop) of it.
+
+    With a CSR snapshot of G (GraphSnapshot) the search is a bidirectional BFS for the path and a
+    vectorized frontier expansion for the neighborhood, so hub nodes do not cost a Python loop over
+    their neighbors. The path has the same length as nx.shortest_path, but when several shortest
+    paths exist another one may be returned. Building a snapshot costs far more than a single
+    networkx query, so for one-off queries networkx is used directly.
+
+    Args:
+    - max_neighbors (int or None): Expand at most this many neighbors per node, preferring
+      low-degree neighbors over hubs; keeps neighborhoods of hub-heavy graphs small. None expands all.
+    - seed (int or None): Random seed for the neighbor sampling.
+    - use_snapshot (bool or None): Use the cached snapshot of G (get_adjacency_snapshot), which is
+      rebuilt when nodes or edges are added or removed. None: only if max_neighbors is set.
+    - snapshot (GraphSnapshot or None): Snapshot of G to search, e.g. get_adjacency_snapshot(G) for many
+      queries on one graph or a memory-mapped load_graph_snapshot(..., as_networkx=False). It must
+      match the current structure of G; it is used as is.
+    """
+    if use_snapshot is None:
+        use_snapshot = max_neighbors is not None
+    cached = snapshot is None and use_snapshot
+    if cached:
+        try:
+            snapshot = get_adjacency_snapshot(G)
+        except TypeError:
+            # multigraphs and mixed node ids have no snapshot
+            snapshot = None
+    if snapshot is None:
+        path, nodes_within_2_hops = _shortest_path_with_hops_nx(G, source, target, second_hop=second_hop)
+    else:
+        for node in (source, target):
+            if node not in snapshot.node_to_index:
+                raise nx.NodeNotFound(f"Node {node} not in G")
+        path = snapshot.shortest_path_indices(snapshot.node_to_index[source], snapshot.node_to_index[target])
+        nodes = snapshot.nodes
+        if cached and path is not None and not all(G.has_edge(nodes[u], nodes[v]) for u, v in zip(path, path[1:])):
+            # edges were swapped since the snapshot was cached (same node and edge counts)
+            invalidate_adjacency_snapshot(G)
+            snapshot = get_adjacency_snapshot(G)
+            nodes = snapshot.nodes
+            path = snapshot.shortest_path_indices(snapshot.node_to_index[source], snapshot.node_to_index[target])
+        if path is None:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        within = snapshot.k_hop_indices(path, k=2 if second_hop else 1, max_neighbors=max_neighbors, seed=seed)
+        path = [nodes[i] for i in path]
+        nodes_within_2_hops = {nodes[i] for i in within.tolist()}
     
     # Create a subgraph for the nodes within 2 hops
-    path_graph = G.subgraph(nodes_within_2_hops)
+    if snapshot is None or hasattr(G, '_NODE_OK'):
+        path_graph = G.subgraph(nodes_within_2_hops)
+    else:
+        # same view as G.subgraph, minus its per-node membership check (the nodes come from G's snapshot)
+        path_graph = nx.subgraph_view(G, filter_node=nx.filters.show_nodes(nodes_within_2_hops))
 
     if save_files:
         nt = Network('500px', '1000px', notebook=True)
@@ -346,15 +564,16 @@ def print_node_pairs_edge_title(G):
 
 def find_path( G, node_embeddings,  tokenizer, model, keyword_1 = "music and sound", keyword_2 = "graphene", 
               verbatim=True, second_hop=False,data_dir='./', similarity_fit_ID_node_1=0, similarity_fit_ID_node_2=0,save_files=True,
+              node_index=None, #optional ANN index (e.g. IVFIndex) used instead of exact search
               ):
     
-    best_node_1, best_similarity_1=find_best_fitting_node_list(keyword_1, node_embeddings, tokenizer, model, max (5, similarity_fit_ID_node_1+1))[similarity_fit_ID_node_1]
+    best_node_1, best_similarity_1=find_best_fitting_node_list(keyword_1, node_embeddings, tokenizer, model, max (5, similarity_fit_ID_node_1+1), index=node_index)[similarity_fit_ID_node_1]
     
     if verbatim:
         print(f"{similarity_fit_ID_node_1}nth best fitting node for '{keyword_1}': '{best_node_1}' with similarity: {best_similarity_1}")
     
     
-    best_node_2, best_similarity_2 = find_best_fitting_node_list(keyword_2, node_embeddings, tokenizer, model,  max (5, similarity_fit_ID_node_2+1))[similarity_fit_ID_node_2]
+    best_node_2, best_similarity_2 = find_best_fitting_node_list(keyword_2, node_embeddings, tokenizer, model,  max (5, similarity_fit_ID_node_2+1), index=node_index)[similarity_fit_ID_node_2]
     if verbatim:
         print(f"{similarity_fit_ID_node_2}nth best fitting node for '{keyword_2}': '{best_node_2}' with similarity: {best_similarity_2}")
     
@@ -714,6 +933,7 @@ def find_path_and_reason (G, node_embeddings,  tokenizer, model, generate,
                           max_tokens=4096,prepend='You are given a set of information from a graph that describes the relationship between materials, structure, properties, and properties. You analyze these logically through reasoning.\n\n',
                           similarity_fit_ID_node_1=0, similarity_fit_ID_node_2=0, #whoch path to include 0=only best, 1 onlysecond best, etc.
                           save_files=True,data_dir='./',visualize_paths_as_graph=True, display_graph=True,words_per_line=2,
+                          node_index=None,
                          ):
     make_dir_if_needed(data_dir)
     task=prepend+''
@@ -725,7 +945,7 @@ def find_path_and_reason (G, node_embeddings,  tokenizer, model, generate,
      
     (best_node_1, best_similarity_1, best_node_2, best_similarity_2), path, path_graph, shortest_path_length, fname, graph_GraphML=find_path( G,node_embeddings, tokenizer, model, keyword_1 = keyword_1,  keyword_2 = keyword_2,verbatim=verbatim,
                                                               similarity_fit_ID_node_1=similarity_fit_ID_node_1,similarity_fit_ID_node_2=similarity_fit_ID_node_2,  data_dir=data_dir,
-                                                                                                                                             save_files=save_files,)
+                                                                                                                                             save_files=save_files, node_index=node_index,)
     if visualize_paths_as_graph:
         path_list_for_vis, _=path_list=print_path_with_edges_as_list(G, path, keywords_separator=keywords_separator)                                                                                                                                        
     if include_keywords_as_nodes:
@@ -813,6 +1033,7 @@ def find_path_with_relations_and_reason_combined(G, node_embeddings, tokenizer,
                           include_all_possible=False,  # New option to consider all combinations,
                           data_dir='./',save_files=False, #whether or not to make HTML of each graph
                            visualize_paths_as_graph=False, display_graph=True,words_per_line=2,
+                           node_index=None,
                          ):
 
     make_dir_if_needed(data_dir)
@@ -829,13 +1050,13 @@ def find_path_with_relations_and_reason_combined(G, node_embeddings, tokenizer,
             for end_id in range(num_paths):
                 # Process each combination
                  
-                paths_details.extend(process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, keyword_2, verbatim, N_limit, keywords_separator, start_id, end_id, include_keywords_as_nodes,data_dir,save_files,visualize_paths_as_graph,display_graph=display_graph,words_per_line=words_per_line))
+                paths_details.extend(process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, keyword_2, verbatim, N_limit, keywords_separator, start_id, end_id, include_keywords_as_nodes,data_dir,save_files,visualize_paths_as_graph,display_graph=display_graph,words_per_line=words_per_line,node_index=node_index))
     else:
         # Process paths based on num_paths without considering all combinations
         for path_id in range(num_paths):
 
              
-            paths_details.extend(process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, keyword_2, verbatim, N_limit, keywords_separator, path_id, path_id, include_keywords_as_nodes,data_dir,save_files,visualize_paths_as_graph,display_graph=display_graph,words_per_line=words_per_line))
+            paths_details.extend(process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, keyword_2, verbatim, N_limit, keywords_separator, path_id, path_id, include_keywords_as_nodes,data_dir,save_files,visualize_paths_as_graph,display_graph=display_graph,words_per_line=words_per_line,node_index=node_index))
              
 
     # Generate task and response for each path or combination
@@ -874,7 +1095,7 @@ def find_path_with_relations_and_reason_combined(G, node_embeddings, tokenizer,
     return response
 
 def process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, keyword_2, verbatim, N_limit, keywords_separator, start_id, end_id, include_keywords_as_nodes,data_dir,save_files,
-                            visualize_paths_as_graph=False,display_graph=False,words_per_line=2):
+                            visualize_paths_as_graph=False,display_graph=False,words_per_line=2,node_index=None):
     # This helper function encapsulates the repeated logic for finding and processing a path
     paths_details = []
     (best_node_1, best_similarity_1, best_node_2, best_similarity_2), path, path_graph, shortest_path_length, fname, graph_GraphML = find_path(
@@ -882,6 +1103,7 @@ def process_path_combination(G, node_embeddings, tokenizer, model, keyword_1, ke
         keyword_2=keyword_2, verbatim=verbatim,
         similarity_fit_ID_node_1=start_id,
         similarity_fit_ID_node_2=end_id,data_dir=data_dir,save_files=save_files,
+        node_index=node_index,
     )
 
     if visualize_paths_as_graph:
@@ -1687,8 +1909,11 @@ def heuristic_path_with_embeddings_with_randomization_waypoints(G, embedding_tok
     else:
         print("No valid path found.")
     """    
-    G = deepcopy(G)
+    # G is only read (no copy), so it can also be a read-only view; the returned subgraph is built
+    # from the path (and second-hop) edges only, with its own attribute values
 
+    # Source and target matching share one embedding matrix, also for a plain dict
+    node_embeddings = as_node_embeddings(node_embeddings)
     if verbatim:
         print("Original: ", source, "-->", target)
     source_list = find_best_fitting_node_list(source, node_embeddings, embedding_tokenizer, embedding_model, 5)
@@ -1784,6 +2009,7 @@ def heuristic_path_with_embeddings_with_randomization_waypoints(G, embedding_tok
                         subgraph.add_node(second_hop_neighbor, **G.nodes[second_hop_neighbor])
                     if G.has_edge(neighbor, second_hop_neighbor):
                         subgraph.add_edge(neighbor, second_hop_neighbor, **G.edges[neighbor, second_hop_neighbor])
+    _copy_attribute_values(subgraph)
 
     if save_files:
         ensure_directory_exists(data_dir)
@@ -1,6 +1,7 @@
 from GraphReasoning.graph_tools import *
 from GraphReasoning.utils import *
 from GraphReasoning.graph_analysis import *
+from GraphReasoning.llm_cache import *
 
 import copy
 
@@ -107,13 +108,19 @@ def extract (string, start='[', end=']'):
     end_index = string.rfind(end)
      
     return string[start_index :end_index+1]
-def documents2Dataframe(documents) -> pd.DataFrame:
+def documents2Dataframe(documents, deterministic_ids=False) -> pd.DataFrame:
     rows = []
-    for chunk in documents:
+    for i, chunk in enumerate(documents):
+        # Deterministic ids (hash of position and text) stay the same across runs, which
+        # lets a checkpointed run recognize chunks it has already processed
+        if deterministic_ids:
+            chunk_id = hashlib.md5(f"{i}\0{chunk}".encode('utf-8')).hexdigest()
+        else:
+            chunk_id = uuid.uuid4().hex
         row = {
             "text": chunk,
            # **chunk.metadata,
-            "chunk_id": uuid.uuid4().hex,
+            "chunk_id": chunk_id,
         }
         rows = rows + [row]
 
@@ -131,24 +138,116 @@ def concepts2Df(concepts_list) -> pd.DataFrame:
     return concepts_dataframe
 
 
+import threading
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+def bounded_generate(generate, max_in_flight):
+    """
+    Wrap a generate function so that at most max_in_flight calls run at the same time.
+    """
+    semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def generate_bounded(*args, **kwargs):
+        with semaphore:
+            return generate(*args, **kwargs)
+    return generate_bounded
+
 def df2Graph(dataframe: pd.DataFrame, generate, repeat_refine=0, verbatim=False,
-          
+             max_workers=1, max_in_flight=None, on_chunk_done=None, fast_path=True,
             ) -> list:
-  
-    results = dataframe.apply(
-        lambda row: graphPrompt(row.text, generate, {"chunk_id": row.chunk_id}, repeat_refine=repeat_refine,
-                                verbatim=verbatim,#model
-                               ), axis=1
-    )
+    """
+    Extract triplets from every chunk of a dataframe with columns 'text' and 'chunk_id'.
+
+    With max_workers > 1, chunks are processed concurrently by a pool of threads, with at
+    most max_in_flight generate calls running at once (defaults to max_workers). Results
+    keep the chunk order, and a chunk that raises is reported and skipped without
+    failing the others.
+
+    on_chunk_done(chunk_id, result) is called as soon as each chunk finishes, e.g. to
+    checkpoint it (see make_chunk_checkpoint_writer).
+
+    fast_path is passed to graphPrompt: responses that parse locally skip the format-fix
+    LLM calls (see get_graph_prompt_stats).
+    """
+    if max_workers > 1:
+        if max_in_flight is not None:
+            generate = bounded_generate(generate, max_in_flight)
+
+        def process_chunk(row):
+            try:
+                result = graphPrompt(row.text, generate, {"chunk_id": row.chunk_id}, repeat_refine=repeat_refine,
+                                     verbatim=verbatim, fast_path=fast_path)
+            except Exception as e:
+                print(f"\n\nERROR ### Graph extraction failed for chunk {row.chunk_id}: {e}\n\n")
+                return None
+            if on_chunk_done is not None:
+                on_chunk_done(row.chunk_id, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # executor.map returns results in submission order, i.e. in chunk order
+            results = pd.Series(list(executor.map(process_chunk, dataframe.itertuples(index=False))),
+                                dtype=object)
+    else:
+        def process_chunk(row):
+            result = graphPrompt(row.text, generate, {"chunk_id": row.chunk_id}, repeat_refine=repeat_refine,
+                                 verbatim=verbatim, fast_path=fast_path,#model
+                                )
+            if on_chunk_done is not None:
+                on_chunk_done(row.chunk_id, result)
+            return result
+
+        results = pd.Series([process_chunk(row) for row in dataframe.itertuples(index=False)], dtype=object)
     # invalid json results in NaN
     results = results.dropna()
     results = results.reset_index(drop=True)
+    if len(results) == 0:
+        return []
 
     ## Flatten the list of lists to one single list of entities.
     concept_list = np.concatenate(results).ravel().tolist()
     return concept_list
 
 
+def make_chunk_checkpoint_writer(checkpoint_file):
+    """
+    Return an on_chunk_done callback for df2Graph that appends each finished chunk to a
+    JSON-lines checkpoint log as {"chunk_id": ..., "triplets": [...]}. Chunks whose output
+    could not be parsed are not logged, so a resumed run retries them.
+    """
+    lock = threading.Lock()
+
+    def on_chunk_done(chunk_id, result):
+        if result is None:
+            return
+        line = json.dumps({"chunk_id": chunk_id, "triplets": result}, default=str)
+        with lock:
+            with open(checkpoint_file, 'a') as f:
+                f.write(line + "\n")
+                f.flush()
+    return on_chunk_done
+
+def load_chunk_checkpoint(checkpoint_file):
+    """
+    Read a checkpoint log written by make_chunk_checkpoint_writer.
+
+    Returns:
+    - dict {chunk_id: list of triplets}, empty if the file does not exist. A partially
+      written last line (e.g. after a crash) is ignored.
+    """
+    done = {}
+    if not os.path.exists(checkpoint_file):
+        return done
+    with open(checkpoint_file, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry['chunk_id']] = entry['triplets']
+    return done
+
 def graph2Df(nodes_list) -> pd.DataFrame:
     ## Remove all NaN entities
     graph_dataframe = pd.DataFrame(nodes_list).replace(" ", np.nan)
@@ -164,8 +263,110 @@ sys.path.append("..")
 
 import json
 
+_TRIPLET_KEYS = ("node_1", "node_2", "edge")
+
+def _strip_trailing_commas(text):
+    # Remove commas directly before ] or }, but only outside of JSON strings
+    out = []
+    in_string = False
+    escaped = False
+    pending_comma = None  # position in out of a comma that may turn out to be trailing
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char in ']}' and pending_comma is not None:
+            del out[pending_comma]
+        if not char.isspace():
+            pending_comma = None
+        if char == '"':
+            in_string = True
+        elif char == ',':
+            pending_comma = len(out)
+        out.append(char)
+    return ''.join(out)
+
+def _clean_json_text(text):
+    # Drop markdown code fences, backslashes (as the format-fix step did) and trailing commas
+    text = re.sub(r"```[a-zA-Z]*", "", text)
+    text = text.replace('\\', '')
+    return _strip_trailing_commas(text)
+
+def _valid_triplets(items):
+    if not isinstance(items, list):
+        return None
+    triplets = [item for item in items if isinstance(item, dict) and all(key in item for key in _TRIPLET_KEYS)]
+    return triplets if len(triplets) > 0 else None
+
+def parse_triplets(response):
+    """
+    Parse an LLM response into a list of triplets {"node_1", "node_2", "edge"} without
+    another LLM call. Tolerates code fences, text around the JSON list, trailing commas
+    and truncated lists (every complete object is kept).
+
+    Returns:
+    - list of dicts, or None if no complete triplet could be recovered.
+    """
+    if not isinstance(response, str):
+        return None
+
+    # Valid JSON is taken as is; the clean-up below could alter string values
+    for text in (response, _clean_json_text(response)):
+        try:
+            result = _valid_triplets(json.loads(extract(text)))
+            if result is not None:
+                return result
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+    # Recover objects one by one, e.g. from a partial list or objects without brackets
+    decoder = json.JSONDecoder()
+    items = []
+    position = text.find('{')
+    while position != -1:
+        try:
+            item, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find('{', position + 1)
+            continue
+        items.append(item)
+        position = text.find('{', end)
+    return _valid_triplets(items)
+
+# Counts of how graphPrompt obtained parseable triplets, see get_graph_prompt_stats
+_graph_prompt_stats = {'chunks': 0, 'fast_path': 0, 'repaired': 0, 'failed': 0,
+                       'repair_calls': 0, 'repair_calls_skipped': 0}
+_graph_prompt_stats_lock = threading.Lock()
+
+def _count_graph_prompt(**counts):
+    with _graph_prompt_stats_lock:
+        for key, value in counts.items():
+            _graph_prompt_stats[key] += value
+
+def get_graph_prompt_stats():
+    """
+    How often graphPrompt parsed the LLM output locally (fast path) instead of asking
+    the LLM to repair its format, since import or the last reset_graph_prompt_stats().
+    """
+    with _graph_prompt_stats_lock:
+        stats = dict(_graph_prompt_stats)
+    stats['fast_path_rate'] = stats['fast_path'] / stats['chunks'] if stats['chunks'] else 0.0
+    return stats
+
+def reset_graph_prompt_stats():
+    with _graph_prompt_stats_lock:
+        for key in _graph_prompt_stats:
+            _graph_prompt_stats[key] = 0
+
 def graphPrompt(input: str, generate, metadata={}, #model="mistral-openorca:latest",
                 repeat_refine=0,verbatim=False,
+                fast_path=True, #parse responses locally, only ask the LLM to fix the format if that fails
                ):
     
     SYS_PROMPT_GRAPHMAKER = (
@@ -228,6 +429,24 @@ def graphPrompt(input: str, generate, metadata={}, #model="mistral-openorca:late
                     '       "node_2": "A related concept from extracted ontology",\n'
                     '       "edge": "Relationship between the two concepts, node_1 and node_2, succinctly described"\n'
                     '   }, {...} ]\n'  )    
+    
+    repair_calls = 0
+    repair_calls_skipped = 0
+    
+    def fix_format(response):
+        # Returns (response, triplets); triplets is None unless the fast path parsed the response
+        nonlocal repair_calls, repair_calls_skipped
+        if fast_path:
+            triplets = parse_triplets(response)
+            if triplets is not None:
+                repair_calls_skipped += 1
+                return json.dumps(triplets), triplets
+        repair_calls += 1
+        USER_PROMPT = f"Context: ```{response}``` \n\n Fix to make sure it is proper format. "
+        response  =  generate( system_prompt=SYS_PROMPT_FORMAT, prompt=USER_PROMPT)
+        response =   response.replace ('\\', '' )
+        return response, None
+    
     USER_PROMPT = (f'Read this context: ```{input}```.'
                   f'Read this ontology: ```{response}```'
                  f'\n\nImprove the ontology by renaming nodes so that they have consistent labels that are widely used in the field of materials science.'''
@@ -237,17 +456,13 @@ def graphPrompt(input: str, generate, metadata={}, #model="mistral-openorca:late
     if verbatim:
         print ("---------------------\nAfter improve: ", response)
     
-    USER_PROMPT = f"Context: ```{response}``` \n\n Fix to make sure it is proper format. "
-    response  =  generate( system_prompt=SYS_PROMPT_FORMAT, prompt=USER_PROMPT)
-    response =   response.replace ('\\', '' )
+    response, triplets = fix_format(response)
     if verbatim:
         print ("---------------------\nAfter clean: ", response)
     
     if repeat_refine>0:
         for rep in tqdm(range (repeat_refine)):
             
-
-            
             USER_PROMPT = (f'Insert new triplets into the original ontology. Read this context: ```{input}```.'
                           f'Read this ontology: ```{response}```'
                           f'\n\nInsert additional triplets to the original list, in the same JSON format. Repeat original AND new triplets.\n'
@@ -256,9 +471,7 @@ def graphPrompt(input: str, generate, metadata={}, #model="mistral-openorca:late
                                   prompt=USER_PROMPT)
             if verbatim:
                 print ("---------------------\nAfter adding triplets: ", response)
-            USER_PROMPT = f"Context: ```{response}``` \n\n Fix to make sure it is proper format. "
-            response  =  generate( system_prompt=SYS_PROMPT_FORMAT, prompt=USER_PROMPT)
-            response =   response.replace ('\\', '' )
+            response, triplets = fix_format(response)
             USER_PROMPT = (f'Read this context: ```{input}```.'
                           f'Read this ontology: ```{response}```'
                          f'\n\nRevise the ontology by renaming nodes and edges so that they have consistent and concise labels.'''
@@ -268,25 +481,27 @@ def graphPrompt(input: str, generate, metadata={}, #model="mistral-openorca:late
                                   prompt=USER_PROMPT)            
             if verbatim:
                 print (f"---------------------\nAfter refine {rep}/{repeat_refine}: ", response)
+            triplets = None
 
-     
-    USER_PROMPT = f"Context: ```{response}``` \n\n Fix to make sure it is proper format. "
-    response  =  generate( system_prompt=SYS_PROMPT_FORMAT, prompt=USER_PROMPT)
-    response =   response.replace ('\\', '' )
+    if triplets is None:
+        response, triplets = fix_format(response)
     
-    try:
-        response=extract (response)
-       
-    except:
-        print (end='')
+    if triplets is None:
+        # Output of the format-fix call; parse it just as tolerantly
+        triplets = parse_triplets(response)
     
-    try:
-        result = json.loads(response)
+    if triplets is not None:
+        result = [dict(item, **metadata) for item in triplets]
         print (result)
-        result = [dict(item, **metadata) for item in result]
-    except:
+    else:
         print("\n\nERROR ### Here is the buggy response: ", response, "\n\n")
         result = None
+    
+    _count_graph_prompt(chunks=1,
+                        fast_path=int(result is not None and repair_calls == 0),
+                        repaired=int(result is not None and repair_calls > 0),
+                        failed=int(result is None),
+                        repair_calls=repair_calls, repair_calls_skipped=repair_calls_skipped)
     return result
 
 def colors2Community(communities) -> pd.DataFrame:
@@ -303,32 +518,220 @@ def colors2Community(communities) -> pd.DataFrame:
     df_colors = pd.DataFrame(rows)
     return df_colors
 
-def contextual_proximity(df: pd.DataFrame) -> pd.DataFrame:
-    ## Melt the dataframe into a list of nodes
+import time
+import warnings
+
+def _louvain_communities(G, time_budget=None, seed=None, weight='weight', resolution=1.0):
+    # Each level of louvain_partitions is a complete (coarser) partition, so stopping
+    # early when the time budget runs out still leaves a valid result
+    start = time.time()
+    communities = None
+    for partition in nx.community.louvain_partitions(G, weight=weight, resolution=resolution, seed=seed):
+        communities = partition
+        if time_budget is not None and time.time() - start > time_budget:
+            break
+    return communities
+
+def _leiden_communities(G, time_budget=None, seed=None, weight='weight', resolution=1.0):
+    try:
+        import igraph as ig
+        import leidenalg
+    except ImportError:
+        print ("leidenalg/igraph not installed, using Louvain for community detection.")
+        return _louvain_communities(G, time_budget=time_budget, seed=seed, weight=weight, resolution=resolution)
+    nodes = list(G.nodes())
+    node_to_index = {node: i for i, node in enumerate(nodes)}
+    edges = [(node_to_index[u], node_to_index[v]) for u, v in G.edges()]
+    weights = [data.get(weight, 1.0) for _, _, data in G.edges(data=True)]
+    graph = ig.Graph(n=len(nodes), edges=edges)
+    if time_budget is None:
+        partition = leidenalg.find_partition(graph, leidenalg.RBConfigurationVertexPartition, weights=weights,
+                                             resolution_parameter=resolution, seed=seed)
+    else:
+        # One Leiden iteration at a time; every iteration leaves a valid partition
+        start = time.time()
+        partition = leidenalg.RBConfigurationVertexPartition(graph, weights=weights, resolution_parameter=resolution)
+        optimiser = leidenalg.Optimiser()
+        if seed is not None:
+            optimiser.set_rng_seed(seed)
+        while optimiser.optimise_partition(partition, n_iterations=1) > 0:
+            if time.time() - start > time_budget:
+                break
+    return [{nodes[i] for i in members} for members in partition]
+
+def _label_propagation_communities(G, time_budget=None, seed=None, weight='weight', resolution=1.0):
+    if time_budget is None:
+        return nx.community.asyn_lpa_communities(G, weight=weight, seed=seed)
+
+    # Same asynchronous label propagation as nx.community.asyn_lpa_communities, with the
+    # time budget checked after every round; the labels of any round form a valid partition
+    start = time.time()
+    rng = random.Random(seed)
+    labels = {node: i for i, node in enumerate(G)}
+    nodes = list(G)
+    changed = True
+    while changed and time.time() - start <= time_budget:
+        changed = False
+        rng.shuffle(nodes)
+        for node in nodes:
+            if len(G[node]) == 0:
+                continue
+            counts = {}
+            for neighbor, data in G[node].items():
+                counts[labels[neighbor]] = counts.get(labels[neighbor], 0) + (data.get(weight, 1) if weight else 1)
+            best = max(counts.values())
+            best_labels = [label for label, count in counts.items() if count == best]
+            if labels[node] not in best_labels:
+                labels[node] = rng.choice(best_labels)
+                changed = True
+    communities = {}
+    for node, label in labels.items():
+        communities.setdefault(label, set()).add(node)
+    return list(communities.values())
+
+def _girvan_newman_communities(G, time_budget=None, seed=None, weight='weight', resolution=1.0):
+    # First split only, as make_graph_from_text used to do. Repeated edge betweenness
+    # makes this roughly O(m^2 n), only use it on small graphs
+    if time_budget is not None:
+        warnings.warn("girvan_newman cannot stop early, time_budget is ignored.", stacklevel=3)
+    return next(nx.community.girvan_newman(G))
+
+community_backends = {
+    'louvain': _louvain_communities,
+    'leiden': _leiden_communities,
+    'label_propagation': _label_propagation_communities,
+    'girvan_newman': _girvan_newman_communities,
+}
+
+def detect_communities(G, method='louvain', time_budget=None, seed=None, weight='weight', resolution=1.0,
+                       verbatim=False):
+    """
+    Partition a graph into communities, e.g. for coloring in make_graph_from_text.
+
+    Args:
+    - G (networkx.Graph): The graph.
+    - method (str or callable): 'louvain' (default), 'leiden' (needs leidenalg and igraph,
+      otherwise falls back to Louvain), 'label_propagation' (fastest, near linear) or
+      'girvan_newman' (first split, quadratic or worse). A callable is called as
+      method(G, time_budget=..., seed=..., weight=..., resolution=...) and returns an iterable of node sets.
+    - time_budget (float or None): Seconds. Louvain stops after the level that exceeds the
+      budget, Leiden after the iteration and label propagation after the round that exceeds
+      it, each returning the partition reached so far. girvan_newman cannot stop early and
+      warns; a callable backend receives the budget and is responsible for it.
+    - seed (int or None): Random seed for reproducible partitions.
+    - weight (str): Edge attribute used as weight.
+    - resolution (float): Resolution for the modularity based methods.
+
+    Returns:
+    - list of sorted node lists, sorted, as colors2Community expects.
+    """
+    if G.number_of_nodes() == 0:
+        return []
+    if callable(method):
+        backend = method
+    elif method in community_backends:
+        backend = community_backends[method]
+    else:
+        raise ValueError(f"Unsupported community method '{method}'. Use one of {list(community_backends)} or a callable.")
+
+    start = time.time()
+    communities = backend(G, time_budget=time_budget, seed=seed, weight=weight, resolution=resolution)
+    communities = sorted(map(sorted, communities))
+    if verbatim:
+        print (f"Community detection ({method}): {len(communities)} communities in {time.time() - start:.2f} s")
+    return communities
+
+from scipy import sparse
+
+class ContextualProximityProvenance:
+    """
+    Lazy chunk-id provenance for the edges returned by contextual_proximity(..., provenance='lazy').
+    Calling it with two nodes returns the ids of the chunks in which both occur.
+    """
+    def __init__(self, incidence, nodes, chunk_ids):
+        self.incidence = incidence  # CSR, nodes x chunks, occurrence counts
+        self.incidence.sort_indices()
+        self.nodes = nodes
+        self.chunk_ids = chunk_ids
+        self.node_to_row = {node: i for i, node in enumerate(nodes)}
+
+    def _common_chunks(self, i, j):
+        A = self.incidence
+        return np.intersect1d(A.indices[A.indptr[i]:A.indptr[i + 1]], A.indices[A.indptr[j]:A.indptr[j + 1]],
+                              assume_unique=True)
+
+    def __call__(self, node_1, node_2):
+        i = self.node_to_row[node_1]
+        j = self.node_to_row[node_2]
+        return [self.chunk_ids[c] for c in self._common_chunks(i, j)]
+
+def _join_shared_chunk_ids(incidence, rows, cols, chunk_ids, batch_size=65536):
+    # Shared chunks of each requested pair from the intersection of the two sparse rows,
+    # A[rows] * A[cols] elementwise, in batches of pairs. The work is proportional to the
+    # rows of the requested pairs, never to all node pairs of every chunk.
+    names = np.asarray(chunk_ids, dtype=object).astype(str)
+    joined = []
+    for start in range(0, len(rows), batch_size):
+        shared = incidence[rows[start:start + batch_size]].multiply(incidence[cols[start:start + batch_size]]).tocsr()
+        shared.eliminate_zeros()
+        shared.sort_indices()  # chunk order within a pair
+        indptr = shared.indptr.tolist()
+        shared_names = names[shared.indices].tolist()
+        joined.extend(",".join(shared_names[indptr[k]:indptr[k + 1]]) for k in range(len(indptr) - 1))
+    return joined
+
+def contextual_proximity(df: pd.DataFrame, provenance='join') -> pd.DataFrame:
+    """
+    Link terms that occur in the same text chunk.
+
+    Pair counts come from a sparse node x chunk incidence matrix A as A A^T, so no per-chunk
+    node pairs are materialized. The count of (node_1, node_2) is the sum over chunks of the
+    product of their occurrences, in both directions; pairs with count 1 are dropped.
+
+    Args:
+    - df (pd.DataFrame): Triplets with columns node_1, node_2, edge, chunk_id.
+    - provenance (str): 'join' fills chunk_id with the comma-joined ids of the chunks shared by
+      the two nodes, each id once. (The earlier pandas self-join listed an id once per
+      co-occurrence, e.g. 'c1,c1,c1,c1' where it is now 'c1'; count is unchanged and still
+      counts co-occurrences, so it can be larger than the number of ids.) 'lazy' sets chunk_id
+      to "" and stores a ContextualProximityProvenance in dfg2.attrs['provenance'] to look the
+      ids up on demand.
+
+    Returns:
+    - pd.DataFrame with columns node_1, node_2, chunk_id, count, edge='contextual proximity'.
+    """
+    if provenance not in ('join', 'lazy'):
+        raise ValueError("provenance must be 'join' or 'lazy'")
     df['node_1'] = df['node_1'].astype(str)
     df['node_2'] = df['node_2'].astype(str)
     df['edge'] = df['edge'].astype(str)
-    dfg_long = pd.melt(
-        df, id_vars=["chunk_id"], value_vars=["node_1", "node_2"], value_name="node"
-    )
-    dfg_long.drop(columns=["variable"], inplace=True)
-    # Self join with chunk id as the key will create a link between terms occuring in the same text chunk.
-    dfg_wide = pd.merge(dfg_long, dfg_long, on="chunk_id", suffixes=("_1", "_2"))
-    # drop self loops
-    self_loops_drop = dfg_wide[dfg_wide["node_1"] == dfg_wide["node_2"]].index
-    dfg2 = dfg_wide.drop(index=self_loops_drop).reset_index(drop=True)
-    ## Group and count edges.
-    dfg2 = (
-        dfg2.groupby(["node_1", "node_2"])
-        .agg({"chunk_id": [",".join, "count"]})
-        .reset_index()
-    )
-    dfg2.columns = ["node_1", "node_2", "chunk_id", "count"]
-    dfg2.replace("", np.nan, inplace=True)
-    dfg2.dropna(subset=["node_1", "node_2"], inplace=True)
-    # Drop edges with 1 count
-    dfg2 = dfg2[dfg2["count"] != 1]
+    ## Node x chunk incidence, each triplet counts once for node_1 and once for node_2
+    long_nodes = np.concatenate([df['node_1'].to_numpy(), df['node_2'].to_numpy()])
+    long_chunks = np.concatenate([df['chunk_id'].to_numpy(), df['chunk_id'].to_numpy()])
+    keep = long_nodes != ""
+    node_codes, nodes = pd.factorize(long_nodes[keep])
+    chunk_codes, chunk_ids = pd.factorize(long_chunks[keep], use_na_sentinel=False)
+    incidence = sparse.csr_matrix((np.ones(len(node_codes), dtype=np.int64), (node_codes, chunk_codes)),
+                                  shape=(len(nodes), len(chunk_ids)))
+    ## Co-occurrence counts; drop self loops and edges with 1 count
+    cooccurrence = (incidence @ incidence.T).tocoo()
+    mask = (cooccurrence.row != cooccurrence.col) & (cooccurrence.data != 1)
+    rows = cooccurrence.row[mask]
+    cols = cooccurrence.col[mask]
+    counts = cooccurrence.data[mask]
+    order = np.lexsort((nodes[cols], nodes[rows])) if len(rows) > 0 else np.array([], dtype=np.int64)
+    rows, cols, counts = rows[order], cols[order], counts[order]
+
+    lookup = ContextualProximityProvenance(incidence, nodes, chunk_ids)
+    if provenance == 'join':
+        chunk_id = _join_shared_chunk_ids(incidence, rows, cols, chunk_ids)
+    else:
+        chunk_id = [""] * len(rows)
+    dfg2 = pd.DataFrame({"node_1": nodes[rows], "node_2": nodes[cols], "chunk_id": chunk_id,
+                         "count": counts.astype(np.int64)})
     dfg2["edge"] = "contextual proximity"
+    if provenance == 'lazy':
+        dfg2.attrs['provenance'] = lookup
     return dfg2
     
 def make_graph_from_text (txt,generate,
@@ -339,8 +742,22 @@ def make_graph_from_text (txt,generate,
                           data_dir='./data_output_KG/',
                           save_PDF=False,#TO DO
                           save_HTML=True,
+                          max_workers=1, max_in_flight=None, #concurrent chunk extraction, see df2Graph
+                          llm_cache=None, llm_model=None, #LLMResponseCache for generate calls, model name used in its keys
+                          regenerate=True, #False: build the graph from the checkpoint log (or saved CSV) without LLM calls
+                          checkpoint=False, resume=False, #log triplets per chunk as they finish; resume skips logged chunks (implies checkpoint)
+                          fast_path=True, #skip format-fix LLM calls for responses that parse locally
+                          community_method='louvain', community_time_budget=None, community_seed=None, #see detect_communities
+                          output_format='csv', #'parquet': write triplets, chunks, nodes and edges as Parquet instead of CSV/JSON
                          ):    
     
+    if llm_cache is not None:
+        generate = make_cached_generate(generate, llm_cache, model=llm_model)
+
+    # Checkpointing is opt-in: it writes {graph_root}_checkpoint.jsonl next to the outputs and
+    # uses md5 chunk ids (stable across runs) instead of random uuids
+    checkpoint = checkpoint or resume
+
     ## data directory
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)     
@@ -361,23 +778,62 @@ def make_graph_from_text (txt,generate,
     if verbatim:
         display(Markdown (pages[0]) )
     
-    df = documents2Dataframe(pages)
+    df = documents2Dataframe(pages, deterministic_ids=checkpoint or not regenerate)
 
-    ## To regenerate the graph with LLM, set this to True
-    regenerate = True
+    ## Triplets of every finished chunk are appended to this log, so a crashed run can resume
+    checkpoint_file = outputdirectory/f"{graph_root}_checkpoint.jsonl"
+    chunk_order = {chunk_id: i for i, chunk_id in enumerate(df['chunk_id'])}
     
     if regenerate:
-        concepts_list = df2Graph(df,generate,repeat_refine=repeat_refine,verbatim=verbatim) #model='zephyr:latest' )
+        done = {}
+        on_chunk_done = None
+        if checkpoint:
+            if not os.path.exists(outputdirectory):
+                os.makedirs(outputdirectory)
+            if resume:
+                done = {chunk_id: triplets for chunk_id, triplets in load_chunk_checkpoint(checkpoint_file).items()
+                        if chunk_id in chunk_order}
+                print (f"Resuming: {len(done)} of {len(df)} chunks already in checkpoint log.")
+            else:
+                open(checkpoint_file, 'w').close()
+            on_chunk_done = make_chunk_checkpoint_writer(checkpoint_file)
+        
+        df_todo = df[~df['chunk_id'].isin(done.keys())]
+        reset_graph_prompt_stats()
+        concepts_list = df2Graph(df_todo,generate,repeat_refine=repeat_refine,verbatim=verbatim,
+                                 max_workers=max_workers, max_in_flight=max_in_flight,
+                                 on_chunk_done=on_chunk_done, fast_path=fast_path) #model='zephyr:latest' )
+        stats = get_graph_prompt_stats()
+        print (f"\nParsed locally: {stats['fast_path']} of {stats['chunks']} chunks ({stats['fast_path_rate']:.0%}), "
+               f"format-fix calls made: {stats['repair_calls']}, skipped: {stats['repair_calls_skipped']}")
+        if llm_cache is not None:
+            print ("LLM cache: ", llm_cache.stats())
+        
+        # Restore chunk order across checkpointed and newly extracted triplets
+        concepts_list = [triplet for triplets in done.values() for triplet in triplets] + concepts_list
+        concepts_list.sort(key=lambda triplet: chunk_order.get(triplet.get('chunk_id'), len(chunk_order)))
         dfg1 = graph2Df(concepts_list)
         if not os.path.exists(outputdirectory):
             os.makedirs(outputdirectory)
         
-        dfg1.to_csv(outputdirectory/f"{graph_root}_graph.csv", sep="|", index=False)
-        df.to_csv(outputdirectory/f"{graph_root}_chunks.csv", sep="|", index=False)
-        dfg1.to_csv(outputdirectory/f"{graph_root}_graph_clean.csv", #sep="|", index=False
-                   )
-        df.to_csv(outputdirectory/f"{graph_root}_chunks_clean.csv", #sep="|", index=False
-                 )
+        if output_format == 'parquet':
+            save_parquet_table(dfg1, outputdirectory/f"{graph_root}_graph.parquet")
+            save_parquet_table(df, outputdirectory/f"{graph_root}_chunks.parquet")
+        else:
+            dfg1.to_csv(outputdirectory/f"{graph_root}_graph.csv", sep="|", index=False)
+            df.to_csv(outputdirectory/f"{graph_root}_chunks.csv", sep="|", index=False)
+            dfg1.to_csv(outputdirectory/f"{graph_root}_graph_clean.csv", #sep="|", index=False
+                       )
+            df.to_csv(outputdirectory/f"{graph_root}_chunks_clean.csv", #sep="|", index=False
+                     )
+    elif os.path.exists(checkpoint_file):
+        done = load_chunk_checkpoint(checkpoint_file)
+        print (f"Loaded {len(done)} chunks from checkpoint log, {len(set(done) & set(chunk_order))} of them match the text provided.")
+        concepts_list = [triplet for chunk_id in sorted(done, key=lambda c: chunk_order.get(c, len(chunk_order)))
+                         for triplet in done[chunk_id]]
+        dfg1 = graph2Df(concepts_list)
+    elif os.path.exists(outputdirectory/f"{graph_root}_graph.parquet"):
+        dfg1 = load_parquet_table(outputdirectory/f"{graph_root}_graph.parquet")
     else:
         dfg1 = pd.read_csv(outputdirectory/f"{graph_root}_graph.csv", sep="|")
     
@@ -390,73 +846,46 @@ def make_graph_from_text (txt,generate,
     dfg1.head()### 
     
     if include_contextual_proximity:
-        dfg2 = contextual_proximity(dfg1)
+        # chunk ids of proximity edges are not used below, look them up lazily instead of joining strings
+        dfg2 = contextual_proximity(dfg1, provenance='lazy')
         dfg = pd.concat([dfg1, dfg2], axis=0)
         #dfg2.tail()
     else:
         dfg=dfg1
         
     
-    dfg = (
-        dfg.groupby(["node_1", "node_2"])
-        .agg({"chunk_id": ",".join, "edge": ','.join, 'count': 'sum'})
-        .reset_index()
-    )
+    dfg = aggregate_triplets(dfg)
     #dfg
         
     nodes = pd.concat([dfg['node_1'], dfg['node_2']], axis=0).unique()
     print ("Nodes shape: ", nodes.shape)
     
+    ## Add nodes, then all edges in one bulk call
     G = nx.Graph()
-    node_list=[]
-    node_1_list=[]
-    node_2_list=[]
-    title_list=[]
-    weight_list=[]
-    chunk_id_list=[]
-    
-    ## Add nodes to the graph
-    for node in nodes:
-        G.add_node(
-            str(node)
-        )
-        node_list.append (node)
-    
-    ## Add edges to the graph
-    for _, row in dfg.iterrows():
-        
-        G.add_edge(
-            str(row["node_1"]),
-            str(row["node_2"]),
-            title=row["edge"],
-            weight=row['count']/4
-        )
-        
-        node_1_list.append (row["node_1"])
-        node_2_list.append (row["node_2"])
-        title_list.append (row["edge"])
-        weight_list.append (row['count']/4)
-         
-        chunk_id_list.append (row['chunk_id'] )
+    G.add_nodes_from(map(str, nodes))
+    graph_from_triplets(dfg, G)
 
     try:
             
-        df_nodes = pd.DataFrame({"nodes": node_list} )    
-        df_nodes.to_csv(f'{data_dir}/{graph_root}_nodes.csv')
-        df_nodes.to_json(f'{data_dir}/{graph_root}_nodes.json')
-        
-        df_edges = pd.DataFrame({"node_1": node_1_list, "node_2": node_2_list,"edge_list": title_list, "weight_list": weight_list } )    
-        df_edges.to_csv(f'{data_dir}/{graph_root}_edges.csv')
-        df_edges.to_json(f'{data_dir}/{graph_root}_edges.json')
+        df_nodes = pd.DataFrame({"nodes": nodes} )    
+        # Edge table straight from the aggregated frame the graph was built from
+        df_edges = pd.DataFrame({"node_1": dfg['node_1'], "node_2": dfg['node_2'],
+                                 "edge_list": dfg['edge'], "weight_list": dfg['count']/4} )    
+        if output_format == 'parquet':
+            save_parquet_table(df_nodes, f'{data_dir}/{graph_root}_nodes.parquet')
+            save_parquet_table(df_edges, f'{data_dir}/{graph_root}_edges.parquet')
+        else:
+            df_nodes.to_csv(f'{data_dir}/{graph_root}_nodes.csv')
+            df_nodes.to_json(f'{data_dir}/{graph_root}_nodes.json')
+            df_edges.to_csv(f'{data_dir}/{graph_root}_edges.csv')
+            df_edges.to_json(f'{data_dir}/{graph_root}_edges.json')
         
     except:
         
         print ("Error saving CSV/JSON files.")
     
-    communities_generator = nx.community.girvan_newman(G)
-    #top_level_communities = next(communities_generator)
-    next_level_communities = next(communities_generator)
-    communities = sorted(map(sorted, next_level_communities))
+    communities = detect_communities(G, method=community_method, time_budget=community_time_budget,
+                                     seed=community_seed, verbatim=verbatim)
     
     if verbatim:
         print("Number of Communities = ", len(communities))
@@ -519,7 +948,15 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
                                do_Louvain_on_new_graph=True,include_contextual_proximity=False,repeat_refine=0,similarity_threshold=0.95, do_simplify_graph=True,#whether or not to simplify, uses similiraty_threshold defined above
                                return_only_giant_component=False,
                                save_common_graph=False,G_to_add=None,graph_GraphML_to_add=None,
+                               merger=None,
                               ):
+    # With merger=IncrementalGraphMerger(...) the base graph, its embeddings and the IVF index stay in
+    # memory: original_graph_path_and_fname, node_embeddings and similarity_threshold are taken from the
+    # merger, only the new nodes are embedded and matched, merges/fragment removal are local and new nodes
+    # inherit the Louvain group of their neighbours. G_new and node_embeddings are the merger's own graph and dict.
+    # The merger merges in place, so the returned G (the original graph) is then merger.G as well, the same
+    # object as G_new; copy merger.G beforehand to keep the graph as it was. Without a merger, G is the
+    # original graph as loaded and G_new a new graph.
 
     display (Markdown(txt[:256]+"...."))
     graph_GraphML=None
@@ -535,7 +972,7 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
         if verbatim:
             print ("Now create or load new graph...")
 
-        if graph_GraphML_to_add==None and G_newlymade==None: #make new if no existing one provided
+        if graph_GraphML_to_add==None and G_to_add==None: #make new if no existing one provided
             print ("Make new graph from text...")
             _, graph_GraphML_to_add, G_to_add, _, _ =make_graph_from_text (txt,generate,
                                       include_contextual_proximity=include_contextual_proximity,
@@ -562,10 +999,11 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
         print ("ALERT: Graph generation failed...for idx=",idx)
     
     print ("Now add node to existing graph...")
+    graph_root=f'graph'
     
     try:
-        #Load original graph
-        G = nx.read_graphml(original_graph_path_and_fname)
+        #Load original graph (GraphML or binary snapshot, see read_graph), or use the one kept by the merger
+        G = merger.G if merger is not None else read_graph(original_graph_path_and_fname)
         
         if G_to_add!=None:
             G_loaded=H = deepcopy(G_to_add)
@@ -574,44 +1012,54 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
         else:
             if verbatim:
                 print ("Loading graph to be added either newly generated or provided.")
-            G_loaded = nx.read_graphml(graph_GraphML_to_add)
+            G_loaded = read_graph(graph_GraphML_to_add)
         
         res_newgraph=graph_statistics_and_plots_for_large_graphs(G_loaded, data_dir=data_dir_output,include_centrality=False,
                                                        make_graph_plot=False,root='new_graph')
         print (res_newgraph)
         
-        G_new = nx.compose(G,G_loaded)
-
         if save_common_graph:
             print ("Identify common nodes and save...")
             try:
                 
                 common_nodes = set(G.nodes()).intersection(set(G_loaded.nodes()))
     
-                subgraph = G_new.subgraph(common_nodes)
+                subgraph = nx.compose(G.subgraph(common_nodes), G_loaded.subgraph(common_nodes))
                 graph_GraphML=  f'{data_dir_output}/{graph_root}_common_nodes_before_simple.graphml' 
                 nx.write_graphml(subgraph, graph_GraphML)
             except: 
                 print ("Common nodes identification failed.")
             print ("Done!")
-        
-        if verbatim:
-            print ("Now update node embeddings")
-        node_embeddings=update_node_embeddings(node_embeddings, G_new, tokenizer, model)
-        print ("Done update node embeddings.")
-        if do_simplify_graph:
+
+        if merger is not None:
             if verbatim:
-                print ("Now simplify graph.")
-            G_new, node_embeddings =simplify_graph (G_new, node_embeddings, tokenizer, model , 
-                                                    similarity_threshold=similarity_threshold, use_llm=False, data_dir_output=data_dir_output,
-                                    verbatim=verbatim,)
+                print ("Now merge new graph incrementally")
+            merger.merge(G_loaded, simplify=do_simplify_graph, size_threshold=size_threshold,
+                         assign_communities=do_Louvain_on_new_graph, data_dir_output=data_dir_output,
+                         graph_root=f'{graph_root}_incremental')
+            G_new, node_embeddings = merger.G, merger.node_embeddings
+        else:
+            G_new = nx.compose(G,G_loaded)
+        
             if verbatim:
-                print ("Done simplify graph.")
+                print ("Now update node embeddings")
+            # simplify_graph returns a new dict, so an overlay suffices for the intermediate embeddings
+            node_embeddings=update_node_embeddings(node_embeddings, G_new, tokenizer, model,
+                                                   copy_on_write=do_simplify_graph)
+            print ("Done update node embeddings.")
+            if do_simplify_graph:
+                if verbatim:
+                    print ("Now simplify graph.")
+                G_new, node_embeddings =simplify_graph (G_new, node_embeddings, tokenizer, model , 
+                                                        similarity_threshold=similarity_threshold, use_llm=False, data_dir_output=data_dir_output,
+                                        verbatim=verbatim,)
+                if verbatim:
+                    print ("Done simplify graph.")
             
         if verbatim:
             print ("Done update graph")
         
-        if size_threshold >0:
+        if size_threshold >0 and merger is None:
             if verbatim:
                 print ("Remove small fragments")            
             G_new=remove_small_fragents (G_new, size_threshold=size_threshold)
@@ -621,11 +1069,14 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
             if verbatim:
                 print ("Select only giant component...")   
             connected_components = sorted(nx.connected_components(G_new), key=len, reverse=True)
-            G_new = G_new.subgraph(connected_components[0]).copy()
-            node_embeddings=update_node_embeddings(node_embeddings, G_new, tokenizer, model, verbatim=verbatim)
+            if merger is not None:
+                merger.remove_nodes(set().union(*connected_components[1:]))
+            else:
+                G_new = G_new.subgraph(connected_components[0]).copy()
+                node_embeddings=update_node_embeddings(node_embeddings, G_new, tokenizer, model, verbatim=verbatim)
             
         print (".")
-        if do_Louvain_on_new_graph:
+        if do_Louvain_on_new_graph and merger is None:
             G_new=graph_Louvain (G_new, 
                       graph_GraphML=None)
             if verbatim:
@@ -633,7 +1084,6 @@ def add_new_subgraph_from_text(txt,generate,node_embeddings,tokenizer, model,
 
         print (".")
          
-        graph_root=f'graph'
         graph_GraphML=  f'{data_dir_output}/{graph_root}_augmented_graphML_integrated.graphml'  #  f'{data_dir}/resulting_graph.graphml',
         print (".")
         nx.write_graphml(G_new, graph_GraphML)
@@ -0,0 +1,526 @@
+import os
+import json
+import weakref
+
+import numpy as np
+import networkx as nx
+
+# Compact binary snapshots of networkx graphs.
+#
+# A snapshot holds a node string table (UTF-8 bytes + offsets), the edge list, a CSR
+# adjacency (indptr/indices, plus the edge id of every entry) and one typed column per
+# node and edge attribute (bool, int, float, str, or JSON for lists/dicts). It is written
+# either as a single .npz file or as a directory of .npy files ('.snapshot'), which can be
+# memory-mapped:
+#
+#   save_graph_snapshot(G, 'graph.snapshot')
+#   G = load_graph_snapshot('graph.snapshot')                      # networkx graph
+#   S = load_graph_snapshot('graph.snapshot', mmap=True, as_networkx=False)
+#   S.neighbors('silk')                                             # straight from the CSR arrays
+#   S.shortest_path_indices(S.node_to_index['silk'], S.node_to_index['graphene'])
+#
+# GraphML (nx.write_graphml) remains the export format for Gephi and other tools.
+
+SNAPSHOT_VERSION = 1
+
+def _encode_strings(values):
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return data, offsets
+
+def _decode_strings(data, offsets):
+    buffer = np.asarray(data).tobytes()
+    offsets = np.asarray(offsets).tolist()
+    return [buffer[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+def _column_kind(values):
+    # Narrowest type that holds every (present) value of an attribute
+    if all(isinstance(value, (bool, np.bool_)) for value in values):
+        return 'bool'
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in values):
+        if all(-2**63 <= value < 2**63 for value in values):
+            return 'int'
+        return 'json'
+    if all(isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+           for value in values):
+        return 'float'
+    if all(isinstance(value, str) for value in values):
+        return 'str'
+    return 'json'
+
+def _encode_column(records, key, prefix, arrays):
+    # records: list of attribute dicts; writes {prefix}_present/_values(/_offsets) into arrays
+    present = np.array([key in record for record in records], dtype=bool)
+    values = [record[key] for record in records if key in record]
+    kind = _column_kind(values)
+    if not present.all():
+        arrays[f'{prefix}_present'] = present
+    if kind in ('bool', 'int', 'float'):
+        dtype = {'bool': bool, 'int': np.int64, 'float': np.float64}[kind]
+        column = np.zeros(len(records), dtype=dtype)
+        column[present] = np.asarray(values, dtype=dtype)
+        arrays[f'{prefix}_values'] = column
+    else:
+        if kind == 'json':
+            values = [json.dumps(value, default=str) for value in values]
+        strings = [''] * len(records)
+        for i, value in zip(np.flatnonzero(present).tolist(), values):
+            strings[i] = value
+        arrays[f'{prefix}_values'], arrays[f'{prefix}_offsets'] = _encode_strings(strings)
+    return kind
+
+def _decode_column(arrays, prefix, kind, n):
+    # Returns a list of length n, None where the attribute is missing
+    present = arrays[f'{prefix}_present'] if f'{prefix}_present' in arrays else None
+    if kind in ('bool', 'int', 'float'):
+        values = np.asarray(arrays[f'{prefix}_values']).tolist()
+    else:
+        values = _decode_strings(arrays[f'{prefix}_values'], arrays[f'{prefix}_offsets'])
+        if kind == 'json':
+            values = [json.loads(value) if value != '' else None for value in values]
+    if present is not None:
+        values = [value if is_present else None for value, is_present in zip(values, np.asarray(present).tolist())]
+    return values
+
+def _snapshot_paths(file_path):
+    file_path = str(file_path)
+    return file_path, not file_path.endswith('.npz')
+
+def is_snapshot_path(file_path):
+    """
+    True for paths in snapshot format: '.npz' files, '.snapshot' directories or existing directories.
+    """
+    file_path = str(file_path)
+    return file_path.endswith('.npz') or file_path.endswith('.snapshot') or os.path.isdir(file_path)
+
+class GraphSnapshot:
+    """
+    Read-only graph in CSR form, as stored in a snapshot.
+
+    Node names and attribute columns are decoded on first use, so a memory-mapped snapshot
+    can answer neighbors()/degree() without building a networkx graph.
+
+    Attributes:
+    - directed (bool)
+    - indptr, indices (np.ndarray): CSR adjacency over node positions (successors for directed graphs).
+    - edge_ids (np.ndarray): Edge id (position in edge_src/edge_dst) of every CSR entry.
+    - edge_src, edge_dst (np.ndarray): Edge list as node positions.
+    """
+
+    def __init__(self, arrays, meta):
+        self._arrays = arrays
+        self.meta = meta
+        self.directed = meta['directed']
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.edge_ids = arrays['edge_ids']
+        self.edge_src = arrays['edge_src']
+        self.edge_dst = arrays['edge_dst']
+        self._nodes = None
+        self._node_to_index = None
+        self._columns = {}
+        self._degrees = None
+        self._reverse = None
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            if self.meta['node_kind'] == 'int':
+                self._nodes = np.asarray(self._arrays['node_ids']).tolist()
+            else:
+                self._nodes = _decode_strings(self._arrays['node_strings'], self._arrays['node_offsets'])
+        return self._nodes
+
+    @property
+    def node_to_index(self):
+        if self._node_to_index is None:
+            self._node_to_index = {node: i for i, node in enumerate(self.nodes)}
+        return self._node_to_index
+
+    def number_of_nodes(self):
+        return len(self.indptr) - 1
+
+    def number_of_edges(self):
+        return len(self.edge_src)
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def __contains__(self, node):
+        return node in self.node_to_index
+
+    def neighbor_indices(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbors(self, node):
+        nodes = self.nodes
+        return [nodes[j] for j in np.asarray(self.neighbor_indices(self.node_to_index[node])).tolist()]
+
+    def degree(self, node):
+        """
+        Degree as networkx counts it (self loops twice); out-degree for directed graphs.
+        """
+        return int(self.degrees()[self.node_to_index[node]])
+
+    def degrees(self):
+        if self._degrees is None:
+            degrees = np.diff(self.indptr)
+            if not self.directed:
+                loops = np.asarray(self.edge_src)[np.asarray(self.edge_src) == np.asarray(self.edge_dst)]
+                degrees = degrees + np.bincount(loops, minlength=len(degrees))
+            self._degrees = degrees
+        return self._degrees
+
+    def reverse_csr(self):
+        """
+        (indptr, indices) over predecessors; the CSR itself for undirected graphs.
+        """
+        if not self.directed:
+            return self.indptr, self.indices
+        if self._reverse is None:
+            src = np.asarray(self.edge_src)
+            dst = np.asarray(self.edge_dst)
+            indptr = np.zeros(self.number_of_nodes() + 1, dtype=np.int64)
+            np.cumsum(np.bincount(dst, minlength=self.number_of_nodes()), out=indptr[1:])
+            self._reverse = (indptr, src[np.argsort(dst, kind='stable')])
+        return self._reverse
+
+    def expand(self, rows, reverse=False):
+        """
+        CSR entries of many nodes at once, without a Python loop over the nodes.
+
+        Args:
+        - rows (array of int): Node positions.
+        - reverse (bool): Follow edges backwards (predecessors) on directed graphs.
+
+        Returns:
+        - (sources, targets): Parallel int64 arrays with one entry per edge leaving a node
+          in rows, grouped by source in the order of rows.
+        """
+        indptr, indices = self.reverse_csr() if reverse else (self.indptr, self.indices)
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.asarray(indptr[rows], dtype=np.int64)
+        lengths = np.asarray(indptr[rows + 1], dtype=np.int64) - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        # position of every entry: start of its row + offset within the row
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        return np.repeat(rows, lengths), np.asarray(indices[offsets], dtype=np.int64)
+
+    def shortest_path_indices(self, source, target):
+        """
+        Unweighted shortest path between two node positions, by bidirectional BFS.
+
+        Each step expands a whole BFS level of the smaller frontier with expand(), so hubs cost
+        one vectorized gather instead of a Python loop over their neighbors. Returns the path
+        as a list of node positions, or None if target is not reachable.
+        """
+        if source == target:
+            return [source]
+        n = self.number_of_nodes()
+        dist = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+        parent = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+        dist[0][source] = 0
+        dist[1][target] = 0
+        frontiers = [np.array([source], dtype=np.int64), np.array([target], dtype=np.int64)]
+        while len(frontiers[0]) and len(frontiers[1]):
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            sources, targets = self.expand(frontiers[side], reverse=side == 1)
+            new = dist[side][targets] < 0
+            targets, first = np.unique(targets[new], return_index=True)
+            sources = sources[new][first]
+            dist[side][targets] = dist[side][sources] + 1
+            parent[side][targets] = sources
+            # all nodes of this level are equally far from this side, so the best meeting
+            # node is the one closest to the other side
+            meet = targets[dist[1 - side][targets] >= 0]
+            if len(meet):
+                best = int(meet[np.argmin(dist[1 - side][meet])])
+                path = [best]
+                while parent[0][path[-1]] >= 0:
+                    path.append(int(parent[0][path[-1]]))
+                path.reverse()
+                while parent[1][path[-1]] >= 0:
+                    path.append(int(parent[1][path[-1]]))
+                return path
+            frontiers[side] = targets
+        return None
+
+    def _cap_neighbors(self, sources, targets, max_neighbors, rng):
+        # Keep at most max_neighbors entries per source. Weighted sampling without replacement
+        # (Efraimidis-Spirakis keys, weight 1/degree), so a hub keeps its more specific,
+        # low-degree neighbors rather than other hubs.
+        keys = np.log(rng.random(len(targets))) * np.maximum(self.degrees()[targets], 1)
+        order = np.lexsort((-keys, sources))
+        sorted_sources = sources[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_sources, sorted_sources, side='left')
+        keep = np.sort(order[rank < max_neighbors])
+        return sources[keep], targets[keep]
+
+    def k_hop_indices(self, seeds, k=2, max_neighbors=None, seed=None):
+        """
+        Node positions within k hops of the seeds (seeds included), one vectorized expand() per hop.
+
+        Args:
+        - seeds (array of int): Node positions to start from, e.g. a path.
+        - k (int): Number of hops.
+        - max_neighbors (int or None): Expand at most this many neighbors per node, sampled
+          with preference for low-degree neighbors. None expands every neighbor.
+        - seed (int or None): Random seed for the sampling.
+
+        Returns:
+        - Sorted int64 array of node positions.
+        """
+        rng = np.random.default_rng(seed)
+        seen = np.zeros(self.number_of_nodes(), dtype=bool)
+        frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+        seen[frontier] = True
+        for _ in range(k):
+            sources, targets = self.expand(frontier)
+            if max_neighbors is not None:
+                sources, targets = self._cap_neighbors(sources, targets, max_neighbors, rng)
+            frontier = np.unique(targets[~seen[targets]])
+            if not len(frontier):
+                break
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def node_attribute(self, key):
+        """
+        Values of a node attribute in node order, None where missing.
+        """
+        return self._column('node', key)
+
+    def edge_attribute(self, key):
+        """
+        Values of an edge attribute in edge order, None where missing.
+        """
+        return self._column('edge', key)
+
+    def _column(self, owner, key):
+        if (owner, key) not in self._columns:
+            specs = self.meta[f'{owner}_attributes']
+            position = [spec['key'] for spec in specs].index(key)
+            n = self.number_of_nodes() if owner == 'node' else self.number_of_edges()
+            self._columns[(owner, key)] = _decode_column(self._arrays, f'{owner}_attr{position}',
+                                                         specs[position]['kind'], n)
+        return self._columns[(owner, key)]
+
+    def _records(self, owner, skip=()):
+        n = self.number_of_nodes() if owner == 'node' else self.number_of_edges()
+        records = [{} for _ in range(n)]
+        for spec in self.meta[f'{owner}_attributes']:
+            if spec['key'] in skip:
+                continue
+            for record, value in zip(records, self._column(owner, spec['key'])):
+                if value is not None:
+                    record[spec['key']] = value
+        return records
+
+    def to_networkx(self, skip_attributes=()):
+        """
+        Build the networkx graph, optionally without the attributes named in skip_attributes.
+        """
+        G = nx.DiGraph() if self.directed else nx.Graph()
+        G.graph.update(self.meta.get('graph_attributes', {}))
+        nodes = self.nodes
+        G.add_nodes_from(zip(nodes, self._records('node', skip_attributes)))
+        G.add_edges_from(zip([nodes[i] for i in np.asarray(self.edge_src).tolist()],
+                             [nodes[i] for i in np.asarray(self.edge_dst).tolist()],
+                             self._records('edge', skip_attributes)))
+        return G
+
+    @classmethod
+    def from_networkx(cls, G, attributes=True):
+        """
+        Snapshot of a networkx graph; with attributes=False only the structure is kept
+        (cheaper when the graph carries large node texts and only the adjacency is needed).
+        """
+        if G.is_multigraph():
+            raise TypeError("Graph snapshots do not support multigraphs.")
+        nodes = list(G.nodes())
+        node_to_index = {node: i for i, node in enumerate(nodes)}
+        arrays = {}
+        if all(isinstance(node, str) for node in nodes):
+            node_kind = 'str'
+            arrays['node_strings'], arrays['node_offsets'] = _encode_strings(nodes)
+        elif all(isinstance(node, (int, np.integer)) and not isinstance(node, (bool, np.bool_)) for node in nodes):
+            node_kind = 'int'
+            arrays['node_ids'] = np.asarray(nodes, dtype=np.int64)
+        else:
+            raise TypeError("Graph snapshots support string or integer node ids.")
+
+        edges = list(G.edges(data=True)) if attributes else list(G.edges())
+        src = np.fromiter((node_to_index[edge[0]] for edge in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((node_to_index[edge[1]] for edge in edges), dtype=np.int64, count=len(edges))
+        index_dtype = np.int32 if len(nodes) < 2**31 else np.int64
+        arrays['edge_src'] = src.astype(index_dtype)
+        arrays['edge_dst'] = dst.astype(index_dtype)
+
+        # CSR adjacency; undirected edges appear in both rows (self loops once)
+        edge_ids = np.arange(len(edges), dtype=np.int64)
+        if G.is_directed():
+            rows, cols, ids = src, dst, edge_ids
+        else:
+            reverse = src != dst
+            rows = np.concatenate([src, dst[reverse]])
+            cols = np.concatenate([dst, src[reverse]])
+            ids = np.concatenate([edge_ids, edge_ids[reverse]])
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(nodes)), out=indptr[1:])
+        arrays['indptr'] = indptr
+        arrays['indices'] = cols[order].astype(index_dtype)
+        arrays['edge_ids'] = ids[order]
+
+        meta = {'version': SNAPSHOT_VERSION, 'directed': G.is_directed(), 'node_kind': node_kind,
+                'graph_attributes': json.loads(json.dumps(G.graph, default=str)),
+                'node_attributes': [], 'edge_attributes': []}
+        if not attributes:
+            snapshot = cls(arrays, meta)
+            snapshot._nodes = nodes
+            snapshot._node_to_index = node_to_index
+            return snapshot
+        node_records = [data for _, data in G.nodes(data=True)]
+        edge_records = [data for _, _, data in edges]
+        for owner, records in (('node', node_records), ('edge', edge_records)):
+            keys = list(dict.fromkeys(key for record in records for key in record))
+            for position, key in enumerate(keys):
+                kind = _encode_column(records, key, f'{owner}_attr{position}', arrays)
+                meta[f'{owner}_attributes'].append({'key': key, 'kind': kind})
+        return cls(arrays, meta)
+
+    def save(self, file_path, compress=False):
+        file_path, as_directory = _snapshot_paths(file_path)
+        arrays = {name: np.asarray(self._arrays[name]) for name in self._arrays}
+        if as_directory:
+            os.makedirs(file_path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(file_path, f'{name}.npy'), array)
+            with open(os.path.join(file_path, 'meta.json'), 'w') as f:
+                json.dump(self.meta, f)
+        else:
+            arrays['meta'] = np.frombuffer(json.dumps(self.meta).encode('utf-8'), dtype=np.uint8)
+            (np.savez_compressed if compress else np.savez)(file_path, **arrays)
+        return file_path
+
+    @classmethod
+    def load(cls, file_path, mmap=False):
+        file_path, as_directory = _snapshot_paths(file_path)
+        if as_directory:
+            with open(os.path.join(file_path, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+            arrays = {}
+            for name in os.listdir(file_path):
+                if name.endswith('.npy'):
+                    arrays[name[:-4]] = np.load(os.path.join(file_path, name), mmap_mode='r' if mmap else None)
+        else:
+            with np.load(file_path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            meta = json.loads(arrays.pop('meta').tobytes().decode('utf-8'))
+        if meta.get('version', 1) > SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {meta['version']} is newer than supported ({SNAPSHOT_VERSION}).")
+        return cls(arrays, meta)
+
+# Structure-only snapshots of in-memory graphs, for path queries: {G: (structure version, snapshot)}.
+# Graphs are weakly referenced, so a cached snapshot never keeps its graph alive.
+_adjacency_cache = weakref.WeakKeyDictionary()
+_ADJACENCY_CACHE_SIZE = 4
+
+def _structure_version(G):
+    # networkx graphs have no mutation counter. The number of nodes and of adjacency entries
+    # (summed at C speed, unlike G.number_of_edges()) change whenever a node or edge is added or removed.
+    return G.number_of_nodes(), sum(map(len, G._adj.values()))
+
+def get_adjacency_snapshot(G):
+    """
+    CSR snapshot of G's structure (no attributes), built once per graph and reused.
+
+    The cached snapshot is rebuilt when nodes or edges of G were added or removed since, as seen
+    from the number of nodes and of adjacency entries. A change that leaves both unchanged (e.g.
+    one edge removed and another one added) is not detected: call invalidate_adjacency_snapshot(G)
+    after it. Building a snapshot costs about as much as copying the adjacency of G, so it pays
+    off for repeated queries only.
+    A GraphSnapshot is returned as is.
+    """
+    if isinstance(G, GraphSnapshot):
+        return G
+    version = _structure_version(G)
+    try:
+        entry = _adjacency_cache.get(G)
+    except TypeError:
+        # not weakly referenceable: no caching
+        return GraphSnapshot.from_networkx(G, attributes=False)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    snapshot = GraphSnapshot.from_networkx(G, attributes=False)
+    _adjacency_cache.pop(G, None)
+    while len(_adjacency_cache) >= _ADJACENCY_CACHE_SIZE:
+        _adjacency_cache.pop(next(iter(_adjacency_cache.keys())), None)
+    _adjacency_cache[G] = (version, snapshot)
+    return snapshot
+
+def invalidate_adjacency_snapshot(G=None):
+    """
+    Drop the cached adjacency snapshot of G (of all graphs if G is None).
+    """
+    if G is None:
+        _adjacency_cache.clear()
+    else:
+        try:
+            _adjacency_cache.pop(G, None)
+        except TypeError:
+            pass
+
+def save_graph_snapshot(G, file_path, compress=False):
+    """
+    Save a networkx graph as a binary snapshot.
+
+    Args:
+    - G (networkx.Graph or DiGraph): Graph with string or integer node ids.
+    - file_path (str): '.npz' for a single file, otherwise a directory of .npy files
+      (e.g. 'graph.snapshot') that load_graph_snapshot can memory-map.
+    - compress (bool): Compress the .npz file.
+
+    Returns:
+    - file_path
+    """
+    return GraphSnapshot.from_networkx(G).save(file_path, compress=compress)
+
+def load_graph_snapshot(file_path, mmap=False, as_networkx=True, skip_attributes=()):
+    """
+    Load a graph saved by save_graph_snapshot.
+
+    Args:
+    - file_path (str): Snapshot file or directory.
+    - mmap (bool): Memory-map the arrays (directory snapshots only).
+    - as_networkx (bool): Return a networkx graph; if False, return the GraphSnapshot itself.
+    - skip_attributes (iterable): Node/edge attributes not to load into the networkx graph, e.g. ('texts',).
+
+    Returns:
+    - networkx.Graph/DiGraph or GraphSnapshot
+    """
+    snapshot = GraphSnapshot.load(file_path, mmap=mmap)
+    if as_networkx:
+        return snapshot.to_networkx(skip_attributes=skip_attributes)
+    return snapshot
+
+def read_graph(file_path, **kwargs):
+    """
+    Read a graph from GraphML or from a snapshot, depending on the path (see is_snapshot_path).
+    """
+    if is_snapshot_path(file_path):
+        return load_graph_snapshot(file_path, **kwargs)
+    return nx.read_graphml(file_path)
+
+def write_graph(G, file_path):
+    """
+    Write a graph as GraphML or as a snapshot, depending on the path (see is_snapshot_path).
+    """
+    if is_snapshot_path(file_path):
+        return save_graph_snapshot(G, file_path)
+    nx.write_graphml(G, file_path)
+    return file_path
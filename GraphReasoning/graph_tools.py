@@ -111,72 +111,567 @@ import seaborn as sns  # For more attractive plotting
 
 from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
-  
+
+from GraphReasoning.embedding_cache import EmbeddingCache, embedding_model_key, get_embedding_cache, set_embedding_cache
+from GraphReasoning.text_store import TextStore, get_text_store, node_texts, externalize_texts, internalize_texts
+
+def embed_texts(texts, tokenizer, model, batch_size=64, verbatim=False, cache=None):
+    """
+    Batched embedding engine: mean-pooled last hidden state for a list of strings.
+
+    Texts are bucketed by token length so that each batch carries little padding,
+    the pooling ignores padded positions, and the forward pass runs under
+    torch.inference_mode. The result matches embedding each text on its own
+    (the original one-by-one loop) within float tolerance.
+
+    If an EmbeddingCache is given (or set globally with set_embedding_cache), texts are
+    looked up there first and only the misses are run through the model.
+
+    Args:
+    - texts (list of str): Strings to embed.
+    - tokenizer: Tokenizer object to tokenize the strings.
+    - model: Model object to generate embeddings.
+    - batch_size (int): Number of strings per forward pass.
+    - verbatim (bool): Show a progress bar over batches.
+    - cache (EmbeddingCache or None): Embedding cache, defaults to the global one.
+
+    Returns:
+    - np.ndarray of shape (len(texts), d), float32, rows in input order.
+    """
+    texts = [str(text) for text in texts]
+    if len(texts) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    if cache is None:
+        cache = get_embedding_cache()
+    if cache is None:
+        return _embed_texts_batched(texts, tokenizer, model, batch_size=batch_size, verbatim=verbatim)
+
+    model_name, tokenizer_name = embedding_model_key(tokenizer, model)
+    vectors = [None] * len(texts)
+    for position, vector in cache.get_many(texts, model_name, tokenizer_name).items():
+        vectors[position] = vector
+
+    # Embed each missing text once, even if it occurs several times
+    missing = {}
+    for position, text in enumerate(texts):
+        if vectors[position] is None:
+            missing.setdefault(text, []).append(position)
+    if missing:
+        missing_texts = list(missing.keys())
+        new_vectors = _embed_texts_batched(missing_texts, tokenizer, model, batch_size=batch_size, verbatim=verbatim)
+        cache.put_many(missing_texts, new_vectors, model_name, tokenizer_name)
+        for text, vector in zip(missing_texts, new_vectors):
+            for position in missing[text]:
+                vectors[position] = vector
+
+    return np.stack(vectors).astype(np.float32, copy=False)
+
+def _embed_texts_batched(texts, tokenizer, model, batch_size=64, verbatim=False):
+    # Tokenizers without a pad token (e.g. GPT-style) cannot pad, so they get one text per batch
+    padding = getattr(tokenizer, 'pad_token', None) is not None
+    if not padding:
+        batch_size = 1
+
+    # Length-sorted bucketing: similar lengths end up in the same batch
+    lengths = [len(ids) for ids in tokenizer(texts)['input_ids']]
+    order = np.argsort(lengths, kind='stable')
+
+    device = getattr(model, 'device', None)
+    vectors = [None] * len(texts)
+    batches = range(0, len(texts), batch_size)
+    if verbatim:
+        batches = tqdm(batches, desc="Embedding batches")
+
+    with torch.inference_mode():
+        for start in batches:
+            idx = order[start:start + batch_size]
+            inputs = tokenizer([texts[i] for i in idx], return_tensors="pt", padding=padding)
+            if device is not None:
+                inputs = inputs.to(device)
+            outputs = model(**inputs)
+
+            # Padding-aware mean pooling over the sequence dimension
+            mask = inputs.get('attention_mask')
+            if mask is None:
+                mask = torch.ones(outputs.last_hidden_state.shape[:2], device=outputs.last_hidden_state.device)
+            mask = mask.unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            pooled = summed / mask.sum(dim=1).clamp(min=1)
+            pooled = pooled.float().cpu().numpy()
+
+            for row, i in enumerate(idx):
+                vectors[i] = pooled[row]
+
+    return np.stack(vectors).astype(np.float32, copy=False)
+
+class NodeEmbeddings(dict):
+    """
+    Node embeddings dict, {node: np.ndarray}, that counts its modifications in `version`,
+    so the matrix cached for it by get_embedding_matrix is rebuilt when a vector is added,
+    replaced or removed. embed_nodes and load_embeddings return this type. Plain dicts work
+    everywhere as well, but their matrix is rebuilt on every lookup.
+    """
+    __slots__ = ('version', '__weakref__')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, node, vector):
+        super().__setitem__(node, vector)
+        self.version += 1
+
+    def __delitem__(self, node):
+        super().__delitem__(node)
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, node, default=None):
+        if node not in self:
+            self[node] = default
+        return self[node]
+
+    def pop(self, node, *default):
+        self.version += 1
+        return super().pop(node, *default)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def copy(self):
+        return NodeEmbeddings(self)
+
+    def __reduce__(self):
+        return (NodeEmbeddings, (dict(self),))
+
+def embed_nodes(nodes, tokenizer, model, batch_size=64, verbatim=False):
+    """
+    Embed a collection of nodes with embed_texts and return them in the dict format
+    used throughout GraphReasoning: {node: np.ndarray of shape (1, d)}, as NodeEmbeddings.
+    """
+    nodes = list(nodes)
+    if len(nodes) == 0:
+        return NodeEmbeddings()
+    vectors = embed_texts([str(node) for node in nodes], tokenizer, model,
+                          batch_size=batch_size, verbatim=verbatim)
+    return NodeEmbeddings((node, vectors[i:i + 1]) for i, node in enumerate(nodes))
+
 # Function to generate embeddings
-def generate_node_embeddings(graph, tokenizer, model):
-    embeddings = {}
-    for node in tqdm(graph.nodes()):
-        inputs = tokenizer(str(node), return_tensors="pt")
-        outputs = model(**inputs)
-        embeddings[node] = outputs.last_hidden_state.mean(dim=1).detach().numpy()
-    return embeddings
+def generate_node_embeddings(graph, tokenizer, model, batch_size=64, verbatim=True):
+    return embed_nodes(graph.nodes(), tokenizer, model, batch_size=batch_size, verbatim=verbatim)
 
 import pickle
+import json
+import weakref
+from collections.abc import Mapping, MutableMapping
 
 def save_embeddings(embeddings, file_path):
+    if isinstance(embeddings, (EmbeddingOverlay, NodeEmbeddings)):
+        embeddings = dict(embeddings)  # pickle a plain dict, readable without GraphReasoning
     with open(file_path, 'wb') as f:
         pickle.dump(embeddings, f)
-def load_embeddings(file_path):
+def load_embeddings(file_path, mmap=True):
+    # Embedding stores (see save_embeddings_store) are recognized by their .npy matrix file
+    if str(file_path).endswith('.npy') or os.path.exists(f'{file_path}.npy'):
+        return load_embeddings_store(file_path, mmap=mmap)
     with open(file_path, 'rb') as f:
         embeddings = pickle.load(f)
+    if type(embeddings) is dict:
+        embeddings = NodeEmbeddings(embeddings)
     return embeddings
+
+class EmbeddingStore(Mapping):
+    """
+    Read-only, dict-like view of node embeddings backed by one contiguous matrix.
+
+    The matrix is typically a np.memmap of a .npy file, so several processes that open
+    the same store share one page-cached copy instead of each unpickling its own dict.
+    Indexing returns a (1, d) float32 array, the same shape as the pickle dicts.
+
+    Args:
+    - node_ids (list): Node identifiers, one per matrix row.
+    - matrix (np.ndarray): (N, d) float32 or float16 matrix.
+    """
+    version = 0  # read-only, never changes
+
+    def __init__(self, node_ids, matrix):
+        self.node_ids = node_ids
+        self.matrix = matrix
+        self._node_to_row = None
+        self._inv_norms = None
+
+    @property
+    def node_to_row(self):
+        if self._node_to_row is None:
+            self._node_to_row = {node: row for row, node in enumerate(self.node_ids)}
+        return self._node_to_row
+
+    def __getitem__(self, node):
+        row = self.node_to_row[node]
+        return np.asarray(self.matrix[row:row + 1], dtype=np.float32)
+
+    def __contains__(self, node):
+        return node in self.node_to_row
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def cosine_similarities(self, query_embedding, block_size=65536):
+        """
+        Cosine similarity of a query vector against all rows, computed in row blocks so
+        that a float16 or memory-mapped matrix is never copied as a whole.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).flatten()
+        query = query / max(np.linalg.norm(query), 1e-12)
+        if self._inv_norms is None:
+            norms = np.concatenate([np.linalg.norm(np.asarray(self.matrix[start:start + block_size], dtype=np.float32), axis=1)
+                                    for start in range(0, len(self.node_ids), block_size)])
+            self._inv_norms = 1.0 / np.maximum(norms, 1e-12)
+        similarities = np.concatenate([np.asarray(self.matrix[start:start + block_size], dtype=np.float32) @ query
+                                       for start in range(0, len(self.node_ids), block_size)])
+        return similarities * self._inv_norms
+
+class EmbeddingOverlay(MutableMapping):
+    """
+    Copy-on-write view of node embeddings: a base mapping (dict or EmbeddingStore) that is
+    never modified, plus the embeddings added or replaced and the nodes removed since.
+    Writes only touch this delta, and copy() copies only the delta, so updating a large set
+    of embeddings costs O(changed nodes) instead of a deep copy of every vector. Vectors are
+    shared with the base, not copied. compact() folds the delta into a new plain dict.
+
+    The overlay aliases its base: it reads through to it and does not copy it. The base
+    must not be changed while the overlay is in use. For a versioned base (NodeEmbeddings,
+    as returned by embed_nodes, or EmbeddingStore) a change is detected and the overlay
+    raises RuntimeError on the next access; changes to a plain dict base cannot be seen
+    (EmbeddingOverlay.of snapshots those). To detach an overlay from its base, use
+    overlay.compact() or dict(overlay). Vectors are shared either way, so modifying a
+    vector array in place shows through every mapping that holds it.
+
+    Args:
+    - base (Mapping or None): Node embeddings, {node: np.ndarray}.
+    """
+    def __init__(self, base=None, added=None, removed=None):
+        self._base = base if base is not None else {}
+        self._base_version = getattr(self._base, 'version', None)
+        self._added = dict(added) if added is not None else {}
+        self._removed = set(removed) if removed is not None else set()
+        self._n_new = sum(1 for node in self._added if node not in self._base)
+        self.version = 0  # modification counter, see get_embedding_matrix
+
+    @classmethod
+    def of(cls, embeddings):
+        """
+        Copy-on-write view of embeddings for code that must leave them unchanged: an overlay
+        is copied (delta only), a versioned mapping (NodeEmbeddings, EmbeddingStore) becomes
+        the base as is, and any other mapping is first copied into a new dict (a shallow
+        copy, the vectors are shared), so later writes to it cannot leak into the view.
+        """
+        if isinstance(embeddings, EmbeddingOverlay):
+            return embeddings.copy()
+        if getattr(embeddings, 'version', None) is not None:
+            return cls(embeddings)
+        return cls(dict(embeddings))
+
+    def _check_base(self):
+        if self._base_version is not None and self._base.version != self._base_version:
+            raise RuntimeError("The base embeddings of this overlay were modified after it was created. "
+                               "Write to the overlay instead, or detach it first with compact() or dict(overlay).")
+
+    @property
+    def base(self):
+        return self._base
+
+    @property
+    def delta_size(self):
+        return len(self._added) + len(self._removed)
+
+    def __getitem__(self, node):
+        if node in self._added:
+            return self._added[node]
+        if node in self._removed:
+            raise KeyError(node)
+        self._check_base()
+        return self._base[node]
+
+    def __contains__(self, node):
+        if node in self._added:
+            return True
+        self._check_base()
+        return node not in self._removed and node in self._base
+
+    def __iter__(self):
+        # Base order first (replaced nodes keep their position), then the new nodes
+        self._check_base()
+        removed = self._removed
+        for node in self._base:
+            if node not in removed:
+                yield node
+        for node in self._added:
+            if node not in self._base:
+                yield node
+
+    def __len__(self):
+        self._check_base()
+        return len(self._base) - len(self._removed) + self._n_new
+
+    def __setitem__(self, node, vector):
+        if node not in self._added:
+            if node in self._base:
+                self._removed.discard(node)
+            else:
+                self._n_new += 1
+        self._added[node] = vector
+        self.version += 1
+
+    def __delitem__(self, node):
+        if node in self._added:
+            del self._added[node]
+            if node in self._base:
+                self._removed.add(node)
+            else:
+                self._n_new -= 1
+        elif node in self._base and node not in self._removed:
+            self._removed.add(node)
+        else:
+            raise KeyError(node)
+        self.version += 1
+
+    def copy(self):
+        """
+        New overlay on the same base, with a copy of the delta. The delta is folded into a
+        new base first once it is as large as the base itself.
+        """
+        self._check_base()
+        if self.delta_size > max(len(self._base), 1024):
+            return EmbeddingOverlay(dict(self))
+        return EmbeddingOverlay(self._base, self._added, self._removed)
+
+    def compact(self):
+        """
+        Fold the delta into a new plain dict base, in place. Other overlays sharing the old
+        base are not affected.
+        """
+        self._base = {node: self[node] for node in self}
+        self._base_version = None
+        self._added = {}
+        self._removed = set()
+        self._n_new = 0
+        self.version += 1
+        return self
+
+def _embedding_store_paths(file_path):
+    root = str(file_path)
+    if root.endswith('.npy'):
+        root = root[:-len('.npy')]
+    return f'{root}.npy', f'{root}.nodes.json'
+
+def save_embeddings_store(embeddings, file_path, dtype='float32'):
+    """
+    Save node embeddings as an embedding store: a contiguous (N, d) .npy matrix plus a
+    JSON node-id index, written as {file_path}.npy and {file_path}.nodes.json.
+
+    Args:
+    - embeddings (dict): Node embeddings, {node: np.ndarray}.
+    - file_path (str): Path of the store without extension.
+    - dtype (str): 'float32' or 'float16' (halves the size on disk and in the page cache).
+
+    Returns:
+    - Path of the .npy matrix file.
+    """
+    matrix_path, nodes_path = _embedding_store_paths(file_path)
+    node_ids = list(embeddings.keys())
+    dim = np.asarray(embeddings[node_ids[0]]).size if node_ids else 0
+
+    # Write rows straight into the memory-mapped output, without building the matrix in RAM
+    matrix = np.lib.format.open_memmap(matrix_path, mode='w+', dtype=np.dtype(dtype), shape=(len(node_ids), dim))
+    for row, node in enumerate(node_ids):
+        matrix[row] = np.asarray(embeddings[node]).reshape(-1)
+    matrix.flush()
+    del matrix
+
+    with open(nodes_path, 'w') as f:
+        json.dump(node_ids, f)
+    return matrix_path
+
+def load_embeddings_store(file_path, mmap=True):
+    """
+    Open an embedding store written by save_embeddings_store.
+
+    Args:
+    - file_path (str): Path of the store, with or without the .npy extension.
+    - mmap (bool): Memory-map the matrix read-only (shared page cache) instead of reading it into RAM.
+
+    Returns:
+    - EmbeddingStore, usable wherever an embeddings dict is expected for reading.
+    """
+    matrix_path, nodes_path = _embedding_store_paths(file_path)
+    matrix = np.load(matrix_path, mmap_mode='r' if mmap else None)
+    with open(nodes_path, 'r') as f:
+        node_ids = json.load(f)
+    return EmbeddingStore(node_ids, matrix)
+
+def migrate_embeddings_to_store(pickle_path, file_path, dtype='float32'):
+    """
+    Convert an embeddings pickle written by save_embeddings into an embedding store.
+    """
+    with open(pickle_path, 'rb') as f:
+        embeddings = pickle.load(f)
+    return save_embeddings_store(embeddings, file_path, dtype=dtype)
  
-def find_best_fitting_node(keyword, embeddings, tokenizer, model):
-    inputs = tokenizer(keyword, return_tensors="pt")
-    outputs = model(**inputs)
-    keyword_embedding = outputs.last_hidden_state.mean(dim=1).detach().numpy().flatten()  # Flatten to ensure 1-D
-    
-    # Calculate cosine similarity and find the best match
-    best_node = None
-    best_similarity = float('-inf')  # Initialize with negative infinity
-    for node, embedding in embeddings.items():
-        # Ensure embedding is 1-D
-        embedding = embedding.flatten()  # Flatten to ensure 1-D
-        similarity = 1 - cosine(keyword_embedding, embedding)  # Cosine similarity
-        if similarity > best_similarity:
-            best_similarity = similarity
-            best_node = node
-            
-    return best_node, best_similarity
+# Cache of the node-id array, the L2-normalized embedding matrix and the {node: row} index
+# per embeddings mapping, so that repeated keyword lookups do not rebuild the matrix from the
+# dict every time: {id(embeddings): [weakref, version, node_ids, matrix, row_of]}. Entries hold
+# the mapping only weakly and are dropped when it is garbage collected.
+_embedding_matrix_cache = {}
+_EMBEDDING_MATRIX_CACHE_SIZE = 4
+
+def _cached_embedding_entry(embeddings):
+    version = getattr(embeddings, 'version', None)
+    entry = _embedding_matrix_cache.get(id(embeddings))
+    if entry is not None and entry[0]() is embeddings and entry[1] == version:
+        return entry
+
+    node_ids = np.empty(len(embeddings), dtype=object)
+    node_ids[:] = list(embeddings.keys())
+    if len(embeddings) > 0:
+        matrix = np.vstack([np.asarray(embeddings[node], dtype=np.float32).reshape(1, -1) for node in node_ids])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    entry = [None, version, node_ids, matrix, None]
+
+    # Only mappings that count their modifications (NodeEmbeddings, EmbeddingOverlay,
+    # EmbeddingStore) can be cached safely; plain dicts are rebuilt on every call
+    if version is None:
+        return entry
+    try:
+        key = id(embeddings)
+        entry[0] = weakref.ref(embeddings, lambda _, key=key: _embedding_matrix_cache.pop(key, None))
+    except TypeError:
+        return entry
+    _embedding_matrix_cache.pop(key, None)
+    if len(_embedding_matrix_cache) >= _EMBEDDING_MATRIX_CACHE_SIZE:
+        _embedding_matrix_cache.pop(next(iter(_embedding_matrix_cache)))
+    _embedding_matrix_cache[key] = entry
+    return entry
+
+def get_embedding_matrix(embeddings):
+    """
+    Return the node-id array and the L2-normalized float32 embedding matrix for an
+    embeddings mapping. For NodeEmbeddings, EmbeddingOverlay and EmbeddingStore the result
+    is cached (weakly) and rebuilt whenever an entry is added, replaced or removed; for plain
+    dicts it is rebuilt on every call. Vectors modified in place (embeddings[node][:] = ...)
+    are not noticed: call invalidate_embedding_matrix afterwards.
 
-def find_best_fitting_node_list(keyword, embeddings, tokenizer, model, N_samples=5):
-    inputs = tokenizer(keyword, return_tensors="pt")
-    outputs = model(**inputs)
-    keyword_embedding = outputs.last_hidden_state.mean(dim=1).detach().numpy().flatten()  # Flatten to ensure 1-D
-    
-    # Initialize a min-heap
-    min_heap = []
-    heapq.heapify(min_heap)
+    Args:
+    - embeddings (dict): Node embeddings, {node: np.ndarray}.
+
+    Returns:
+    - node_ids (np.ndarray of objects) and matrix (np.ndarray of shape (N, d)).
+    """
+    entry = _cached_embedding_entry(embeddings)
+    return entry[2], entry[3]
+
+def get_embedding_row_index(embeddings):
+    """
+    Return {node: row} for the matrix of get_embedding_matrix(embeddings), cached with it.
+    """
+    entry = _cached_embedding_entry(embeddings)
+    if entry[4] is None:
+        entry[4] = {node: row for row, node in enumerate(entry[2])}
+    return entry[4]
+
+def as_node_embeddings(embeddings):
+    """
+    Return embeddings as a mapping whose embedding matrix is cached: NodeEmbeddings,
+    EmbeddingOverlay and EmbeddingStore as they are, any other mapping wrapped in a new
+    NodeEmbeddings (the vectors are shared, not copied). Wrap a plain dict once before
+    running many lookups or path searches on it, or its matrix is rebuilt for each of them.
+    """
+    if getattr(embeddings, 'version', None) is not None:
+        return embeddings
+    return NodeEmbeddings(embeddings)
+
+def invalidate_embedding_matrix(embeddings=None):
+    """
+    Drop the cached embedding matrix for one embeddings mapping, or for all if None.
+    """
+    if embeddings is None:
+        _embedding_matrix_cache.clear()
+    else:
+        _embedding_matrix_cache.pop(id(embeddings), None)
+
+def find_top_k_nodes(query_embedding, embeddings, N_samples=5):
+    """
+    Exact cosine-similarity top-k search over an embeddings dict using the cached,
+    normalized embedding matrix: one matrix-vector product plus argpartition.
+
+    Returns:
+    - List of tuples (node, similarity), sorted by descending similarity.
+    """
+    if isinstance(embeddings, EmbeddingStore):
+        # Score the (memory-mapped) store in place instead of building a normalized copy
+        node_ids = embeddings.node_ids
+        if len(node_ids) == 0 or N_samples <= 0:
+            return []
+        similarities = embeddings.cosine_similarities(query_embedding)
+    else:
+        node_ids, matrix = get_embedding_matrix(embeddings)
+        if len(node_ids) == 0 or N_samples <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32).flatten()
+        query = query / max(np.linalg.norm(query), 1e-12)
+        similarities = matrix @ query
+
+    k = min(N_samples, len(node_ids))
+    if k < len(node_ids):
+        top = np.argpartition(-similarities, k - 1)[:k]
+    else:
+        top = np.arange(len(node_ids))
+    top = top[np.argsort(-similarities[top], kind='stable')]
+
+    return [(node_ids[i], float(similarities[i])) for i in top]
+
+def find_best_fitting_node(keyword, embeddings, tokenizer, model, index=None):
+    keyword_embedding = embed_texts([keyword], tokenizer, model)[0]
     
-    for node, embedding in embeddings.items():
-        # Ensure embedding is 1-D
-        embedding = embedding.flatten()  # Flatten to ensure 1-D
-        similarity = 1 - cosine(keyword_embedding, embedding)  # Cosine similarity
-        
-        # If the heap is smaller than N_samples, just add the current node and similarity
-        if len(min_heap) < N_samples:
-            heapq.heappush(min_heap, (similarity, node))
-        else:
-            # If the current similarity is greater than the smallest similarity in the heap
-            if similarity > min_heap[0][0]:
-                heapq.heappop(min_heap)  # Remove the smallest
-                heapq.heappush(min_heap, (similarity, node))  # Add the current node and similarity
-                
-    # Convert the min-heap to a sorted list in descending order of similarity
-    best_nodes = sorted(min_heap, key=lambda x: -x[0])
+    # Calculate cosine similarity and find the best match (approximate if an ANN index is given)
+    if index is not None:
+        best_nodes = index.search(keyword_embedding, 1)
+    else:
+        best_nodes = find_top_k_nodes(keyword_embedding, embeddings, N_samples=1)
+    if not best_nodes:
+        return None, float('-inf')
+            
+    return best_nodes[0]
+
+def find_best_fitting_node_list(keyword, embeddings, tokenizer, model, N_samples=5, index=None):
+    keyword_embedding = embed_texts([keyword], tokenizer, model)[0]
     
-    # Return a list of tuples (node, similarity)
-    return [(node, similarity) for similarity, node in best_nodes]
+    # Use the ANN index (e.g. IVFIndex from embedding_index) as search backend if provided
+    if index is not None:
+        return index.search(keyword_embedding, N_samples)
+
+    # Return a list of tuples (node, similarity) in descending order of similarity
+    return find_top_k_nodes(keyword_embedding, embeddings, N_samples=N_samples)
 
 
 # Example usage
@@ -629,10 +1124,10 @@ def graph_Louvain (G,
     
     print("Done, assigned colors and groups...")
     
-    # Write the graph with community information to a GraphML file
+    # Write the graph with community information to a GraphML file (or a snapshot, see write_graph)
     if graph_GraphML != None:
         try:
-            nx.write_graphml(G, graph_GraphML)
+            write_graph(G, graph_GraphML)
     
             print("Written GraphML.")
 
@@ -640,52 +1135,62 @@ def graph_Louvain (G,
             print ("Error saving GraphML file.")
     return G
     
+from GraphReasoning.graph_snapshot import *
+
 def save_graph (G, 
                   graph_GraphML=None, ):
+    # Paths ending in .npz or .snapshot are written as binary snapshots, anything else as GraphML
     if graph_GraphML != None:
-        nx.write_graphml(G, graph_GraphML)
+        write_graph(G, graph_GraphML)
     
-        print("Written GraphML")
+        print("Written GraphML" if not is_snapshot_path(graph_GraphML) else "Written snapshot")
     else:
         print("Error, no file name provided.")
     return 
 
 def update_node_embeddings(embeddings, graph_new, tokenizer, model, remove_embeddings_for_nodes_no_longer_in_graph=True,
-                          verbatim=False):
+                          verbatim=False, batch_size=64, copy_on_write=False):
     """
     Update embeddings for new nodes in an updated graph, ensuring that the original embeddings are not altered.
 
     Args:
-    - embeddings (dict): Existing node embeddings.
+    - embeddings (dict, EmbeddingStore or EmbeddingOverlay): Existing node embeddings.
     - graph_new: The updated graph object.
     - tokenizer: Tokenizer object to tokenize node names.
     - model: Model object to generate embeddings.
+    - batch_size (int): Number of new nodes embedded per forward pass.
+    - copy_on_write (bool): Return an EmbeddingOverlay on the input instead of a new dict.
 
     Returns:
-    - Updated embeddings dictionary with embeddings for new nodes, without altering the original embeddings.
+    - Updated embeddings as a new NodeEmbeddings dict, independent of the input (the vector
+      arrays are shared, not copied). With copy_on_write=True, an EmbeddingOverlay (see
+      EmbeddingOverlay.of) that stores only the new and removed nodes: a NodeEmbeddings or
+      EmbeddingStore input is then shared as its base and must not be modified while the
+      result is in use (the overlay raises RuntimeError if it is).
     """
-    # Create a deep copy of the original embeddings
-    embeddings_updated = copy.deepcopy(embeddings)
+    # Copy-on-write view of the original embeddings instead of a deep copy
+    embeddings_updated = EmbeddingOverlay.of(embeddings)
     
-    # Iterate through new graph nodes
-    for node in tqdm(graph_new.nodes()):
-        # Check if the node already has an embedding in the copied dictionary
-        if node not in embeddings_updated:
+    # Collect new graph nodes that do not have an embedding yet, then embed them in batches
+    new_nodes = [node for node in graph_new.nodes() if node not in embeddings_updated]
+    if verbatim:
+        for node in new_nodes:
+            print(f"Generating embedding for new node: {node}")
+    embeddings_updated.update(embed_nodes(new_nodes, tokenizer, model, batch_size=batch_size, verbatim=verbatim))
+    
+    # Every graph node has an embedding now, so there is nothing to remove if the sizes match
+    if remove_embeddings_for_nodes_no_longer_in_graph and len(embeddings_updated) > graph_new.number_of_nodes():
+        # Remove embeddings for nodes that no longer exist in the graph from the updated view
+        for node in [node for node in embeddings_updated if not graph_new.has_node(node)]:
             if verbatim:
-                print(f"Generating embedding for new node: {node}")
-            inputs = tokenizer(node, return_tensors="pt")
-            outputs = model(**inputs)
-            # Update the copied embeddings dictionary with the new node's embedding
-            embeddings_updated[node] = outputs.last_hidden_state.mean(dim=1).detach().numpy()
-    
-    if remove_embeddings_for_nodes_no_longer_in_graph:
-        # Remove embeddings for nodes that no longer exist in the graph from the copied dictionary
-        nodes_in_graph = set(graph_new.nodes())
-        for node in list(embeddings_updated):
-            if node not in nodes_in_graph:
-                if verbatim:
-                    print(f"Removing embedding for node no longer in graph: {node}")
-                del embeddings_updated[node]
+                print(f"Removing embedding for node no longer in graph: {node}")
+            del embeddings_updated[node]
+
+    if not copy_on_write:
+        return NodeEmbeddings(embeddings_updated)
+
+    # The node set changed, so any cached embedding matrix for this dict is stale
+    invalidate_embedding_matrix(embeddings_updated)
 
     return embeddings_updated
 
@@ -703,6 +1208,177 @@ def remove_small_fragents (G_new, size_threshold):
     return G_new
 
 
+def find_similar_node_pairs(node_embeddings, similarity_threshold=0.9, method='blocked', max_block_elements=2**25,
+                            index=None, max_neighbors=None, verbatim=False):
+    """
+    Candidate generation for node merging: all ordered pairs (i, j), i != j, of nodes whose
+    embeddings have cosine similarity above similarity_threshold, as positions in
+    list(node_embeddings.keys()).
+
+    Instead of materializing the full N x N similarity matrix, the search either streams
+    row blocks of the normalized embedding matrix ('blocked', exact, O(max_block_elements)
+    working memory) or joins over an IVF index ('ann', approximate, O(N * max_neighbors)
+    memory when max_neighbors is set).
+
+    Args:
+    - node_embeddings (dict): Node embeddings, {node: np.ndarray}.
+    - similarity_threshold (float): Minimum cosine similarity (exclusive).
+    - method (str): 'blocked' or 'ann'.
+    - max_block_elements (int): Maximum number of similarities held in memory per block.
+    - index (IVFIndex or None): ANN index over node_embeddings for method='ann', built if None.
+    - max_neighbors (int or None): For method='ann', keep at most this many neighbours per node.
+
+    Returns:
+    - (rows, cols): Index arrays in row-major order, the same pairs as
+      np.where(cosine_similarity(embeddings_matrix) > similarity_threshold) without the diagonal.
+    """
+    nodes, matrix = get_embedding_matrix(node_embeddings)
+    if len(nodes) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    if method == 'blocked':
+        rows = []
+        cols = []
+        block_size = max(1, max_block_elements // len(nodes))
+        blocks = range(0, len(nodes), block_size)
+        if verbatim:
+            blocks = tqdm(blocks, desc="Similarity blocks")
+        for start in blocks:
+            similarities = matrix[start:start + block_size] @ matrix.T
+            r, c = np.nonzero(similarities > similarity_threshold)
+            keep = (r + start) != c  # ignore self-similarity
+            rows.append(r[keep] + start)
+            cols.append(c[keep])
+        return np.concatenate(rows), np.concatenate(cols)
+
+    if method == 'ann':
+        from GraphReasoning.embedding_index import build_node_index
+        if index is None:
+            index = build_node_index(node_embeddings, verbatim=verbatim)
+        rows_1, rows_2 = index.similar_pairs(similarity_threshold, max_neighbors=max_neighbors)
+
+        # Map index rows to positions in nodes, and emit both directions in row-major order
+        position = {node: i for i, node in enumerate(nodes)}
+        index_positions = np.array([position.get(node, -1) for node in index.node_ids], dtype=np.int64)
+        i = index_positions[rows_1]
+        j = index_positions[rows_2]
+        valid = (i >= 0) & (j >= 0)
+        rows = np.concatenate([i[valid], j[valid]])
+        cols = np.concatenate([j[valid], i[valid]])
+        order = np.lexsort((cols, rows))
+        return rows[order], cols[order]
+
+    raise ValueError(f"Unknown candidate generation method: {method}")
+
+class DisjointSet:
+    """
+    Union-find over the integers 0..n-1 that merges whole arrays of pairs at once.
+
+    union_batch hooks the larger root of every pair onto the smaller one and then
+    compresses paths by pointer jumping, repeating until all pairs share a root, so the
+    result does not depend on the order of the pairs.
+    """
+    def __init__(self, n):
+        self.parent = np.arange(n, dtype=np.int64)
+
+    def roots(self):
+        # Pointer jumping until every element points directly at its root
+        while True:
+            grandparent = self.parent[self.parent]
+            if np.array_equal(grandparent, self.parent):
+                return self.parent
+            self.parent = grandparent
+
+    def union_batch(self, rows, cols):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        while len(rows) > 0:
+            roots = self.roots()
+            root_rows = roots[rows]
+            root_cols = roots[cols]
+            pending = root_rows != root_cols
+            if not pending.any():
+                break
+            rows, cols = rows[pending], cols[pending]
+            low = np.minimum(root_rows[pending], root_cols[pending])
+            high = np.maximum(root_rows[pending], root_cols[pending])
+            np.minimum.at(self.parent, high, low)
+        self.roots()
+        return self
+
+def plan_node_merges(graph, nodes, to_merge, representative='degree', batch_size=1000000, verbatim=False):
+    """
+    Union-find merge planner: groups nodes connected by similar pairs into clusters
+    (transitively, so A~B~C ends up in one cluster regardless of pair order) and picks one
+    representative per cluster.
+
+    Args:
+    - graph: The graph the nodes belong to; pairs with nodes not in the graph are ignored.
+    - nodes (list): Node list that the pair indices refer to.
+    - to_merge (tuple): (rows, cols) index arrays of similar pairs, e.g. from find_similar_node_pairs.
+    - representative (str or callable): 'degree' (highest degree), 'shortest_name' or
+      'most_texts' (longest 'texts' attribute), or a function node -> score (highest wins).
+      Ties are broken by degree and then by position in nodes.
+    - batch_size (int): Number of pairs merged per vectorized union step.
+
+    Returns:
+    - node_mapping (dict): {merged node: representative}, ready for a single nx.relabel_nodes pass.
+    - merge_log (pd.DataFrame): One row per merged node with its representative and cluster size.
+    """
+    rows, cols = (np.asarray(x, dtype=np.int64) for x in to_merge)
+    in_graph = np.array([graph.has_node(node) for node in nodes], dtype=bool)
+    keep = (rows != cols) & in_graph[rows] & in_graph[cols]
+    rows, cols = rows[keep], cols[keep]
+
+    disjoint_set = DisjointSet(len(nodes))
+    batches = range(0, len(rows), batch_size)
+    if verbatim:
+        batches = tqdm(batches, desc="Union-find batches")
+    for start in batches:
+        disjoint_set.union_batch(rows[start:start + batch_size], cols[start:start + batch_size])
+    roots = disjoint_set.roots()
+
+    # Only nodes that take part in a pair belong to a non-trivial cluster
+    members = np.unique(np.concatenate([rows, cols]))
+    if len(members) == 0:
+        return {}, pd.DataFrame(columns=['node', 'representative', 'cluster_size'])
+
+    degree = np.array([graph.degree(nodes[i]) for i in members], dtype=np.float64)
+    if callable(representative):
+        score = np.array([representative(nodes[i]) for i in members], dtype=np.float64)
+    elif representative == 'degree':
+        score = degree
+    elif representative == 'shortest_name':
+        score = -np.array([len(str(nodes[i])) for i in members], dtype=np.float64)
+    elif representative == 'most_texts':
+        score = np.array([len(graph.nodes[nodes[i]].get('texts', graph.nodes[nodes[i]].get('text_ids', [])))
+                          for i in members], dtype=np.float64)
+    else:
+        raise ValueError(f"Unknown representative policy: {representative}")
+
+    # Sort by cluster, then best score, degree and position; the first member of each cluster wins
+    member_roots = roots[members]
+    order = np.lexsort((members, -degree, -score, member_roots))
+    sorted_roots = member_roots[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_roots[1:] != sorted_roots[:-1]
+    winner_of_root = dict(zip(sorted_roots[first].tolist(), members[order][first].tolist()))
+    cluster_size = dict(zip(*np.unique(member_roots, return_counts=True)))
+
+    node_mapping = {}
+    log_rows = []
+    for i, root in zip(members.tolist(), member_roots.tolist()):
+        winner = winner_of_root[root]
+        if i != winner:
+            node_mapping[nodes[i]] = nodes[winner]
+            log_rows.append({'node': nodes[i], 'representative': nodes[winner],
+                             'cluster_size': int(cluster_size[root])})
+    merge_log = pd.DataFrame(log_rows, columns=['node', 'representative', 'cluster_size'])
+
+    if verbatim:
+        print(f"Merge plan: {len(node_mapping)} nodes merged into {len(winner_of_root)} representatives")
+    return node_mapping, merge_log
+
 def simplify_node_name_with_llm(node_name, generate, max_tokens=2048, temperature=0.3):
     # Generate a prompt for the LLM to simplify or describe the node name
     system_prompt='You are an ontological graph maker. You carefully rename nodes in complex networks.'
@@ -721,53 +1397,58 @@ import numpy as np
 def simplify_graph_simple(graph_, node_embeddings, tokenizer, model, similarity_threshold=0.9, use_llm=False,
                   data_dir_output='./',
                   graph_root='simple_graph', verbatim=False,max_tokens=2048, temperature=0.3,generate=None,
-                  ):
+                  candidate_method='blocked', ann_index=None, max_neighbors=None, representative='degree',
+                  copy_on_write=False):
+    """
+    Simplifies a graph by merging similar nodes, as simplify_graph but without the merge log.
+    Returns the new graph and a new NodeEmbeddings dict, or with copy_on_write=True an
+    EmbeddingOverlay on node_embeddings (see update_node_embeddings).
+    """
     graph = graph_.copy()
     nodes = list(node_embeddings.keys())
-    embeddings_matrix = np.array([node_embeddings[node].flatten() for node in nodes])
 
-    similarity_matrix = cosine_similarity(embeddings_matrix)
-    to_merge = np.where(similarity_matrix > similarity_threshold)
+    # Similar pairs are streamed block by block (or found via an ANN index), no N x N matrix
+    to_merge = find_similar_node_pairs(node_embeddings, similarity_threshold=similarity_threshold,
+                                       method=candidate_method, index=ann_index, max_neighbors=max_neighbors,
+                                       verbatim=verbatim)
 
-    node_mapping = {}
+    # Same merge planner as simplify_graph, so both give the same merges for the same pairs
+    node_mapping, _ = plan_node_merges(graph, nodes, to_merge, representative=representative, verbatim=verbatim)
     nodes_to_recalculate = set()
-    for i, j in tqdm(zip(*to_merge)):
-        if i != j:  # ignore self-similarity
-            node_i, node_j = nodes[i], nodes[j]
-            if graph.degree(node_i) >= graph.degree(node_j):
-                node_to_keep, node_to_merge = node_i, node_j
-            else:
-                node_to_keep, node_to_merge = node_j, node_i
-            if verbatim:
-                print ("node to keep and merge: ",  node_to_keep,"<--",  node_to_merge)
-            # Optionally use LLM to generate a simplified or more descriptive name
-            if use_llm:
-                original_node_to_keep = node_to_keep
-                node_to_keep = simplify_node_name_with_llm(node_to_keep, generate, max_tokens=max_tokens, temperature=temperature)
-                # Add the original and new node names to the list for recalculation
-                nodes_to_recalculate.add(original_node_to_keep)
-                nodes_to_recalculate.add(node_to_keep)
-            
-            node_mapping[node_to_merge] = node_to_keep
+    if verbatim:
+        for node_to_merge, node_to_keep in node_mapping.items():
+            print ("node to keep and merge: ",  node_to_keep,"<--",  node_to_merge)
+
+    # Optionally use LLM to generate a simplified or more descriptive name per representative
+    if use_llm:
+        new_names = {}
+        for node_to_keep in set(node_mapping.values()):
+            new_names[node_to_keep] = simplify_node_name_with_llm(node_to_keep, generate, max_tokens=max_tokens, temperature=temperature)
+            # Add the original and new node names to the list for recalculation
+            nodes_to_recalculate.add(node_to_keep)
+            nodes_to_recalculate.add(new_names[node_to_keep])
+        node_mapping = {node: new_names[node_to_keep] for node, node_to_keep in node_mapping.items()}
+        node_mapping.update({node: name for node, name in new_names.items() if name != node})
 
     new_graph = nx.relabel_nodes(graph, node_mapping, copy=True)
 
     # Recalculate embeddings for nodes that have been merged or renamed
-    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model)
+    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model, verbatim=verbatim)
     
-    # Update the embeddings dictionary with the recalculated embeddings
-    updated_embeddings = {**node_embeddings, **recalculated_embeddings}
+    # Update the embeddings with the recalculated embeddings (copy-on-write, the input is left unchanged)
+    updated_embeddings = EmbeddingOverlay.of(node_embeddings)
+    updated_embeddings.update(recalculated_embeddings)
 
     # Remove embeddings for nodes that no longer exist
     for node in node_mapping.keys():
-        if node in updated_embeddings:
+        if node in updated_embeddings and not new_graph.has_node(node):
             del updated_embeddings[node]
 
     graph_GraphML=  f'{data_dir_output}/{graph_root}_graphML_simplified.graphml'  #  f'{data_dir}/resulting_graph.graphml',
         #print (".")
     nx.write_graphml(new_graph, graph_GraphML)
     
-    return new_graph, updated_embeddings
+    return new_graph, updated_embeddings if copy_on_write else NodeEmbeddings(updated_embeddings)
 
 import networkx as nx
 import numpy as np
@@ -783,64 +1464,48 @@ import networkx as nx
 from sklearn.metrics.pairwise import cosine_similarity
 from tqdm import tqdm
 
-def simplify_node_name_with_llm(node_name, max_tokens, temperature):
-    # This is a placeholder for the actual function that uses a language model
-    # to generate a simplified or more descriptive node name.
-    return node_name  
-
-def regenerate_node_embeddings(graph, nodes_to_recalculate, tokenizer, model):
+def regenerate_node_embeddings(graph, nodes_to_recalculate, tokenizer, model, batch_size=64, verbatim=True):
     """
-    Regenerate embeddings for specific nodes.
+    Regenerate embeddings for specific nodes (with a progress bar if verbatim).
     """
-    new_embeddings = {}
-    for node in tqdm(nodes_to_recalculate):
-        inputs = tokenizer(node, return_tensors="pt")
-        outputs = model(**inputs)
-        new_embeddings[node] = outputs.last_hidden_state.mean(dim=1).detach().numpy()
-    return new_embeddings
+    return embed_nodes(nodes_to_recalculate, tokenizer, model, batch_size=batch_size, verbatim=verbatim)
     
 def simplify_graph(graph_, node_embeddings, tokenizer, model, similarity_threshold=0.9, use_llm=False,
                    data_dir_output='./', graph_root='simple_graph', verbatim=False, max_tokens=2048, 
-                   temperature=0.3, generate=None):
+                   temperature=0.3, generate=None, candidate_method='blocked', ann_index=None, max_neighbors=None,
+                   representative='degree', copy_on_write=False):
     """
     Simplifies a graph by merging similar nodes and optionally renaming them using a language model.
+
+    Candidate pairs are generated by find_similar_node_pairs: candidate_method='blocked' is
+    exact and streams the similarity matrix in row blocks, candidate_method='ann' uses an
+    IVF index (ann_index, built if None) and keeps at most max_neighbors per node.
+    Clusters of similar nodes are planned with plan_node_merges (representative policy:
+    'degree', 'shortest_name', 'most_texts' or a callable); the merge log is saved next to
+    the GraphML file.
+
+    Returns the simplified graph and its embeddings as a new NodeEmbeddings dict. With
+    copy_on_write=True the embeddings are an EmbeddingOverlay on node_embeddings instead,
+    which must then be left unchanged while the overlay is in use (see update_node_embeddings).
     """
 
     graph = graph_.copy()
     
     nodes = list(node_embeddings.keys())
-    embeddings_matrix = np.array([node_embeddings[node].flatten() for node in nodes])
-
-    similarity_matrix = cosine_similarity(embeddings_matrix)
-    to_merge = np.where(similarity_matrix > similarity_threshold)
+    to_merge = find_similar_node_pairs(node_embeddings, similarity_threshold=similarity_threshold,
+                                       method=candidate_method, index=ann_index, max_neighbors=max_neighbors,
+                                       verbatim=verbatim)
 
-    node_mapping = {}
-    nodes_to_recalculate = set()
-    merged_nodes = set()  # Keep track of nodes that have been merged
     if verbatim:
         print("Start...")
-    for i, j in tqdm(zip(*to_merge), total=len(to_merge[0])):
-        if i != j and nodes[i] not in merged_nodes and nodes[j] not in merged_nodes:  # Check for duplicates
-            node_i, node_j = nodes[i], nodes[j]
-            
-            try:
-                if graph.degree(node_i) >= graph.degree(node_j):
-                #if graph.degree[node_i] >= graph.degree[node_j]:
-                    node_to_keep, node_to_merge = node_i, node_j
-                else:
-                    node_to_keep, node_to_merge = node_j, node_i
-    
-                if verbatim:
-                    print("Node to keep and merge:", node_to_keep, "<--", node_to_merge)
-    
-                #if use_llm and node_to_keep in nodes_to_recalculate:
-                #    node_to_keep = simplify_node_name_with_llm(node_to_keep, max_tokens=max_tokens, temperature=temperature)
-    
-                node_mapping[node_to_merge] = node_to_keep
-                nodes_to_recalculate.add(node_to_keep)
-                merged_nodes.add(node_to_merge)  # Mark the merged node to avoid duplicate handling
-            except:
-                print (end="")
+    # Plan all merges at once: clusters of similar nodes collapse onto one representative
+    node_mapping, merge_log = plan_node_merges(graph, nodes, to_merge, representative=representative, verbatim=verbatim)
+    nodes_to_recalculate = set(node_mapping.values())
+    merged_nodes = set(node_mapping.keys())  # Keep track of nodes that have been merged
+    if verbatim:
+        for node_to_merge, node_to_keep in node_mapping.items():
+            print("Node to keep and merge:", node_to_keep, "<--", node_to_merge)
+    merge_log.to_csv(f'{data_dir_output}/{graph_root}_merge_log.csv', index=False)
     if verbatim:
         print ("Now relabel. ")
     # Create the simplified graph by relabeling nodes.
@@ -848,11 +1513,12 @@ def simplify_graph(graph_, node_embeddings, tokenizer, model, similarity_thresho
     if verbatim:
         print ("New graph generated, nodes relabled. ")
     # Recalculate embeddings for nodes that have been merged or renamed.
-    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model)
+    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model, verbatim=verbatim)
     if verbatim:
         print ("Relcaulated embeddings... ")
-    # Update the embeddings dictionary with the recalculated embeddings.
-    updated_embeddings = {**node_embeddings, **recalculated_embeddings}
+    # Update the embeddings with the recalculated embeddings (copy-on-write, the input is left unchanged).
+    updated_embeddings = EmbeddingOverlay.of(node_embeddings)
+    updated_embeddings.update(recalculated_embeddings)
 
     # Remove embeddings for nodes that no longer exist in the graph.
     for node in merged_nodes:
@@ -867,7 +1533,210 @@ def simplify_graph(graph_, node_embeddings, tokenizer, model, similarity_thresho
     if verbatim:
         print(f"Graph simplified and saved to {graph_path}")
 
-    return new_graph, updated_embeddings
+    return new_graph, updated_embeddings if copy_on_write else NodeEmbeddings(updated_embeddings)
+
+class IncrementalGraphMerger:
+    """
+    Incremental counterpart of compose + update_node_embeddings + simplify_graph for adding
+    new subgraphs to a large, already simplified graph. The base graph, its node embeddings
+    and an IVF index over them stay in memory. merge() only embeds the new nodes, matches
+    them against the index (and against each other), and relabels the merged nodes in
+    place, so its cost depends on the size of the new subgraph rather than of the base graph.
+
+    Parameters:
+    - G (networkx graph): Base graph, changed in place by merge().
+    - node_embeddings (dict): Embeddings of the base graph nodes. Missing nodes are embedded,
+      embeddings of nodes not in G are dropped. The merger works on its own copy (merger.node_embeddings),
+      the input dict is left unchanged.
+    - tokenizer, model: Embedding model for new nodes.
+    - similarity_threshold (float): Minimum cosine similarity for merging, as in simplify_graph.
+    - representative (str or callable): Cluster representative policy, see plan_node_merges.
+    - index (IVFIndex or None): Index over node_embeddings, built if None.
+    - n_neighbors (int): Index candidates checked per new node.
+    - exact (bool): Scan all indexed vectors instead of the n_probe closest lists.
+    - batch_size (int): Number of new nodes embedded per forward pass.
+
+    Example:
+        merger = IncrementalGraphMerger(G, node_embeddings, tokenizer, model, similarity_threshold=0.95)
+        for txt in papers:
+            add_new_subgraph_from_text(txt, generate, None, tokenizer, model, None, merger=merger)
+    """
+
+    def __init__(self, G, node_embeddings, tokenizer, model, similarity_threshold=0.95, representative='degree',
+                 index=None, n_neighbors=10, exact=False, batch_size=64, verbatim=False):
+        from GraphReasoning.embedding_index import IVFIndex
+
+        self.G = G
+        self.tokenizer = tokenizer
+        self.model = model
+        self.similarity_threshold = similarity_threshold
+        self.representative = representative
+        self.n_neighbors = n_neighbors
+        self.exact = exact
+        self.batch_size = batch_size
+        self.verbatim = verbatim
+
+        self.node_embeddings = update_node_embeddings(node_embeddings, G, tokenizer, model,
+                                                      batch_size=batch_size)
+        if index is None:
+            index = IVFIndex()
+            if len(self.node_embeddings) > 0:
+                index.build(self.node_embeddings, verbatim=verbatim)
+        else:
+            index.remove([node for node in index.node_to_row if node not in self.node_embeddings])
+            index.add({node: vector for node, vector in self.node_embeddings.items() if node not in index})
+        self.index = index
+
+    def _candidate_pairs(self, new_nodes, new_embeddings):
+        # Pairs (i, j) as positions in nodes: the matched base nodes in embedding order, then the
+        # new nodes, the order simplify_graph would see them in (it breaks degree ties by position)
+        matches = []
+        for i, node in enumerate(new_nodes):
+            for match, similarity in self.index.search(new_embeddings[node], k=self.n_neighbors, exact=self.exact):
+                if similarity <= self.similarity_threshold:
+                    break
+                matches.append((i, match))
+
+        base_nodes = sorted({match for _, match in matches}, key=self.index.node_to_row.get)
+        position = {node: i for i, node in enumerate(base_nodes)}
+        nodes = base_nodes + list(new_nodes)
+        offset = len(base_nodes)
+        rows = np.array([offset + i for i, _ in matches], dtype=np.int64)
+        cols = np.array([position[match] for _, match in matches], dtype=np.int64)
+
+        # New nodes that are similar to each other
+        new_rows, new_cols = find_similar_node_pairs(new_embeddings, similarity_threshold=self.similarity_threshold)
+        invalidate_embedding_matrix(new_embeddings)
+        return nodes, (np.concatenate([rows, new_rows + offset]), np.concatenate([cols, new_cols + offset]))
+
+    def _small_components(self, nodes, size_threshold):
+        # Components are only ever joined by a merge, so only those of new nodes can be small;
+        # a breadth-first search that stops at size_threshold nodes decides it locally
+        small = []
+        seen = set()
+        for start in nodes:
+            if start in seen or start not in self.G:
+                continue
+            component = {start}
+            frontier = [start]
+            while frontier and len(component) < size_threshold:
+                node = frontier.pop()
+                for neighbor in self.G[node]:
+                    if neighbor not in component:
+                        component.add(neighbor)
+                        frontier.append(neighbor)
+            seen |= component
+            if len(component) < size_threshold:
+                small.append(component)
+        return small
+
+    def _assign_communities(self, nodes):
+        # New nodes take the most common Louvain group of their neighbours (as set by
+        # graph_Louvain); nodes without grouped neighbours form one new group
+        G = self.G
+        pending = [node for node in nodes if node in G and 'group' not in G.nodes[node]]
+        changed = True
+        while pending and changed:
+            changed = False
+            still_pending = []
+            for node in pending:
+                groups = [(G.nodes[n]['group'], G.nodes[n].get('color')) for n in G[node] if 'group' in G.nodes[n]]
+                if groups:
+                    group, color = max(set(groups), key=groups.count)
+                    G.nodes[node]['group'] = group
+                    G.nodes[node]['color'] = color
+                    changed = True
+                else:
+                    still_pending.append(node)
+            pending = still_pending
+        if pending:
+            groups = [group for _, group in G.nodes(data='group') if group is not None]
+            colors = colors2Community([pending])
+            for node, color in zip(colors['node'], colors['color']):
+                G.nodes[node]['group'] = max(groups, default=0) + 1
+                G.nodes[node]['color'] = color
+        for node in nodes:
+            if node in G:
+                for n in itertools.chain([node], G[node]):
+                    G.nodes[n]['size'] = G.degree[n]
+
+    def remove_nodes(self, nodes):
+        """
+        Remove nodes from the graph, the embeddings and the index.
+        """
+        nodes = [node for node in nodes if node in self.G]
+        self.G.remove_nodes_from(nodes)
+        for node in nodes:
+            self.node_embeddings.pop(node, None)
+        self.index.remove([node for node in nodes if node in self.index])
+        return self
+
+    def merge(self, G_add, simplify=True, size_threshold=0, assign_communities=False, data_dir_output=None,
+              graph_root='graph_incremental'):
+        """
+        Merge G_add into the base graph in place.
+
+        Args:
+        - G_add (networkx graph): Graph to add. Attributes of nodes/edges present in both graphs
+          are taken from G_add, as with nx.compose(G, G_add).
+        - simplify (bool): Merge new nodes with similar nodes (otherwise only compose and embed).
+        - size_threshold (int): Remove new components smaller than this, as remove_small_fragents.
+        - assign_communities (bool): Give new nodes the Louvain group/color of their neighbours,
+          instead of rerunning graph_Louvain on the whole graph.
+        - data_dir_output (str or None): If given, the merge log is saved there, as in simplify_graph.
+
+        Returns:
+        - node_mapping (dict): {merged node: representative}.
+        - merge_log (pd.DataFrame)
+        """
+        G = self.G
+        start_time = time.time()
+        new_nodes = [node for node in G_add if node not in G]
+
+        # Compose in place
+        G.add_nodes_from(G_add.nodes(data=True))
+        if G_add.is_multigraph() and G.is_multigraph():
+            G.add_edges_from(G_add.edges(keys=True, data=True))
+        else:
+            G.add_edges_from(G_add.edges(data=True))
+
+        # Embed only the new nodes and match them against the index
+        new_embeddings = embed_nodes(new_nodes, self.tokenizer, self.model, batch_size=self.batch_size,
+                                     verbatim=self.verbatim)
+        if simplify:
+            nodes, to_merge = self._candidate_pairs(new_nodes, new_embeddings)
+            node_mapping, merge_log = plan_node_merges(G, nodes, to_merge, representative=self.representative,
+                                                       verbatim=self.verbatim)
+        else:
+            node_mapping, merge_log = {}, pd.DataFrame(columns=['node', 'representative', 'cluster_size'])
+        if data_dir_output is not None:
+            merge_log.to_csv(f'{data_dir_output}/{graph_root}_merge_log.csv', index=False)
+
+        # Apply the merges locally: only the merged nodes and their edges are touched
+        nx.relabel_nodes(G, node_mapping, copy=False)
+        for node in node_mapping:
+            new_embeddings.pop(node, None)
+            self.node_embeddings.pop(node, None)
+        self.index.remove([node for node in node_mapping if node in self.index])
+
+        touched = [node for node in new_nodes if node not in node_mapping] + \
+                  [node for node in set(node_mapping.values()) if node not in new_embeddings]
+        self.node_embeddings.update(new_embeddings)
+        self.index.add(new_embeddings)
+
+        removed = set()
+        if size_threshold > 0:
+            for component in self._small_components(touched, size_threshold):
+                removed |= component
+            self.remove_nodes(removed)
+        if assign_communities:
+            self._assign_communities([node for node in touched if node not in removed])
+
+        if self.verbatim:
+            print(f"Merged {len(new_nodes)} new nodes: {len(node_mapping)} merged, {len(removed)} removed "
+                  f"in small fragments, graph now has {G.number_of_nodes()} nodes "
+                  f"({time.time() - start_time:.2f} s)")
+        return node_mapping, merge_log
 
 def make_HTML (G,data_dir='./', graph_root='graph_root'):
 
@@ -910,6 +1779,8 @@ def return_giant_component_G_and_embeddings (G_new, node_embeddings):
     node_embeddings=update_node_embeddings(node_embeddings, G_new, tokenizer, model, verbatim=verbatim)
     return G_new, node_embeddings
 
+import glob
+
 def extract_number(filename):
     # This function extracts numbers from a filename and converts them to an integer.
     # It finds all sequences of digits in the filename and returns the first one as an integer.
@@ -917,7 +1788,72 @@ def extract_number(filename):
     match = re.search(r'(\d+)', filename)
     return int(match.group(0)) if match else -1
  
-def get_list_of_graphs_and_chunks (graph_q='graph_*_graph_clean.csv',  chunk_q='graph_*_chunks_clean.csv', data_dir='./',verbatim=False):
+# Columnar output: triplet, chunk, node and edge tables as Parquet (needs pyarrow). String
+# columns such as node names repeat a lot, so they are stored dictionary-encoded.
+DICTIONARY_COLUMNS = ('node_1', 'node_2', 'edge', 'chunk_id', 'nodes', 'edge_list')
+
+def save_parquet_table(df, file_path, dictionary_columns=DICTIONARY_COLUMNS, compression='zstd'):
+    """
+    Write a DataFrame as Parquet, with the given string columns dictionary-encoded.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # LLM output can leave non-string values in string columns, which Arrow does not accept
+    df = df.assign(**{name: df[name].where(df[name].isna(), df[name].astype(str))
+                      for name in dictionary_columns if name in df.columns and df[name].dtype == object})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in dictionary_columns:
+        if name in table.column_names and (pa.types.is_string(table.schema.field(name).type)
+                                          or pa.types.is_large_string(table.schema.field(name).type)):
+            table = table.set_column(table.column_names.index(name), name, table[name].dictionary_encode())
+    pq.write_table(table, file_path, compression=compression)
+    return file_path
+
+def load_parquet_table(file_path, columns=None, categorical=False):
+    """
+    Read a table written by save_parquet_table.
+
+    Args:
+    - file_path (str): Parquet file.
+    - columns (list or None): Only read these columns.
+    - categorical (bool): Keep dictionary-encoded columns as pandas categoricals instead of
+      decoding them to plain strings (less memory, but groupby needs observed=True).
+
+    Returns:
+    - pd.DataFrame
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(file_path, columns=columns)
+    if not categorical:
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table[field.name].cast(field.type.value_type))
+        return table.to_pandas()
+    # The pandas metadata would turn dictionary columns back into the original string dtype
+    return table.to_pandas(ignore_metadata=True)
+
+def read_graph_table(file_path, **kwargs):
+    """
+    Read a triplet/chunk/node/edge table written by make_graph_from_text, as Parquet or CSV
+    depending on the file extension.
+    """
+    if str(file_path).endswith('.parquet'):
+        return load_parquet_table(file_path, columns=kwargs.get('usecols'))
+    return pd.read_csv(file_path, **kwargs)
+
+def get_list_of_graphs_and_chunks (graph_q=None,  chunk_q=None, data_dir='./',verbatim=False, file_format='csv'):
+    """
+    Find triplet and chunk files written by make_graph_from_text, sorted by the number in their names.
+    Default patterns are 'graph_*_graph_clean.csv' / 'graph_*_chunks_clean.csv' for file_format='csv'
+    and 'graph_*_graph.parquet' / 'graph_*_chunks.parquet' for file_format='parquet'.
+    """
+    if graph_q is None:
+        graph_q = 'graph_*_graph.parquet' if file_format == 'parquet' else 'graph_*_graph_clean.csv'
+    if chunk_q is None:
+        chunk_q = 'graph_*_chunks.parquet' if file_format == 'parquet' else 'graph_*_chunks_clean.csv'
     graph_pattern = os.path.join(data_dir, graph_q)
     chunk_pattern = os.path.join(data_dir, chunk_q)
     
@@ -938,17 +1874,19 @@ def get_list_of_graphs_and_chunks (graph_q='graph_*_graph_clean.csv',  chunk_q='
     
     return graph_file_list, chunk_file_list
 
-def print_graph_nodes_with_texts(G, separator="; ", N=64):
+def print_graph_nodes_with_texts(G, separator="; ", N=64, text_store=None):
     """
     Prints out each node in the graph along with the associated texts, concatenated into a single string.
 
     Parameters:
-    - G: A NetworkX graph object where each node has a 'texts' attribute containing a list of texts.
+    - G: A NetworkX graph object where each node has a 'texts' attribute containing a list of texts
+      (or 'text_ids' into a text store, see node_texts).
     - separator: A string separator used to join texts. Default is "; ".
+    - text_store: TextStore for 'text_ids', by default the one recorded in G.graph['text_store'].
     """
     print("Graph Nodes and Their Associated Texts (Concatenated):")
-    for node, data in G.nodes(data=True):
-        texts = data.get('texts', [])
+    for node in G.nodes():
+        texts = node_texts(G, node, text_store=text_store)
         concatenated_texts = separator.join(texts)
         print(f"Node: {node}, Texts: {concatenated_texts[:N]}")      
        
@@ -965,11 +1903,12 @@ def print_graph_nodes (G, separator="; ", N=64):
     for node in G.nodes :
         print(f"Node {i}: {node}")  
         i=i+1
-def get_text_associated_with_node(G, node_identifier ='bone', ):
+def get_text_associated_with_node(G, node_identifier ='bone', text_store=None):
         
-    # Accessing and printing the 'texts' attribute for the node
-    if 'texts' in G.nodes[node_identifier]:
-        texts = G.nodes[node_identifier]['texts']
+    # Accessing and printing the 'texts' attribute for the node; with out-of-line texts
+    # ('text_ids'), they are fetched from text_store or the store recorded in G.graph['text_store']
+    if 'texts' in G.nodes[node_identifier] or 'text_ids' in G.nodes[node_identifier]:
+        texts = node_texts(G, node_identifier, text_store=text_store)
         concatenated_texts = "; ".join(texts)  # Assuming you want to concatenate the texts
         print(f"Texts associated with node '{node_identifier}': {concatenated_texts}")
     else:
@@ -982,32 +1921,435 @@ import json
 from copy import deepcopy
 from tqdm import tqdm
 
-def save_graph_with_text_as_JSON(G_or, data_dir='./', graph_name='my_graph.graphml'):
-    G = deepcopy(G_or)
+import warnings
+from xml.sax.saxutils import escape, quoteattr
+from networkx.readwrite.graphml import GraphML
+
+# Same Python type -> GraphML type table as nx.write_graphml
+_graphml = GraphML()
+_graphml.construct_types()
+
+def _graphml_type(value_type):
+    try:
+        return _graphml.xml_type[value_type]
+    except KeyError:
+        raise TypeError(f"GraphML does not support type {value_type} as data values.")
+
+def write_graphml_streaming(G, file_path, convert=None, converted_type=None, skip_attributes=(),
+                            edge_ids=False, verbatim=True):
+    """
+    Write a graph as GraphML without copying it. Attribute values are converted while nodes and
+    edges are written, so peak memory does not grow with the graph. The output reads back with
+    nx.read_graphml like a file from nx.write_graphml.
+
+    Args:
+    - G (networkx graph): The graph, left unchanged.
+    - file_path (str): Output file.
+    - convert (callable or None): Applied to every node/edge attribute value before writing.
+    - converted_type (callable or None): value -> type of convert(value), to declare the GraphML
+      keys without converting everything twice. Defaults to type(convert(value)).
+    - skip_attributes (iterable): Node/edge attributes not to write.
+    - edge_ids (bool): Number the edges: id="i" on the edge element and an 'id' attribute.
+    - verbatim (bool): Show progress bars.
+    """
+    if convert is None:
+        convert = lambda value: value
+    if converted_type is None:
+        converted_type = lambda value: type(convert(value))
+    skip = set(skip_attributes)
+    if edge_ids:
+        skip.add('id')
+    node_default = G.graph.get('node_default', {})
+    edge_default = G.graph.get('edge_default', {})
+    graph_data = {k: v for k, v in G.graph.items() if k not in ('node_default', 'edge_default', 'id')}
+
+    def edges():
+        if G.is_multigraph():
+            return ((u, v, key, data) for u, v, key, data in G.edges(keys=True, data=True))
+        return ((u, v, None, data) for u, v, data in G.edges(data=True))
+
+    # First pass: GraphML keys per (name, type, scope), as networkx declares them
+    keys = {}
+    defaults = {}
+    def key_id(name, value_type, scope, default=None):
+        key = (name, _graphml_type(value_type), scope)
+        if key not in keys:
+            keys[key] = f"d{len(keys)}"
+            defaults[key] = default
+        return keys[key]
+
+    for k, v in graph_data.items():
+        key_id(str(k), type(v), 'graph')
+    for _, data in G.nodes(data=True):
+        for k, v in data.items():
+            if k not in skip:
+                key_id(str(k), converted_type(v), 'node', node_default.get(k))
+    for _, _, _, data in edges():
+        for k, v in data.items():
+            if k not in skip:
+                key_id(str(k), converted_type(v), 'edge', edge_default.get(k))
+    if edge_ids:
+        key_id('id', str, 'edge')
+
+    def data_elements(data, scope, values):
+        return "".join(f'<data key="{keys[(str(k), _graphml_type(type(v)), scope)]}">{escape(str(v))}</data>'
+                       for k, v in values(data))
+
+    def converted(data):
+        return ((k, convert(v)) for k, v in data.items() if k not in skip)
+
+    # Second pass: stream the document
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n"
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+                'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+        for (name, value_type, scope), identifier in keys.items():
+            default = defaults[(name, value_type, scope)]
+            default = '' if default is None else f'<default>{escape(str(default))}</default>'
+            f.write(f'  <key id="{identifier}" for="{scope}" attr.name={quoteattr(name)} attr.type="{value_type}"'
+                    + (f'>{default}</key>\n' if default else ' />\n'))
+        graph_id = f' id={quoteattr(str(G.graph["id"]))}' if 'id' in G.graph else ''
+        f.write(f'  <graph edgedefault="{"directed" if G.is_directed() else "undirected"}"{graph_id}>\n')
+        f.write(data_elements(graph_data, 'graph', lambda data: data.items()))
+
+        for node, data in tqdm(G.nodes(data=True), disable=not verbatim, desc="Writing nodes"):
+            f.write(f'    <node id={quoteattr(str(node))}>{data_elements(data, "node", converted)}</node>\n')
+
+        for i, (u, v, key, data) in enumerate(tqdm(edges(), total=G.number_of_edges(), disable=not verbatim,
+                                                     desc="Writing edges")):
+            if edge_ids:
+                edge_id = f' id="{i}"'
+                attributes = data_elements(data, "edge", converted) + f'<data key="{keys[("id", "string", "edge")]}">{i}</data>'
+            else:
+                edge_id = f' id={quoteattr(str(key))}' if key is not None else ''
+                attributes = data_elements(data, "edge", converted)
+            f.write(f'    <edge source={quoteattr(str(u))} target={quoteattr(str(v))}{edge_id}>{attributes}</edge>\n')
+        f.write('  </graph>\n</graphml>\n')
+    return file_path
+
+class _GraphMLFallback(Exception):
+    pass
+
+class _GraphMLTarget:
+    """
+    Parser target for read_graphml_streaming: builds the graph from parser callbacks, so no
+    XML element tree is kept (or even created).
+    """
+
+    def __init__(self, skip):
+        self.ns = ns = f"{{{_graphml.NS_GRAPHML}}}"
+        self.tags = {name: ns + name for name in ('key', 'default', 'graph', 'node', 'edge', 'data')}
+        self.skip = skip
+        self.keys = {}
+        self.defaults = {'node': {}, 'edge': {}}
+        self.G = None
+        self.graph_data = {}
+        self.key = None       # attributes of the <key> being read
+        self.item = None      # (tag, attributes, data) of the node/edge being read
+        self.data_key = None  # key id of the <data> being read
+        self.text = None      # text of the <data>/<default> being read
+
+    def value(self, python_type, text):
+        if python_type is bool:
+            return _graphml.convert_bool[text.lower()]
+        return python_type(text)
+
+    def start(self, tag, attrib):
+        tags = self.tags
+        if self.text is not None:
+            raise _GraphMLFallback()  # yEd data, elements inside <data>
+        if tag == tags['data']:
+            self.data_key = attrib.get('key')
+            self.text = []
+        elif tag == tags['node'] or tag == tags['edge']:
+            if self.item is not None:
+                raise _GraphMLFallback()  # nested graph
+            self.item = (tag, attrib, {})
+        elif tag == tags['graph']:
+            if self.G is not None:
+                raise _GraphMLFallback()  # nested graph
+            self.G = nx.DiGraph() if attrib.get('edgedefault') == 'directed' else nx.Graph()
+        elif tag == tags['key']:
+            if attrib.get('yfiles.type') is not None:
+                raise _GraphMLFallback()
+            self.key = attrib
+        elif tag == tags['default']:
+            self.text = []
+        elif tag.startswith(self.ns) and tag[len(self.ns):] not in ('graphml', 'desc'):
+            raise _GraphMLFallback()  # hyperedges, ports, ...
+
+    def data(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        tags = self.tags
+        if tag == tags['data']:
+            try:
+                name, python_type = self.keys[self.data_key]
+            except KeyError:
+                raise nx.NetworkXError(f"Bad GraphML data: no key {self.data_key}")
+            if name not in self.skip:
+                text = "".join(self.text)
+                target = self.item[2] if self.item is not None else self.graph_data
+                target[name] = self.value(python_type, text) if text else ""
+            self.text = None
+        elif tag == tags['node']:
+            _, attrib, data = self.item
+            self.G.add_node(attrib.get('id'), **data)
+            self.item = None
+        elif tag == tags['edge']:
+            _, attrib, data = self.item
+            G = self.G
+            directed = attrib.get('directed')
+            if (G.is_directed() and directed == 'false') or (not G.is_directed() and directed == 'true'):
+                raise nx.NetworkXError(f"directed={directed} edge found in "
+                                       f"{'directed' if G.is_directed() else 'undirected'} graph.")
+            source, target = attrib.get('source'), attrib.get('target')
+            if G.has_edge(source, target):
+                raise _GraphMLFallback()  # parallel edges, read as a multigraph
+            if attrib.get('id'):
+                data['id'] = attrib.get('id')
+            G.add_edge(source, target, **data)
+            self.item = None
+        elif tag == tags['default']:
+            self.key = dict(self.key, default="".join(self.text))
+            self.text = None
+        elif tag == tags['key']:
+            attrib = self.key
+            attr_type = attrib.get('attr.type')
+            if attr_type is None:
+                attr_type = 'string'
+                warnings.warn(f"No key type for id {attrib.get('id')}. Using string")
+            if attrib.get('attr.name') is None:
+                raise nx.NetworkXError(f"Unknown key for id {attrib.get('id')}.")
+            python_type = _graphml.python_type[attr_type]
+            self.keys[attrib.get('id')] = (attrib.get('attr.name'), python_type)
+            if 'default' in attrib and attrib.get('for') in self.defaults:
+                self.defaults[attrib.get('for')][attrib.get('attr.name')] = self.value(python_type, attrib['default'])
+            self.key = None
+
+    def close(self):
+        G = self.G
+        if G is None:
+            raise nx.NetworkXError("file not successfully read as graphml")
+        G.graph['node_default'] = self.defaults['node']
+        G.graph['edge_default'] = self.defaults['edge']
+        G.graph.update(self.graph_data)
+        return G
+
+def read_graphml_streaming(file_path, skip_attributes=(), verbatim=False):
+    """
+    Read a GraphML file as nx.read_graphml does, but incrementally: nodes and edges go straight
+    from the parser into a Graph/DiGraph, without an XML tree in memory (nx.read_graphml keeps
+    the whole tree, builds a multigraph and then copies it). Files with parallel edges, nested
+    graphs, hyperedges or yEd data are handed to nx.read_graphml.
+
+    Args:
+    - file_path (str): GraphML file.
+    - skip_attributes (iterable): Node/edge attributes not to load.
+    - verbatim (bool): Print a note when falling back to nx.read_graphml.
 
+    Returns:
+    - G (nx.Graph or nx.DiGraph)
+    """
+    import xml.etree.ElementTree as ET
+    skip = set(skip_attributes)
+    try:
+        parser = ET.XMLParser(target=_GraphMLTarget(skip))
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                parser.feed(block)
+        G = parser.close()
+    except _GraphMLFallback:
+        if verbatim:
+            print("read_graphml_streaming: falling back to nx.read_graphml")
+        G = nx.read_graphml(file_path)
+        for _, data in G.nodes(data=True):
+            for key in skip:
+                data.pop(key, None)
+        for _, _, data in G.edges(data=True):
+            for key in skip:
+                data.pop(key, None)
+    return G
+
+def _json_attribute(value):
+    if isinstance(value, (list, dict, set, tuple)):  # Extend this as needed
+        return json.dumps(value)
+    return value
+
+def _json_attribute_type(value):
+    return str if isinstance(value, (list, dict, set, tuple)) else type(value)
+
+def save_graph_with_text_as_JSON(G_or, data_dir='./', graph_name='my_graph.graphml'):
+    """
+    Save a graph as GraphML, with list/dict attributes (e.g. 'texts') encoded as JSON strings.
+    Attributes are encoded while writing, the graph is neither copied nor changed.
+    """
     # Ensure correct path joining
     import os
     fname = os.path.join(data_dir, graph_name)
 
-    for _, data in tqdm(G.nodes(data=True)):
-        for key in data:
-            if isinstance(data[key], (list, dict, set, tuple)):  # Extend this as needed
-                data[key] = json.dumps(data[key])
+    write_graphml_streaming(G_or, fname, convert=_json_attribute, converted_type=_json_attribute_type)
+    return fname
 
-    for _, _, data in tqdm(G.edges(data=True)):
-        for key in data:
-            if isinstance(data[key], (list, dict, set, tuple)):  # Extend this as needed
-                data[key] = json.dumps(data[key])
+class LazyJSONDict(dict):
+    """
+    Node/edge attribute dict whose string values are JSON-decoded on first access, as
+    load_graph_with_text_as_JSON would decode them up front. Checking keys ('texts' in data)
+    does not decode anything; reading a value decodes (and caches) that value only.
+    """
+    __slots__ = ('_pending',)
+
+    def __init__(self, data=(), pending=None):
+        dict.__init__(self, data)
+        # Keys still to decode, None until the first access (then: all string values)
+        self._pending = None if pending is None else set(pending)
+
+    @property
+    def pending(self):
+        if self._pending is None:
+            self._pending = {key for key, value in dict.items(self) if isinstance(value, str)}
+        return self._pending
+
+    def _decode(self, key):
+        self.pending.discard(key)
+        value = dict.__getitem__(self, key)
+        try:
+            dict.__setitem__(self, key, json.loads(value))
+        except json.JSONDecodeError:
+            pass  # Not a JSON string, keep it as is
 
-    nx.write_graphml(G, fname)
-    return fname
+    def _decode_all(self):
+        for key in list(self.pending):
+            self._decode(key)
+
+    def __getitem__(self, key):
+        if key in self.pending:
+            self._decode(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    # Defining __iter__ keeps dict(data), data.update(...) and {**data} from copying the raw
+    # values behind our back: they go through keys() and __getitem__ instead.
+    def __iter__(self):
+        return dict.__iter__(self)
 
-def load_graph_with_text_as_JSON(data_dir='./', graph_name='my_graph.graphml'):
+    def __setitem__(self, key, value):
+        self.pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.pending.discard(key)
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self.pending:
+            self._decode(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._decode_all()
+        return dict.popitem(self)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        self.pending.difference_update(other)
+        dict.update(self, other)
+
+    def clear(self):
+        self.pending.clear()
+        dict.clear(self)
+
+    def items(self):
+        self._decode_all()
+        return dict.items(self)
+
+    def values(self):
+        self._decode_all()
+        return dict.values(self)
+
+    def copy(self):
+        # The copy stays lazy
+        return LazyJSONDict(dict.items(self), self.pending)
+
+    def __eq__(self, other):
+        self._decode_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        # pickle / deepcopy
+        return (LazyJSONDict, (dict(dict.items(self)), set(self.pending)))
+
+def _make_attributes_lazy(G):
+    """
+    Swap the node/edge attribute dicts of G for LazyJSONDict, in place. Both directions of an
+    edge share one attribute dict, and so do the new ones.
+    """
+    wrap = LazyJSONDict
+
+    for node in G._node:
+        G._node[node] = wrap(G._node[node])
+
+    succ = G._adj
+    pred = G._pred if G.is_directed() else G._adj
+    for u in succ:
+        for v, data in list(succ[u].items()):
+            if G.is_multigraph():
+                for key, edge_data in list(data.items()):
+                    if isinstance(edge_data, LazyJSONDict):
+                        continue
+                    lazy = wrap(edge_data)
+                    succ[u][v][key] = lazy
+                    pred[v][u][key] = lazy
+            elif not isinstance(data, LazyJSONDict):
+                lazy = wrap(data)
+                succ[u][v] = lazy
+                pred[v][u] = lazy
+    return G
+
+def load_graph_with_text_as_JSON(data_dir='./', graph_name='my_graph.graphml', lazy=False, skip_attributes=()):
+    """
+    Load a graph saved by save_graph_with_text_as_JSON, decoding the JSON string attributes
+    (e.g. 'texts') back into lists/dicts.
+
+    Args:
+    - data_dir (str): Directory of the graph file.
+    - graph_name (str): GraphML file name.
+    - lazy (bool): Decode each attribute on first access instead of all of them while loading.
+      Structure-only queries (shortest paths, neighbors, degrees) then never pay for decoding.
+    - skip_attributes (iterable): Node/edge attributes to drop entirely, e.g. ('texts',) when
+      only the structure and embeddings are needed.
+
+    Returns:
+    - G (networkx graph)
+    """
     # Ensure correct path joining
     import os
     fname = os.path.join(data_dir, graph_name)
 
-    G = nx.read_graphml(fname)
+    G = read_graphml_streaming(fname, skip_attributes=skip_attributes)
+
+    if lazy:
+        return _make_attributes_lazy(G)
 
     for node, data in tqdm(G.nodes(data=True)):
         for key, value in data.items():
@@ -1033,31 +2375,16 @@ from tqdm import tqdm
 import os
 
 def save_graph_without_text(G_or, data_dir='./', graph_name='my_graph.graphml'):
-    G = deepcopy(G_or)
-
-    # Process nodes: remove 'texts' attribute and convert others to string
-    for _, data in tqdm(G.nodes(data=True), desc="Processing nodes"):
-        if 'texts' in data:
-            del data['texts']  # Remove the 'texts' attribute
-        # Convert all other attributes to strings
-        for key in data:
-            data[key] = str(data[key])
-
-    # Process edges: similar approach, remove 'texts' and convert attributes
-    for i, (_, _, data) in enumerate(tqdm(G.edges(data=True), desc="Processing edges")):
-    #for _, _, data in tqdm(G.edges(data=True), desc="Processing edges"):
-        data['id'] = str(i)  # Assign a unique ID
-        if 'texts' in data:
-            del data['texts']  # Remove the 'texts' attribute
-        # Convert all other attributes to strings
-        for key in data:
-            data[key] = str(data[key])
-    
+    """
+    Save a graph as GraphML without the 'texts' attribute, all other attributes as strings and
+    edges numbered by an 'id' attribute. The graph is neither copied nor changed.
+    """
     # Ensure correct directory path and file name handling
     fname = os.path.join(data_dir, graph_name)
     
-    # Save the graph to a GraphML file
-    nx.write_graphml(G, fname, edge_id_from_attribute='id')
+    # Save the graph to a GraphML file, converting attributes on the fly
+    write_graphml_streaming(G_or, fname, convert=str, converted_type=lambda value: str,
+                            skip_attributes=('texts',), edge_ids=True)
     return fname
 
 def print_nodes_and_labels (G, N=10):
@@ -1096,61 +2423,138 @@ import networkx as nx
 from tqdm import tqdm
 import json
 
+def aggregate_triplets(graph_df):
+    """
+    Group triplets by node pair: chunk ids and edge labels are joined with ',' and counts summed.
+    """
+    return (graph_df.groupby(["node_1", "node_2"])
+            .agg({"chunk_id": ",".join, "edge": ','.join, 'count': 'sum'})
+            .reset_index())
+
+def graph_from_triplets(graph_df, G=None, include_chunk_id=False):
+    """
+    Add the edges of an aggregated triplet DataFrame (see aggregate_triplets) to a graph in a
+    single add_edges_from call, with title=edge, weight=count/4 and optionally chunk_id.
+
+    Args:
+    - graph_df (pd.DataFrame): Columns node_1, node_2, edge, count (and chunk_id).
+    - G (networkx.Graph or None): Graph to add the edges to, a new nx.Graph if None.
+    - include_chunk_id (bool): Store the joined chunk ids as edge attribute 'chunk_id'.
+
+    Returns:
+    - G
+    """
+    if G is None:
+        G = nx.Graph()
+    attributes = {'title': graph_df['edge'].to_numpy(), 'weight': (graph_df['count'] / 4).to_numpy()}
+    if include_chunk_id:
+        attributes['chunk_id'] = graph_df['chunk_id'].to_numpy()
+    G.add_edges_from(zip(graph_df['node_1'].astype(str), graph_df['node_2'].astype(str),
+                         pd.DataFrame(attributes).to_dict('records')))
+    return G
+
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def read_triplet_file(graph_file, chunk_file):
+    """
+    Read one pair of triplet and chunk files (CSV or Parquet) as written by make_graph_from_text.
+
+    Returns:
+    - (graph_df, chunk_ids, texts): triplets cleaned and aggregated per node pair (see
+      aggregate_triplets), and the chunk ids with their texts.
+    """
+    graph_df = read_graph_table(graph_file)
+    text_df = read_graph_table(chunk_file, usecols=['chunk_id', 'text'])
+
+    # Clean and aggregate the graph data
+    graph_df.replace("", np.nan, inplace=True)
+    graph_df.dropna(subset=["node_1", "node_2", 'edge'], inplace=True)
+    graph_df['count'] = 4  # Example fixed count, adjust as necessary
+    graph_df = aggregate_triplets(graph_df)
+    return graph_df, text_df['chunk_id'].tolist(), text_df['text'].tolist()
+
+def _read_triplet_files(file_pairs, max_workers=1):
+    # Yield (idx, result or exception) in input order. With max_workers > 1 files are parsed
+    # in worker processes, with at most 2*max_workers results pending so memory stays bounded
+    if max_workers <= 1:
+        for idx, graph_file, chunk_file in file_pairs:
+            try:
+                yield idx, read_triplet_file(graph_file, chunk_file)
+            except Exception as e:
+                yield idx, e
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        file_pairs = iter(file_pairs)
+        for idx, graph_file, chunk_file in itertools.islice(file_pairs, 2 * max_workers):
+            pending.append((idx, executor.submit(read_triplet_file, graph_file, chunk_file)))
+        while pending:
+            idx, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            for next_idx, graph_file, chunk_file in itertools.islice(file_pairs, 1):
+                pending.append((next_idx, executor.submit(read_triplet_file, graph_file, chunk_file)))
+            yield idx, result
+
 def make_graph_from_text_withtext(graph_file_list, chunk_file_list,
                                   include_contextual_proximity=False,
                                   graph_root='graph_root',
                                   repeat_refine=0, verbatim=False,
                                   data_dir='./data_output_KG/',
                                   save_PDF=False, save_HTML=True, N_max=10,
-                                  idx_start=0):
+                                  idx_start=0, max_workers=1, text_store=None):
     """
     Constructs a graph from text data, ensuring edge labels do not incorrectly include node names.
+
+    Files are streamed: each pair of graph/chunk files is parsed (in max_workers processes if
+    max_workers > 1), its edges are added to the graph and its texts to the chunk_id -> text
+    map, and then it is dropped. Memory is bounded by the graph and the texts, not by the
+    sum of all CSV files.
+
+    With a text_store (TextStore), each chunk text is stored there once and nodes get a
+    'text_ids' list of its keys instead of a 'texts' list (see get_text_associated_with_node).
     """
 
-    # Initialize an empty DataFrame to store all texts
-    all_texts_df = pd.DataFrame()
+    # Append-only chunk_id -> text store, the first text seen for a chunk_id wins
+    chunk_id_to_text = {}
 
     # Initialize an empty graph
     G_total = nx.Graph()
 
-    for idx in tqdm(range(idx_start, min(len(graph_file_list), N_max)), desc="Processing graphs"):
-        try:
-            # Load graph and chunk data
-            graph_df = pd.read_csv(graph_file_list[idx])
-            text_df = pd.read_csv(chunk_file_list[idx])
-            
-            # Append the current text_df to the all_texts_df
-            all_texts_df = pd.concat([all_texts_df, text_df], ignore_index=True)
-    
-            # Clean and aggregate the graph data
-            graph_df.replace("", np.nan, inplace=True)
-            graph_df.dropna(subset=["node_1", "node_2", 'edge'], inplace=True)
-            graph_df['count'] = 4  # Example fixed count, adjust as necessary
-            
-            # Aggregate edges and combine attributes
-            graph_df = (graph_df.groupby(["node_1", "node_2"])
-                        .agg({"chunk_id": ",".join, "edge": ','.join, 'count': 'sum'})
-                        .reset_index())
-            
-            if verbatim:
-                print("Shape of graph DataFrame: ", graph_df.shape)
-    
-            # Add edges to the graph
-            for _, row in graph_df.iterrows():
-                G_total.add_edge(row['node_1'], row['node_2'], chunk_id=row['chunk_id'],
-                                 title=row['edge'], weight=row['count'] / 4)
-    
-        except Exception as e:
-            print(f"Error in graph generation for idx={idx}: {e}")
-   
-    # Ensure no duplicate chunk_id entries
-    all_texts_df = all_texts_df.drop_duplicates(subset=['chunk_id'])
-    
-    # Map chunk_id to text
-    chunk_id_to_text = pd.Series(all_texts_df.text.values, index=all_texts_df.chunk_id).to_dict()
+    indices = range(idx_start, min(len(graph_file_list), N_max))
+    file_pairs = ((idx, graph_file_list[idx], chunk_file_list[idx]) for idx in indices)
+    for idx, result in tqdm(_read_triplet_files(file_pairs, max_workers=max_workers),
+                            total=len(indices), desc="Processing graphs"):
+        if isinstance(result, Exception):
+            print(f"Error in graph generation for idx={idx}: {result}")
+            continue
+        graph_df, chunk_ids, texts = result
+
+        for chunk_id, text in zip(chunk_ids, texts):
+            if chunk_id not in chunk_id_to_text:
+                chunk_id_to_text[chunk_id] = text
+
+        if verbatim:
+            print("Shape of graph DataFrame: ", graph_df.shape)
+
+        # Add edges to the graph
+        graph_from_triplets(graph_df, G_total, include_chunk_id=True)
+
+    if text_store is not None:
+        # Store every chunk text once; nodes then refer to texts by key
+        chunk_id_to_text = {chunk_id: key for chunk_id, key in
+                            zip(chunk_id_to_text, text_store.put_many([str(text) for text in chunk_id_to_text.values()]))
+                            if chunk_id_to_text[chunk_id]}
+        if text_store.path != ':memory:':
+            G_total.graph['text_store'] = os.path.abspath(text_store.path)
 
     # Initialize node texts collection
-    node_texts = {node: set() for node in G_total.nodes()}
+    texts_of_node = {node: set() for node in G_total.nodes()}
 
     # Associate texts with nodes based on edges
     for (node1, node2, data) in tqdm(G_total.edges(data=True), desc="Mapping texts to nodes"):
@@ -1158,12 +2562,13 @@ def make_graph_from_text_withtext(graph_file_list, chunk_file_list,
         for chunk_id in chunk_ids:
             text = chunk_id_to_text.get(chunk_id, "")
             if text:  # If text is found for the chunk_id
-                node_texts[node1].add(text)
-                node_texts[node2].add(text)
+                texts_of_node[node1].add(text)
+                texts_of_node[node2].add(text)
 
-    # Update nodes with their texts
-    for node, texts in node_texts.items():
-        G_total.nodes[node]['texts'] = list(texts)  # Convert from set to list
+    # Update nodes with their texts (or text keys)
+    attribute = 'texts' if text_store is None else 'text_ids'
+    for node, texts in texts_of_node.items():
+        G_total.nodes[node][attribute] = list(texts)  # Convert from set to list
 
     return G_total
 import numpy as np
@@ -1171,74 +2576,64 @@ from tqdm import tqdm
 import networkx as nx
 from sklearn.metrics.pairwise import cosine_similarity
 
-def regenerate_node_embeddings(graph, nodes_to_recalculate, tokenizer, model):
+def regenerate_node_embeddings(graph, nodes_to_recalculate, tokenizer, model, batch_size=64, verbatim=True):
     """
-    Regenerate embeddings for specific nodes.
+    Regenerate embeddings for specific nodes (with a progress bar if verbatim).
     """
-    new_embeddings = {}
-    for node in tqdm(nodes_to_recalculate):
-        inputs = tokenizer(node, return_tensors="pt")
-        outputs = model(**inputs)
-        new_embeddings[node] = outputs.last_hidden_state.mean(dim=1).detach().numpy()
-    return new_embeddings
+    return embed_nodes(nodes_to_recalculate, tokenizer, model, batch_size=batch_size, verbatim=verbatim)
     
 def simplify_graph_with_text(graph_, node_embeddings, tokenizer, model, similarity_threshold=0.9, use_llm=False,
                    data_dir_output='./', graph_root='simple_graph', verbatim=False, max_tokens=2048, 
-                   temperature=0.3, generate=None):
+                   temperature=0.3, generate=None, candidate_method='blocked', ann_index=None, max_neighbors=None,
+                   representative='degree', copy_on_write=False):
     """
     Simplifies a graph by merging similar nodes and optionally renaming them using a language model.
     Also, merges 'texts' node attribute ensuring no duplicates.
+    Candidate pairs and merge clusters are computed as in simplify_graph, and embeddings
+    are returned as in simplify_graph (a new dict, or an overlay with copy_on_write=True).
     """
 
     graph = deepcopy(graph_)
     
     nodes = list(node_embeddings.keys())
-    embeddings_matrix = np.array([node_embeddings[node].flatten() for node in nodes])
-
-    similarity_matrix = cosine_similarity(embeddings_matrix)
-    to_merge = np.where(similarity_matrix > similarity_threshold)
+    to_merge = find_similar_node_pairs(node_embeddings, similarity_threshold=similarity_threshold,
+                                       method=candidate_method, index=ann_index, max_neighbors=max_neighbors,
+                                       verbatim=verbatim)
 
-    node_mapping = {}
-    nodes_to_recalculate = set()
-    merged_nodes = set()  # Keep track of nodes that have been merged
     if verbatim:
         print("Start...")
-    for i, j in tqdm(zip(*to_merge), total=len(to_merge[0])):
-        if i != j and nodes[i] not in merged_nodes and nodes[j] not in merged_nodes:  # Check for duplicates
-            node_i, node_j = nodes[i], nodes[j]
-            
-            try:
-                if graph.degree(node_i) >= graph.degree(node_j):
-                    node_to_keep, node_to_merge = node_i, node_j
-                else:
-                    node_to_keep, node_to_merge = node_j, node_i
-    
-                # Handle 'texts' attribute by merging and removing duplicates
-                texts_to_keep = set(graph.nodes[node_to_keep].get('texts', []))
-                texts_to_merge = set(graph.nodes[node_to_merge].get('texts', []))
-                merged_texts = list(texts_to_keep.union(texts_to_merge))
-                graph.nodes[node_to_keep]['texts'] = merged_texts
-    
-                if verbatim:
-                    print("Node to keep and merge:", node_to_keep, "<--", node_to_merge)
-    
-                node_mapping[node_to_merge] = node_to_keep
-                nodes_to_recalculate.add(node_to_keep)
-                merged_nodes.add(node_to_merge)  # Mark the merged node to avoid duplicate handling
-            except Exception as e:
-                print("Error during merging:", e)
+    # Plan all merges at once: clusters of similar nodes collapse onto one representative
+    node_mapping, merge_log = plan_node_merges(graph, nodes, to_merge, representative=representative, verbatim=verbatim)
+    nodes_to_recalculate = set(node_mapping.values())
+    merged_nodes = set(node_mapping.keys())  # Keep track of nodes that have been merged
+
+    # Handle 'texts' attribute (or 'text_ids' for out-of-line texts) by merging each cluster
+    # into its representative, removing duplicates
+    text_attribute = 'text_ids' if any('text_ids' in data for _, data in graph.nodes(data=True)) else 'texts'
+    merged_texts = {}
+    for node_to_merge, node_to_keep in node_mapping.items():
+        if node_to_keep not in merged_texts:
+            merged_texts[node_to_keep] = set(graph.nodes[node_to_keep].get(text_attribute, []))
+        merged_texts[node_to_keep].update(graph.nodes[node_to_merge].get(text_attribute, []))
+        if verbatim:
+            print("Node to keep and merge:", node_to_keep, "<--", node_to_merge)
+    merge_log.to_csv(f'{data_dir_output}/{graph_root}_merge_log.csv', index=False)
     if verbatim:
         print ("Now relabel. ")
     # Create the simplified graph by relabeling nodes.
     new_graph = nx.relabel_nodes(graph, node_mapping, copy=True)
+    # Set merged texts after relabeling, which would otherwise copy the merged nodes' attributes over them
+    for node_to_keep, texts in merged_texts.items():
+        new_graph.nodes[node_to_keep][text_attribute] = list(texts)
     if verbatim:
         print ("New graph generated, nodes relabled. ")
     # Recalculate embeddings for nodes that have been merged or renamed.
-    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model)
+    recalculated_embeddings = regenerate_node_embeddings(new_graph, nodes_to_recalculate, tokenizer, model, verbatim=verbatim)
     if verbatim:
         print ("Relcaulated embeddings... ")
-    # Update the embeddings dictionary with the recalculated embeddings.
-    updated_embeddings = {**node_embeddings, **recalculated_embeddings}
+    # Update the embeddings with the recalculated embeddings (copy-on-write, the input is left unchanged).
+    updated_embeddings = EmbeddingOverlay.of(node_embeddings)
+    updated_embeddings.update(recalculated_embeddings)
     if verbatim:
         print ("Done recalculate embeddings... ")
     
@@ -1255,4 +2650,4 @@ def simplify_graph_with_text(graph_, node_embeddings, tokenizer, model, similari
     if verbatim:
         print(f"Graph simplified and saved to {graph_path}")
 
-    return new_graph, updated_embeddings
+    return new_graph, updated_embeddings if copy_on_write else NodeEmbeddings(updated_embeddings)
@@ -0,0 +1,115 @@
+import json
+import time
+import hashlib
+
+from GraphReasoning.sqlite_store import SQLiteCache
+
+# Persistent cache for LLM responses.
+#
+# make_cached_generate wraps any generate(system_prompt=..., prompt=..., ...) callable.
+# Responses are keyed on (system_prompt, prompt, model, temperature, max_tokens) and kept
+# in a SQLite file with TTL and LRU size eviction, so rerunning make_graph_from_text on
+# the same corpus (or sweeping chunk_size) only pays for prompts that were never sent:
+#
+#   cache = LLMResponseCache('./llm_cache.sqlite', ttl=30*24*3600, max_entries=200000)
+#   generate_cached = make_cached_generate(generate, cache, model='mistral-openorca')
+#   make_graph_from_text(txt, generate_cached, ...)
+
+class LLMResponseCache(SQLiteCache):
+    """
+    Disk-backed cache of LLM responses in SQLite.
+
+    Parameters:
+    - path (str): SQLite file. Use ':memory:' for a cache that only lives in this process.
+    - ttl (float or None): Seconds after which an entry expires, None for no expiry.
+    - max_entries (int or None): Maximum number of responses kept (least recently used are evicted).
+    - enabled (bool): If False, lookups always miss and nothing is written.
+
+    Attributes:
+    - hits, misses (int): Lookup counters since creation or the last reset_stats().
+    """
+
+    table = 'responses'
+
+    def __init__(self, path='./llm_cache.sqlite', ttl=None, max_entries=100000, enabled=True):
+        super().__init__(path, ["CREATE TABLE IF NOT EXISTS responses ("
+                                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                                "created REAL NOT NULL, last_access REAL NOT NULL)",
+                                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"],
+                         max_entries=max_entries, enabled=enabled)
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(system_prompt, prompt, model=None, temperature=None, max_tokens=None):
+        payload = json.dumps([system_prompt, prompt, model, temperature, max_tokens], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Cached response for a key, or None if missing or expired.
+        """
+        if not self.enabled:
+            self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, response):
+        """
+        Store a response, then evict expired and least recently used entries beyond max_entries.
+        """
+        if not self.enabled or not isinstance(response, str) or not self._limit_batch([key]):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, response, created, last_access) VALUES (?, ?, ?, ?)",
+                               (key, response, now, self._write_time()))
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._evict()
+            self._conn.commit()
+
+def make_cached_generate(generate, cache, model=None, bypass=False):
+    """
+    Wrap a generate callable with an LLMResponseCache.
+
+    Args:
+    - generate: Function called as generate(system_prompt=..., prompt=..., **kwargs).
+    - cache (LLMResponseCache): Response store.
+    - model (str or None): Model name used in the cache key, since generate functions are
+      usually bound to one model. A 'model' or 'gpt_model' keyword in a call takes precedence.
+    - bypass (bool): Always call generate and refresh the stored response. A single call
+      can also pass bypass_cache=True.
+
+    Returns:
+    - generate_cached, with the same call signature as generate.
+    """
+    def generate_cached(system_prompt='', prompt='', **kwargs):
+        bypass_call = kwargs.pop('bypass_cache', False) or bypass
+        key = cache.make_key(system_prompt, prompt,
+                             model=kwargs.get('model', kwargs.get('gpt_model', model)),
+                             temperature=kwargs.get('temperature'),
+                             max_tokens=kwargs.get('max_tokens'))
+        if not bypass_call:
+            response = cache.get(key)
+            if response is not None:
+                return response
+        response = generate(system_prompt=system_prompt, prompt=prompt, **kwargs)
+        cache.put(key, response)
+        return response
+
+    generate_cached.cache = cache
+    return generate_cached
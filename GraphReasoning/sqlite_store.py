@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Common SQLite plumbing of TextStore, EmbeddingCache and LLMResponseCache: one connection
+# per instance, shared between threads under a lock, in WAL mode so that other processes
+# can read the file while it is written.
+
+class SQLiteStore:
+    """
+    Base class of the SQLite-backed stores. Subclasses set `table` and pass the statements
+    that create their schema.
+
+    Parameters:
+    - path (str): SQLite file. Use ':memory:' for a store that only lives in this process.
+    - schema (list of str): CREATE TABLE / CREATE INDEX statements, run on every open.
+    """
+    table = None
+
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.closed = False
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            directory = os.path.dirname(os.path.abspath(path))
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def _select_in(self, sql, keys, chunk_size=500):
+        # Rows of sql (with '{}' where the key placeholders go) for a list of keys. SQLite limits
+        # the number of bound parameters, so query in chunks. The caller holds the lock.
+        rows = []
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            rows.extend(self._conn.execute(sql.format(','.join('?' * len(chunk))), chunk).fetchall())
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self):
+        if not self.closed:
+            self._conn.close()
+            self.closed = True
+
+class SQLiteCache(SQLiteStore):
+    """
+    SQLiteStore with hit/miss counters and least-recently-used eviction. The table needs a
+    'key' primary key and a 'last_access' column.
+
+    Parameters:
+    - path (str), schema (list of str): As for SQLiteStore.
+    - max_entries (int or None): Maximum number of entries, None for no limit.
+    - enabled (bool): If False, lookups always miss and nothing is written.
+
+    Attributes:
+    - hits, misses (int): Lookup counters since creation or the last reset_stats().
+    """
+
+    def __init__(self, path, schema=(), max_entries=None, enabled=True):
+        super().__init__(path, schema)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _limit_batch(self, rows):
+        # A batch larger than the cache keeps only its last max_entries rows, which would
+        # otherwise be evicted by the rows written after them
+        if self.max_entries is not None and len(rows) > self.max_entries:
+            return rows[len(rows) - max(self.max_entries, 0):]
+        return rows
+
+    def _write_time(self):
+        # last_access for the rows about to be written: never older than any entry, even if the
+        # clock went back or another thread touched entries since the caller read the clock.
+        # The caller holds the lock.
+        latest = self._conn.execute(f"SELECT MAX(last_access) FROM {self.table}").fetchone()[0]
+        return max(time.time(), latest or 0.0)
+
+    def _evict(self):
+        # Delete the least recently used entries beyond max_entries. Rows written last have the
+        # latest last_access (see _write_time) and, on equal timestamps, the largest rowid
+        # (INSERT OR REPLACE assigns a new one), so a batch of at most max_entries rows is never
+        # evicted by itself. The caller holds the lock and commits.
+        if self.max_entries is None:
+            return
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key IN "
+                               f"(SELECT key FROM {self.table} ORDER BY last_access ASC, rowid ASC LIMIT ?)",
+                               (count - self.max_entries,))
+
+    def stats(self):
+        """
+        Hit/miss counters and the current number of entries.
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self)}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        super().clear()
+        self.reset_stats()
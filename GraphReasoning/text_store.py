@@ -0,0 +1,127 @@
+import os
+import hashlib
+
+from GraphReasoning.sqlite_store import SQLiteStore
+
+# Content-addressed store for chunk texts.
+#
+# Graphs built with make_graph_from_text_withtext(..., text_store=store) keep only a list of
+# text keys per node ('text_ids') instead of the chunk texts themselves ('texts'). Every chunk
+# text is stored once, under the sha256 of its content, and is fetched when needed, e.g. by
+# get_text_associated_with_node:
+#
+#   store = TextStore('./data_output_KG/texts.sqlite')
+#   G = make_graph_from_text_withtext(graph_files, chunk_files, text_store=store)
+#   get_text_associated_with_node(G, 'silk')      # reads the texts from the store
+
+class TextStore(SQLiteStore):
+    """
+    Texts in SQLite, keyed by the sha256 of their content.
+
+    Parameters:
+    - path (str): SQLite file. Use ':memory:' for a store that only lives in this process.
+    """
+
+    table = 'texts'
+
+    def __init__(self, path='./text_store.sqlite'):
+        super().__init__(path, ["CREATE TABLE IF NOT EXISTS texts (key TEXT PRIMARY KEY, text TEXT NOT NULL)"])
+        self._registry_key = os.path.abspath(path) if path != ':memory:' else id(self)
+        _text_stores[self._registry_key] = self
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM texts WHERE key = ?", (key,)).fetchone() is not None
+
+    def put_many(self, texts):
+        """
+        Store texts (each distinct text once) and return their keys, in order.
+        """
+        keys = [self.make_key(text) for text in texts]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO texts (key, text) VALUES (?, ?)", zip(keys, texts))
+            self._conn.commit()
+        return keys
+
+    def put(self, text):
+        return self.put_many([text])[0]
+
+    def get_many(self, keys):
+        """
+        Texts for a list of keys, in order; None for unknown keys.
+        """
+        keys = list(keys)
+        with self._lock:
+            found = dict(self._select_in("SELECT key, text FROM texts WHERE key IN ({})", keys))
+        return [found.get(key) for key in keys]
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def close(self):
+        """
+        Close the connection; get_text_store opens a new store for this path afterwards.
+        """
+        super().close()
+        if _text_stores.get(self._registry_key) is self:
+            del _text_stores[self._registry_key]
+
+# Open stores by path, so graphs that only record the path (G.graph['text_store']) can find them
+_text_stores = {}
+
+def get_text_store(path):
+    """
+    Return the open TextStore for a path, opening it if needed.
+    """
+    store = _text_stores.get(os.path.abspath(path))
+    if store is None or store.closed:
+        store = TextStore(path)
+    return store
+
+def _resolve_text_store(G, text_store=None):
+    if text_store is not None:
+        return text_store
+    path = G.graph.get('text_store')
+    if path is None:
+        raise ValueError("Graph has 'text_ids' but no text store; pass text_store or set G.graph['text_store'].")
+    return get_text_store(path)
+
+def node_texts(G, node, text_store=None):
+    """
+    Texts of a node, from its 'texts' attribute or, for graphs with out-of-line texts, from
+    the text store ('text_ids').
+    """
+    data = G.nodes[node]
+    if 'texts' in data:
+        return data['texts']
+    if 'text_ids' in data:
+        return [text for text in _resolve_text_store(G, text_store).get_many(data['text_ids']) if text is not None]
+    return []
+
+def externalize_texts(G, text_store):
+    """
+    Move node 'texts' into a text store, in place: each node keeps 'text_ids' instead.
+    The absolute path of the store is recorded in G.graph['text_store'], so the graph still
+    finds its texts when loaded from another working directory.
+    """
+    for _, data in G.nodes(data=True):
+        if 'texts' in data:
+            data['text_ids'] = text_store.put_many(list(data.pop('texts')))
+    if text_store.path != ':memory:':
+        G.graph['text_store'] = os.path.abspath(text_store.path)
+    return G
+
+def internalize_texts(G, text_store=None):
+    """
+    Inverse of externalize_texts: replace 'text_ids' by the 'texts' themselves, in place.
+    """
+    text_store = _resolve_text_store(G, text_store)
+    for _, data in G.nodes(data=True):
+        if 'text_ids' in data:
+            data['texts'] = [text for text in text_store.get_many(data.pop('text_ids')) if text is not None]
+    G.graph.pop('text_store', None)
+    return G
@@ -0,0 +1,166 @@
+"""
+Time and peak memory of the GraphML savers in GraphReasoning.graph_tools, compared with the
+original implementations that deep-copied the graph before writing.
+
+    python benchmarks/graph_savers.py --nodes 20000 --edges 60000 --data-dir ./bench
+
+The *_deepcopy functions below are those original savers, kept here as reference
+implementations; tests/test_graph_savers.py checks that the streaming savers write the
+same files.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from copy import deepcopy
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GraphReasoning.graph_tools import save_graph_with_text_as_JSON, save_graph_without_text
+
+def save_graph_with_text_as_JSON_deepcopy(G_or, data_dir='./', graph_name='my_graph.graphml'):
+    fname = os.path.join(data_dir, graph_name)
+    G = deepcopy(G_or)
+    for _, data in G.nodes(data=True):
+        for key in data:
+            if isinstance(data[key], (list, dict, set, tuple)):
+                data[key] = json.dumps(data[key])
+    for _, _, data in G.edges(data=True):
+        for key in data:
+            if isinstance(data[key], (list, dict, set, tuple)):
+                data[key] = json.dumps(data[key])
+    nx.write_graphml(G, fname)
+    return fname
+
+def save_graph_without_text_deepcopy(G_or, data_dir='./', graph_name='my_graph.graphml'):
+    fname = os.path.join(data_dir, graph_name)
+    G = deepcopy(G_or)
+    for _, data in G.nodes(data=True):
+        data.pop('texts', None)
+        for key in data:
+            data[key] = str(data[key])
+    for i, (_, _, data) in enumerate(G.edges(data=True)):
+        data['id'] = str(i)
+        data.pop('texts', None)
+        for key in data:
+            data[key] = str(data[key])
+    nx.write_graphml(G, fname, edge_id_from_attribute='id')
+    return fname
+
+def _current_rss():
+    # Resident set size of this process in bytes, None where it cannot be read
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def _peak_rss_increase(function, interval=0.001):
+    # Run function() while a thread samples the RSS; returns (seconds, peak RSS above the start)
+    import gc
+    import threading
+
+    gc.collect()
+    baseline = _current_rss()
+    if baseline is None:
+        start_time = time.perf_counter()
+        function()
+        return time.perf_counter() - start_time, None
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], _current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start_time = time.perf_counter()
+    try:
+        function()
+    finally:
+        seconds = time.perf_counter() - start_time
+        peak[0] = max(peak[0], _current_rss())
+        done.set()
+        sampler.join()
+    return seconds, peak[0] - baseline
+
+def _peak_traced_memory(function):
+    # Peak of the Python allocations made by function(), in bytes
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_graph_savers(G, data_dir='./', n_repeat=1, verbatim=True):
+    """
+    Measure time and peak memory of save_graph_with_text_as_JSON and save_graph_without_text
+    against the original implementations, which deep-copied the graph before writing.
+
+    Every saver runs n_repeat times; the best time and the largest peaks are reported:
+    - peak_rss: peak resident memory above the start of the call (sampled every ms, with psutil
+      if installed, else from /proc; None where neither is available),
+    - peak_traced: peak of the Python allocations (tracemalloc, measured in a separate run).
+
+    Args:
+    - G (networkx graph): Graph to save, e.g. from make_graph_from_text_withtext.
+    - data_dir (str): Directory for the GraphML files (bench_*.graphml).
+    - n_repeat (int): Number of runs per saver.
+
+    Returns:
+    - stats (dict): saver name -> {'seconds', 'peak_rss', 'peak_traced', 'file'}.
+    """
+    savers = {'with_text_as_JSON': save_graph_with_text_as_JSON,
+              'with_text_as_JSON_deepcopy': save_graph_with_text_as_JSON_deepcopy,
+              'without_text': save_graph_without_text,
+              'without_text_deepcopy': save_graph_without_text_deepcopy}
+    stats = {}
+    for name, save in savers.items():
+        graph_name = f'bench_{name}.graphml'
+        run = lambda: save(G, data_dir=data_dir, graph_name=graph_name)
+        runs = [_peak_rss_increase(run) for _ in range(n_repeat)]
+        peak_rss = [rss for _, rss in runs if rss is not None]
+        stats[name] = {'seconds': min(seconds for seconds, _ in runs),
+                       'peak_rss': max(peak_rss) if peak_rss else None,
+                       'peak_traced': max(_peak_traced_memory(run) for _ in range(n_repeat)),
+                       'file': os.path.join(data_dir, graph_name)}
+        if verbatim:
+            rss = 'n/a' if stats[name]['peak_rss'] is None else f"{stats[name]['peak_rss'] / 2**20:.1f} MB"
+            print(f"{name}: {stats[name]['seconds']:.2f} s, peak RSS +{rss}, "
+                  f"peak traced {stats[name]['peak_traced'] / 2**20:.1f} MB")
+    return stats
+
+def make_text_graph(n, m, seed=0):
+    # Random graph with a few chunks of text per node, as written by make_graph_from_text_withtext
+    G = nx.gnm_random_graph(n, m, seed=seed)
+    G = nx.relabel_nodes(G, {i: f'concept {i}' for i in G.nodes()})
+    for i, node in enumerate(G.nodes()):
+        G.nodes[node]['texts'] = [f'chunk {i % 40} ' * 50, f'chunk {(i + 1) % 40} ' * 50]
+        G.nodes[node]['size'] = i
+    for i, (u, v) in enumerate(G.edges()):
+        G[u][v]['title'] = f'relation {i % 3}'
+    return G
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=20000)
+    parser.add_argument('--edges', type=int, default=60000)
+    parser.add_argument('--data-dir', default='./')
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    benchmark_graph_savers(make_text_graph(args.nodes, args.edges), data_dir=args.data_dir, n_repeat=args.repeat)
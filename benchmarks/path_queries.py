@@ -0,0 +1,69 @@
+"""
+Per-query latency of the path searches in GraphReasoning.graph_analysis.
+
+    python benchmarks/path_queries.py --nodes 100000 --queries 200
+
+Runs on a random small-world graph with random node embeddings, so no embedding model is
+needed. benchmark_path_queries also works with any other query, e.g.
+lambda s, t: heuristic_path_with_embeddings(G, tokenizer, model, s, t, node_embeddings, save_files=False).
+"""
+import argparse
+import os
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GraphReasoning.graph_analysis import (embedding_astar_path, embedding_beam_path,
+                                           find_shortest_path_with2hops)
+from GraphReasoning.graph_tools import NodeEmbeddings
+
+def benchmark_path_queries(query, pairs, n_repeat=1, verbatim=True):
+    """
+    Measure the per-query latency of a path search.
+
+    Args:
+    - query (callable): Called as query(source, target), e.g.
+      lambda s, t: heuristic_path_with_embeddings(G, tokenizer, model, s, t, node_embeddings, save_files=False)
+    - pairs (list): (source, target) pairs to query.
+    - n_repeat (int): Number of times each pair is queried.
+
+    Returns:
+    - stats (dict): Mean, median, 95th percentile and max latency in seconds, number of queries.
+    """
+    latencies = []
+    for _ in range(n_repeat):
+        for source, target in pairs:
+            start_time = time.perf_counter()
+            query(source, target)
+            latencies.append(time.perf_counter() - start_time)
+    latencies = np.array(latencies)
+    stats = {'mean': float(latencies.mean()), 'median': float(np.median(latencies)),
+             'p95': float(np.percentile(latencies, 95)), 'max': float(latencies.max()), 'n_queries': len(latencies)}
+    if verbatim:
+        print(f"{stats['n_queries']} queries: mean {stats['mean'] * 1e3:.1f} ms, median {stats['median'] * 1e3:.1f} ms, "
+              f"p95 {stats['p95'] * 1e3:.1f} ms")
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    G = nx.connected_watts_strogatz_graph(args.nodes, 6, 0.1, seed=0)
+    rng = np.random.default_rng(0)
+    node_embeddings = NodeEmbeddings({node: rng.normal(size=64).astype(np.float32) for node in G.nodes()})
+    pairs = [tuple(rng.choice(args.nodes, size=2, replace=False).tolist()) for _ in range(args.queries)]
+    queries = {
+        'shortest path with 2 hops': lambda s, t: find_shortest_path_with2hops(G, s, t, verbatim=False, save_files=False),
+        'embedding A*': lambda s, t: embedding_astar_path(G, s, t, node_embeddings),
+        'embedding beam': lambda s, t: embedding_beam_path(G, s, t, node_embeddings),
+    }
+    for name, query in queries.items():
+        print(f"{name}: ", end='')
+        benchmark_path_queries(query, pairs, n_repeat=args.repeat)
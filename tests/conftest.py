@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GraphReasoning.graph_tools as gt
+import GraphReasoning.graph_analysis as ga
+import GraphReasoning.graph_generation as gg
+
+# Small stand-ins for a Hugging Face tokenizer/model: characters are token ids, the model
+# is a fixed random embedding table, so embeddings are deterministic and cheap.
+
+class CharTokenizer:
+    name_or_path = 'char-tokenizer'
+
+    def __init__(self, pad_token='[PAD]'):
+        self.pad_token = pad_token
+
+    def __call__(self, texts, return_tensors=None, padding=False):
+        single = isinstance(texts, str)
+        ids = [[1 + ord(c) % 97 for c in text] or [1] for text in ([texts] if single else texts)]
+        if padding and self.pad_token is None:
+            raise ValueError("Asking to pad but the tokenizer does not have a padding token.")
+        if return_tensors is None:
+            return {'input_ids': ids[0] if single else ids}
+        width = max(len(row) for row in ids)
+        if not padding and any(len(row) != width for row in ids):
+            raise ValueError("Unable to create tensor, you should probably activate padding.")
+        input_ids = torch.tensor([row + [0] * (width - len(row)) for row in ids])
+        attention_mask = torch.tensor([[1] * len(row) + [0] * (width - len(row)) for row in ids])
+        return Encoding(input_ids=input_ids, attention_mask=attention_mask)
+
+class Encoding(dict):
+    def to(self, device):
+        return self
+
+class Output:
+    def __init__(self, last_hidden_state):
+        self.last_hidden_state = last_hidden_state
+
+class TableModel(torch.nn.Module):
+    name_or_path = 'table-model'
+
+    def __init__(self, dim=8):
+        super().__init__()
+        torch.manual_seed(0)
+        self.table = torch.nn.Embedding(128, dim)
+
+    def forward(self, input_ids, attention_mask=None):
+        return Output(self.table(input_ids))
+
+def fake_embed_texts(texts, tokenizer=None, model=None, batch_size=64, verbatim=False, cache=None):
+    # Deterministic unit vectors per text, for tests that only need some embedding
+    vectors = []
+    for text in texts:
+        rng = np.random.default_rng(abs(hash(str(text))) % 2**32)
+        vectors.append(rng.normal(size=16))
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), 16)
+    return vectors
+
+@pytest.fixture
+def tokenizer():
+    return CharTokenizer()
+
+@pytest.fixture
+def model():
+    return TableModel()
+
+@pytest.fixture(autouse=True)
+def _quiet_tqdm(monkeypatch):
+    for module in (gt, ga, gg):
+        monkeypatch.setattr(module, 'tqdm', lambda iterable=None, *args, **kwargs: iterable, raising=False)
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    for module in (gt, ga, gg):
+        monkeypatch.setattr(module, 'embed_texts', fake_embed_texts, raising=False)
+    return fake_embed_texts
@@ -0,0 +1,41 @@
+import json
+import threading
+import time
+
+def context_of(prompt):
+    # The chunk text, i.e. the first ```...``` block of a graphPrompt prompt
+    start = prompt.find('```') + 3
+    return prompt[start:prompt.find('```', start)]
+
+class FakeGenerate:
+    """
+    Stand-in for an LLM generate function: answers every graphPrompt call with triplets
+    derived from the chunk text, counts calls and tracks how many run at the same time.
+    """
+    def __init__(self, delay=0.0, fail_on=None, response=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.response = response
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, system_prompt='', prompt='', **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            text = context_of(prompt)
+            if self.fail_on is not None and self.fail_on in text:
+                raise RuntimeError("LLM unavailable")
+            if self.response is not None:
+                return self.response
+            words = text.split()
+            triplets = [{"node_1": a, "node_2": b, "edge": "precedes"} for a, b in zip(words, words[1:])]
+            return json.dumps(triplets)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
@@ -0,0 +1,56 @@
+import time
+import warnings
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_generation as gg
+
+def two_cliques():
+    G = nx.disjoint_union(nx.complete_graph(8), nx.complete_graph(8))
+    G.add_edge(0, 8)
+    return G
+
+def as_sets(communities):
+    return {frozenset(c) for c in communities}
+
+@pytest.mark.parametrize('method', ['louvain', 'leiden', 'label_propagation', 'girvan_newman'])
+def test_backends_find_the_two_cliques(method):
+    communities = gg.detect_communities(two_cliques(), method=method, seed=1)
+    assert as_sets(communities) == {frozenset(range(8)), frozenset(range(8, 16))}
+    assert communities == sorted(map(sorted, communities))
+
+def test_louvain_matches_networkx():
+    G = nx.karate_club_graph()
+    expected = nx.community.louvain_communities(G, seed=3)
+    assert as_sets(gg.detect_communities(G, seed=3)) == as_sets(expected)
+
+@pytest.mark.parametrize('method', ['louvain', 'label_propagation'])
+def test_time_budget_returns_a_partition(method):
+    G = nx.barabasi_albert_graph(3000, 3, seed=0)
+    start = time.time()
+    communities = gg.detect_communities(G, method=method, time_budget=0.0, seed=0)
+    assert time.time() - start < 5
+    assert sorted(node for community in communities for node in community) == sorted(G.nodes())
+
+def test_label_propagation_with_budget_converges_like_networkx():
+    G = two_cliques()
+    with_budget = gg.detect_communities(G, method='label_propagation', time_budget=60, seed=0)
+    assert as_sets(with_budget) == as_sets(nx.community.asyn_lpa_communities(G, seed=0))
+
+def test_girvan_newman_warns_about_the_budget():
+    with pytest.warns(UserWarning, match='time_budget'):
+        gg.detect_communities(two_cliques(), method='girvan_newman', time_budget=1.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        gg.detect_communities(two_cliques(), method='girvan_newman')
+
+def test_callable_backend_and_unknown_method():
+    calls = []
+    def backend(G, **kwargs):
+        calls.append(kwargs)
+        return [set(G.nodes())]
+    assert gg.detect_communities(two_cliques(), method=backend, time_budget=2.0) == [list(range(16))]
+    assert calls[0]['time_budget'] == 2.0
+    with pytest.raises(ValueError):
+        gg.detect_communities(two_cliques(), method='spectral')
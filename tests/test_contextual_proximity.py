@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import GraphReasoning.graph_generation as gg
+
+def baseline_contextual_proximity(df):
+    # The original melt + self-join implementation
+    dfg_long = pd.melt(df, id_vars=["chunk_id"], value_vars=["node_1", "node_2"], value_name="node")
+    dfg_long.drop(columns=["variable"], inplace=True)
+    dfg_wide = pd.merge(dfg_long, dfg_long, on="chunk_id", suffixes=("_1", "_2"))
+    dfg2 = dfg_wide[dfg_wide["node_1"] != dfg_wide["node_2"]].reset_index(drop=True)
+    dfg2 = dfg2.groupby(["node_1", "node_2"]).agg({"chunk_id": [",".join, "count"]}).reset_index()
+    dfg2.columns = ["node_1", "node_2", "chunk_id", "count"]
+    return dfg2[dfg2["count"] != 1]
+
+def triplets(n=400, n_nodes=50, n_chunks=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'node_1': [f'n{i}' for i in rng.integers(n_nodes, size=n)],
+                         'node_2': [f'n{i}' for i in rng.integers(n_nodes, size=n)],
+                         'edge': 'rel', 'chunk_id': [f'c{i}' for i in rng.integers(n_chunks, size=n)]})
+
+def by_pair(df):
+    return {(row.node_1, row.node_2): (int(row.count), set(row.chunk_id.split(','))) for row in df.itertuples()}
+
+@pytest.mark.parametrize('seed', range(3))
+def test_counts_and_chunks_match_baseline(seed):
+    df = triplets(seed=seed)
+    expected = by_pair(baseline_contextual_proximity(df.copy()))
+    result = gg.contextual_proximity(df.copy())
+    assert by_pair(result) == expected
+    assert (result['edge'] == 'contextual proximity').all()
+    for chunk_id in result['chunk_id']:
+        ids = chunk_id.split(',')
+        assert len(ids) == len(set(ids))  # each shared chunk once
+
+def test_small_batches_give_the_same_join():
+    df = triplets()
+    incidence_result = gg.contextual_proximity(df.copy())
+    original = gg._join_shared_chunk_ids.__defaults__
+    try:
+        gg._join_shared_chunk_ids.__defaults__ = (7,)
+        assert gg.contextual_proximity(df.copy())['chunk_id'].tolist() == incidence_result['chunk_id'].tolist()
+    finally:
+        gg._join_shared_chunk_ids.__defaults__ = original
+
+def test_lazy_provenance_matches_join():
+    df = triplets()
+    joined = gg.contextual_proximity(df.copy())
+    lazy = gg.contextual_proximity(df.copy(), provenance='lazy')
+    assert (lazy['chunk_id'] == '').all()
+    lookup = lazy.attrs['provenance']
+    for row in joined.itertuples():
+        assert ','.join(lookup(row.node_1, row.node_2)) == row.chunk_id
+
+def test_unknown_provenance():
+    with pytest.raises(ValueError):
+        gg.contextual_proximity(triplets(n=5), provenance='eager')
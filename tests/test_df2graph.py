@@ -0,0 +1,34 @@
+import pandas as pd
+
+import GraphReasoning.graph_generation as gg
+from llm_fakes import FakeGenerate
+
+CHUNKS = [f"chunk{i} silk fiber web" for i in range(12)]
+
+def chunk_frame():
+    return gg.documents2Dataframe(CHUNKS, deterministic_ids=True)
+
+def test_concurrent_matches_sequential():
+    df = chunk_frame()
+    sequential = gg.df2Graph(df, FakeGenerate())
+    concurrent = gg.df2Graph(df, FakeGenerate(delay=0.005), max_workers=4)
+    assert concurrent == sequential
+    assert [t['chunk_id'] for t in sequential[::3]] == df['chunk_id'].tolist()  # chunk order is kept
+
+def test_max_in_flight_bounds_concurrent_calls():
+    generate = FakeGenerate(delay=0.01)
+    gg.df2Graph(chunk_frame(), generate, max_workers=8, max_in_flight=2)
+    assert generate.max_in_flight <= 2
+    assert generate.calls == 2 * len(CHUNKS)  # improve call plus the first answer, no repair calls
+
+def test_failing_chunk_is_skipped_in_concurrent_mode():
+    result = gg.df2Graph(chunk_frame(), FakeGenerate(fail_on='chunk3 '), max_workers=4)
+    assert len(result) == 3 * (len(CHUNKS) - 1)
+    assert not any(t['node_1'] == 'chunk3' for t in result)
+
+def test_on_chunk_done_is_called_per_chunk():
+    done = {}
+    gg.df2Graph(chunk_frame(), FakeGenerate(), max_workers=3,
+                on_chunk_done=lambda chunk_id, result: done.__setitem__(chunk_id, result))
+    assert set(done) == set(chunk_frame()['chunk_id'])
+    assert all(len(result) == 3 for result in done.values())
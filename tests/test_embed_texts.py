@@ -0,0 +1,48 @@
+import numpy as np
+import torch
+
+import GraphReasoning.graph_tools as gt
+from conftest import CharTokenizer
+
+TEXTS = ['silk', 'spider silk fibers', 'a', 'graphene', 'hierarchical protein materials', 'silk']
+
+def reference_embeddings(texts, tokenizer, model):
+    # The original one-text-at-a-time loop
+    vectors = []
+    for text in texts:
+        inputs = tokenizer(str(text), return_tensors="pt")
+        vectors.append(model(**inputs).last_hidden_state.mean(dim=1).detach().numpy()[0])
+    return np.asarray(vectors)
+
+def test_batched_matches_per_text_loop(tokenizer, model):
+    vectors = gt.embed_texts(TEXTS, tokenizer, model, batch_size=4)
+    assert vectors.shape == (len(TEXTS), 8)
+    np.testing.assert_allclose(vectors, reference_embeddings(TEXTS, tokenizer, model), rtol=1e-5, atol=1e-6)
+
+def test_tokenizer_without_pad_token(model):
+    tokenizer = CharTokenizer(pad_token=None)
+    vectors = gt.embed_texts(TEXTS, tokenizer, model, batch_size=4)
+    np.testing.assert_allclose(vectors, reference_embeddings(TEXTS, tokenizer, model), rtol=1e-5, atol=1e-6)
+
+def test_embed_nodes_format(tokenizer, model):
+    embeddings = gt.embed_nodes(['silk', 'graphene'], tokenizer, model)
+    assert set(embeddings) == {'silk', 'graphene'}
+    assert embeddings['silk'].shape == (1, 8)
+    assert gt.embed_nodes([], tokenizer, model) == {}
+
+def test_callers_pass_their_verbatim_setting(monkeypatch, tmp_path, tokenizer, model):
+    import networkx as nx
+    from conftest import fake_embed_texts
+    seen = []
+    def recording_embed_texts(texts, tokenizer, model, batch_size=64, verbatim=False, cache=None):
+        seen.append(verbatim)
+        return fake_embed_texts(texts)
+    monkeypatch.setattr(gt, 'embed_texts', recording_embed_texts)
+
+    G = nx.Graph([('silk', 'silk fiber'), ('silk', 'bone')])
+    embeddings = gt.update_node_embeddings({}, G, tokenizer, model, verbatim=False)
+    gt.regenerate_node_embeddings(G, ['silk'], tokenizer, model, verbatim=False)
+    gt.simplify_graph(G, embeddings, tokenizer, model, similarity_threshold=-1.0, data_dir_output=str(tmp_path))
+    assert seen == [False, False, False]
+    gt.update_node_embeddings({}, G, tokenizer, model, verbatim=True)
+    assert seen[-1] is True
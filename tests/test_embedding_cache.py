@@ -0,0 +1,81 @@
+import numpy as np
+
+import GraphReasoning.graph_tools as gt
+from GraphReasoning.embedding_cache import EmbeddingCache
+from conftest import TableModel
+
+class CountingModel(TableModel):
+    def __init__(self):
+        super().__init__()
+        self.texts_seen = 0
+
+    def forward(self, input_ids, attention_mask=None):
+        self.texts_seen += len(input_ids)
+        return super().forward(input_ids, attention_mask)
+
+TEXTS = ['silk', 'collagen', 'silk', 'graphene oxide', 'bone']
+
+def test_cached_embeddings_match_uncached(tokenizer, tmp_path):
+    model = CountingModel()
+    cache = EmbeddingCache(str(tmp_path / 'cache.sqlite'))
+    expected = gt.embed_texts(TEXTS, tokenizer, model, cache=None)
+
+    model.texts_seen = 0
+    first = gt.embed_texts(TEXTS, tokenizer, model, cache=cache)
+    assert model.texts_seen == 4  # 'silk' is embedded once
+    np.testing.assert_allclose(first, expected, rtol=1e-6)
+
+    second = gt.embed_texts(TEXTS, tokenizer, model, cache=cache)
+    assert model.texts_seen == 4
+    np.testing.assert_array_equal(second, first)
+    assert cache.stats()['hits'] == len(TEXTS)
+
+def test_cache_persists_across_connections(tokenizer, tmp_path):
+    model = CountingModel()
+    path = str(tmp_path / 'cache.sqlite')
+    cache = EmbeddingCache(path)
+    gt.embed_texts(TEXTS, tokenizer, model, cache=cache)
+    cache.close()
+
+    model.texts_seen = 0
+    reopened = EmbeddingCache(path)
+    gt.embed_texts(TEXTS, tokenizer, model, cache=reopened)
+    assert model.texts_seen == 0
+
+def test_keys_depend_on_model_and_tokenizer():
+    cache = EmbeddingCache(':memory:')
+    cache.put_many(['silk'], [np.ones(3)], 'model-a', 'tok')
+    assert cache.get_many(['silk'], 'model-b', 'tok') == {}
+    np.testing.assert_array_equal(cache.get_many(['silk'], 'model-a', 'tok')[0], np.ones(3, dtype=np.float32))
+
+def test_lru_eviction():
+    cache = EmbeddingCache(':memory:', max_entries=2)
+    cache.put_many(['a'], [np.zeros(2)], 'm', 't')
+    cache.put_many(['b'], [np.zeros(2)], 'm', 't')
+    cache.get_many(['a'], 'm', 't')  # 'b' is now least recently used
+    cache.put_many(['c'], [np.zeros(2)], 'm', 't')
+    assert len(cache) == 2
+    assert set(cache.get_many(['a', 'b', 'c'], 'm', 't')) == {0, 2}
+
+def test_eviction_keeps_the_batch_just_written(monkeypatch):
+    clock = [10.0]
+    monkeypatch.setattr('time.time', lambda: clock[0])
+    cache = EmbeddingCache(':memory:', max_entries=3)
+    cache.put_many(['a', 'b', 'c'], [np.zeros(2)] * 3, 'm', 't')
+    clock[0] = 30.0
+    cache.get_many(['a', 'b', 'c'], 'm', 't')
+    clock[0] = 20.0  # the clock went back, or another thread read the entries after this put read the clock
+    cache.put_many(['d', 'e'], [np.ones(2)] * 2, 'm', 't')
+    assert len(cache) == 3
+    assert set(cache.get_many(['d', 'e'], 'm', 't')) == {0, 1}
+
+    cache.put_many([f'x{i}' for i in range(5)], [np.ones(2)] * 5, 'm', 't')  # larger than the cache
+    assert set(cache.get_many([f'x{i}' for i in range(5)], 'm', 't')) == {2, 3, 4}
+    assert len(cache) == 3
+
+def test_disabled_cache_always_misses(tokenizer):
+    model = CountingModel()
+    cache = EmbeddingCache(':memory:', enabled=False)
+    gt.embed_texts(TEXTS, tokenizer, model, cache=cache)
+    gt.embed_texts(TEXTS, tokenizer, model, cache=cache)
+    assert len(cache) == 0 and cache.hits == 0
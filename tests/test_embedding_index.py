@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+from GraphReasoning.embedding_index import IVFIndex, measure_recall_at_k
+
+def clustered_embeddings(n=2000, d=32, n_clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, d))
+    labels = rng.integers(n_clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, d))
+    return {f'node {i}': vectors[i:i + 1].astype(np.float32) for i in range(n)}
+
+@pytest.fixture(scope='module')
+def embeddings():
+    return clustered_embeddings()
+
+@pytest.fixture(scope='module')
+def index(embeddings):
+    return IVFIndex(n_probe=4).build(embeddings)
+
+def test_exact_search_matches_dense_top_k(index, embeddings):
+    query = np.random.default_rng(3).normal(size=32)
+    expected = gt.find_top_k_nodes(query, embeddings, N_samples=10)
+    result = index.search(query, 10, exact=True)
+    assert [node for node, _ in result] == [node for node, _ in expected]
+
+def test_full_probe_is_exact(index):
+    query = np.random.default_rng(4).normal(size=32)
+    assert index.search(query, 10, n_probe=index.n_lists) == index.search(query, 10, exact=True)
+
+def test_recall_excludes_the_query_node(index, monkeypatch):
+    # An index whose approximate search only ever finds the query node itself must not score
+    calls = []
+    original = IVFIndex.search
+    def self_only(self, query, k=5, n_probe=None, exact=False):
+        if exact:
+            return original(self, query, k, exact=True)
+        calls.append(k)
+        return original(self, query, 1, exact=True)
+    monkeypatch.setattr(IVFIndex, 'search', self_only)
+    recall, _ = measure_recall_at_k(index, k=5, n_queries=20, verbatim=False)
+    assert recall == 0.0
+    assert calls and all(k == 6 for k in calls)
+
+def test_recall_with_held_out_queries(index):
+    queries = np.stack([v.flatten() for v in clustered_embeddings(n=50, seed=0).values()])
+    queries += 0.1 * np.random.default_rng(5).normal(size=queries.shape)
+    recall, timings = measure_recall_at_k(index, k=5, n_queries=50, queries=queries, verbatim=False)
+    assert 0.5 < recall <= 1.0 and set(timings) == {'ann', 'exact'}
+
+def test_save_and_load_without_pickle(index, tmp_path):
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    with np.load(path, allow_pickle=False) as data:
+        assert data['node_ids_json'].dtype == np.uint8
+    loaded = IVFIndex.load(path)
+    query = np.random.default_rng(6).normal(size=32)
+    assert loaded.search(query, 5) == index.search(query, 5)
+    assert loaded.node_ids == index.node_ids
+
+def test_integer_node_ids_round_trip(tmp_path):
+    embeddings = {i: np.random.default_rng(i).normal(size=(1, 8)) for i in range(50)}
+    index = IVFIndex(n_lists=4).build(embeddings)
+    index.save(str(tmp_path / 'index.npz'))
+    assert IVFIndex.load(str(tmp_path / 'index.npz')).node_ids == list(range(50))
+
+def test_add_and_remove(index, embeddings):
+    index = IVFIndex(n_probe=4).build(embeddings)
+    index.remove(['node 0', 'node 1'])
+    assert 'node 0' not in index and len(index) == len(embeddings) - 2
+    index.add({'new node': embeddings['node 5']})
+    assert index.search(embeddings['node 5'], 2, exact=True)[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert 'new node' in {node for node, _ in index.search(embeddings['node 5'], 2, exact=True)}
@@ -0,0 +1,101 @@
+import copy
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+def plain_embeddings(nodes, seed=0):
+    rng = np.random.default_rng(seed)
+    return {node: rng.normal(size=8).astype(np.float32) for node in nodes}
+
+def reference_update(embeddings, graph_new, tokenizer, model):
+    # The original implementation: deep copy, embed new nodes, drop the ones not in the graph
+    updated = copy.deepcopy(dict(embeddings))
+    for node in graph_new.nodes():
+        if node not in updated:
+            updated[node] = gt.embed_nodes([node], tokenizer, model)[node]
+    for node in [node for node in updated if not graph_new.has_node(node)]:
+        del updated[node]
+    return updated
+
+def assert_same_embeddings(result, expected):
+    assert set(result) == set(expected) and len(result) == len(expected)
+    for node, vector in expected.items():
+        np.testing.assert_allclose(np.asarray(result[node]).reshape(-1), np.asarray(vector).reshape(-1), rtol=1e-5)
+
+@pytest.mark.parametrize('wrap', [dict, gt.NodeEmbeddings, gt.EmbeddingOverlay])
+def test_update_matches_deepcopy_reference(tokenizer, model, wrap):
+    embeddings = wrap(plain_embeddings([f'node {i}' for i in range(30)]))
+    G = nx.path_graph([f'node {i}' for i in range(10, 40)])
+    expected = reference_update(embeddings, G, tokenizer, model)
+    before = {node: vector.copy() for node, vector in embeddings.items()}
+    result = gt.update_node_embeddings(embeddings, G, tokenizer, model, copy_on_write=True)
+    assert isinstance(result, gt.EmbeddingOverlay)
+    assert_same_embeddings(result, expected)
+    assert_same_embeddings(embeddings, before)  # the input is left unchanged
+    assert result.delta_size == 10 + 10  # O(changed nodes): 10 added, 10 removed
+
+def test_plain_dict_input_is_snapshotted(tokenizer, model):
+    embeddings = plain_embeddings(['a', 'b'])
+    result = gt.update_node_embeddings(embeddings, nx.Graph([('a', 'b')]), tokenizer, model, copy_on_write=True)
+    embeddings['a'] = np.zeros(8, dtype=np.float32)
+    embeddings['z'] = np.ones(8, dtype=np.float32)
+    assert not np.allclose(result['a'], 0) and 'z' not in result and len(result) == 2
+
+def test_writes_to_a_versioned_base_invalidate_the_overlay(tokenizer, model):
+    embeddings = gt.NodeEmbeddings(plain_embeddings(['a', 'b']))
+    result = gt.update_node_embeddings(embeddings, nx.Graph([('a', 'c')]), tokenizer, model, copy_on_write=True)
+    assert result.base is embeddings  # shared, not copied
+    embeddings['a'] = np.zeros(8, dtype=np.float32)
+    with pytest.raises(RuntimeError):
+        result['a']
+    with pytest.raises(RuntimeError):
+        len(result)
+    with pytest.raises(RuntimeError):
+        result.copy()
+
+@pytest.mark.parametrize('wrap', [dict, gt.NodeEmbeddings, gt.EmbeddingOverlay])
+def test_results_are_independent_of_the_input_by_default(tmp_path, tokenizer, model, wrap):
+    nodes = [f'node {i}' for i in range(30)]
+    embeddings = wrap(plain_embeddings(nodes))
+    G = nx.path_graph(nodes[10:] + ['new node'])
+    results = [gt.update_node_embeddings(embeddings, G, tokenizer, model)]
+    results += [simplify(G, embeddings, tokenizer, model, similarity_threshold=0.999, data_dir_output=str(tmp_path))[1]
+                for simplify in (gt.simplify_graph, gt.simplify_graph_simple, gt.simplify_graph_with_text)]
+    embeddings['node 12'] = np.zeros(8, dtype=np.float32)
+    del embeddings['node 13']
+    for result in results:
+        assert type(result) is gt.NodeEmbeddings
+        assert 'node 13' in result and not np.allclose(result['node 12'], 0)
+
+def test_compact_and_dict_detach_from_the_base():
+    base = gt.NodeEmbeddings(plain_embeddings(['a', 'b', 'c']))
+    overlay = gt.EmbeddingOverlay(base)
+    overlay['d'] = np.ones(8, dtype=np.float32)
+    del overlay['b']
+    detached = dict(overlay)
+    overlay.compact()
+    base['a'] = np.zeros(8, dtype=np.float32)
+    del base['c']
+    assert list(overlay) == ['a', 'c', 'd'] == list(detached)
+    assert not np.allclose(overlay['a'], 0) and not np.allclose(detached['a'], 0)
+    assert overlay.delta_size == 0
+
+def test_overlay_behaves_like_a_dict():
+    base = plain_embeddings(['a', 'b', 'c'])
+    overlay, reference = gt.EmbeddingOverlay.of(base), dict(base)
+    for mapping in (overlay, reference):
+        mapping['d'] = np.ones(8)
+        mapping['a'] = np.zeros(8)
+        del mapping['b']
+        mapping.pop('c')
+        mapping['b'] = np.full(8, 2.0)
+    assert set(overlay) == set(reference) and len(overlay) == len(reference)
+    assert_same_embeddings(overlay, reference)
+    with pytest.raises(KeyError):
+        del overlay['c']
+    copied = overlay.copy()
+    copied['e'] = np.ones(8)
+    assert 'e' not in overlay
@@ -0,0 +1,120 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_analysis as ga
+import GraphReasoning.graph_tools as gt
+
+def graph_and_embeddings(seed, n=60):
+    G = nx.connected_watts_strogatz_graph(n, 4, 0.3, seed=seed)
+    rng = np.random.default_rng(seed)
+    return G, {node: rng.normal(size=16).astype(np.float32) for node in G.nodes()}
+
+def pairs(G, seed, n=15):
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes())
+    return [tuple(rng.choice(nodes, size=2, replace=False).tolist()) for _ in range(n)]
+
+def assert_valid_path(G, path, source, target):
+    assert path[0] == source and path[-1] == target
+    assert len(set(path)) == len(path)
+    assert all(G.has_edge(u, v) for u, v in zip(path, path[1:]))
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('heuristic_weight', [0.0, 0.25, 0.5])
+def test_astar_with_consistent_heuristic_is_shortest(seed, heuristic_weight):
+    # 1 - cos is at most 2, so weights up to 0.5 keep the heuristic below one hop: A* is exact
+    G, embeddings = graph_and_embeddings(seed)
+    for source, target in pairs(G, seed):
+        path = ga.embedding_astar_path(G, source, target, embeddings, heuristic_weight=heuristic_weight)
+        assert_valid_path(G, path, source, target)
+        assert len(path) - 1 == nx.shortest_path_length(G, source, target)
+
+@pytest.mark.parametrize('seed', range(4))
+def test_greedy_astar_and_beam_return_valid_paths(seed):
+    G, embeddings = graph_and_embeddings(seed)
+    for source, target in pairs(G, seed):
+        assert_valid_path(G, ga.embedding_astar_path(G, source, target, embeddings), source, target)
+        path = ga.embedding_beam_path(G, source, target, embeddings, beam_width=4)
+        if path is not None:
+            assert_valid_path(G, path, source, target)
+
+@pytest.mark.parametrize('seed', range(4))
+def test_beam_as_wide_as_the_graph_is_breadth_first(seed):
+    G, embeddings = graph_and_embeddings(seed)
+    for source, target in pairs(G, seed):
+        path = ga.embedding_beam_path(G, source, target, embeddings, beam_width=len(G))
+        assert_valid_path(G, path, source, target)
+        assert len(path) - 1 == nx.shortest_path_length(G, source, target)
+
+def test_no_path_and_step_budget():
+    G, embeddings = graph_and_embeddings(0)
+    G.add_node('island')
+    embeddings['island'] = np.ones(16, dtype=np.float32)
+    for search in (ga.embedding_astar_path, ga.embedding_beam_path):
+        assert search(G, 0, 'island', embeddings) is None
+        assert search(G, 0, 'missing', embeddings) is None
+    far = max(nx.single_source_shortest_path_length(G, 0).items(), key=lambda item: item[1])[0]
+    assert ga.embedding_astar_path(G, 0, far, embeddings, heuristic_weight=0.0, max_steps=2) is None
+    assert ga.embedding_beam_path(G, 0, far, embeddings, max_steps=1) is None
+
+def test_nodes_without_embeddings_are_still_searched():
+    G, embeddings = graph_and_embeddings(1)
+    for node in list(embeddings)[10:30]:
+        del embeddings[node]
+    source, target = 0, 45
+    path = ga.embedding_astar_path(G, source, target, embeddings, heuristic_weight=0.5)
+    assert len(path) - 1 == nx.shortest_path_length(G, source, target)
+
+def test_ties_are_broken_by_seed():
+    # Every node is equally far from the target in embedding space: only the seed decides
+    G = nx.grid_2d_graph(6, 6)
+    embeddings = {node: np.ones(4, dtype=np.float32) for node in G.nodes()}
+    source, target = (0, 0), (5, 5)
+    for search in (ga.embedding_astar_path, ga.embedding_beam_path):
+        runs = {seed: [search(G, source, target, embeddings, seed=seed) for _ in range(3)] for seed in range(6)}
+        for paths in runs.values():
+            assert paths[0] == paths[1] == paths[2]
+            assert_valid_path(G, paths[0], source, target)
+        assert len({tuple(paths[0]) for paths in runs.values()}) > 1
+
+@pytest.mark.parametrize('method', ['greedy', 'astar', 'beam'])
+def test_seeded_path_queries_are_reproducible(fake_embeddings, tokenizer, model, method):
+    G = nx.relabel_nodes(nx.connected_watts_strogatz_graph(80, 4, 0.3, seed=2), lambda i: f'concept {i}')
+    embeddings = gt.embed_nodes(list(G.nodes()), tokenizer, model)
+    results = [ga.heuristic_path_with_embeddings(G, tokenizer, model, 'concept 1', 'concept 50', embeddings,
+                                                 method=method, seed=7, save_files=False)[0] for _ in range(3)]
+    assert results[0] == results[1] == results[2]
+    assert_valid_path(G, results[0], 'concept 1', 'concept 50')
+    with pytest.raises(ValueError):
+        ga.heuristic_path_with_embeddings(G, tokenizer, model, 'concept 1', 'concept 50', embeddings,
+                                          method='dfs', save_files=False)
+
+def test_benchmark_path_queries_counts_every_query():
+    from benchmarks.path_queries import benchmark_path_queries
+    G, embeddings = graph_and_embeddings(0)
+    queries = pairs(G, 0, n=5)
+    stats = benchmark_path_queries(lambda s, t: ga.embedding_beam_path(G, s, t, embeddings), queries,
+                                   n_repeat=2, verbatim=False)
+    assert stats['n_queries'] == 10
+    assert 0 < stats['median'] <= stats['p95'] <= stats['max']
+
+def test_plain_dict_matrix_is_built_once_per_query(monkeypatch, fake_embeddings, tokenizer, model):
+    G = nx.relabel_nodes(nx.connected_watts_strogatz_graph(80, 4, 0.3, seed=2), lambda i: f'concept {i}')
+    embeddings = dict(gt.embed_nodes(list(G.nodes()), tokenizer, model))
+    builds = []
+    vstack = np.vstack
+    monkeypatch.setattr(gt.np, 'vstack', lambda arrays, *args, **kwargs: builds.append(1) or vstack(arrays, *args, **kwargs))
+    for method in ('astar', 'beam'):
+        builds.clear()
+        ga.heuristic_path_with_embeddings(G, tokenizer, model, 'concept 1', 'concept 50', embeddings,
+                                          method=method, seed=7, save_files=False)
+        assert len(builds) == 1  # matching source and target, then the search
+
+    wrapped = gt.as_node_embeddings(embeddings)
+    assert gt.as_node_embeddings(wrapped) is wrapped
+    builds.clear()
+    for source, target in pairs(G, 0, n=5):
+        ga.embedding_astar_path(G, source, target, wrapped)
+        ga.embedding_beam_path(G, source, target, wrapped)
+    assert len(builds) == 1
@@ -0,0 +1,67 @@
+import gc
+
+import numpy as np
+
+import GraphReasoning.graph_tools as gt
+
+def random_embeddings(n=200, d=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f'node {i}': rng.normal(size=(1, d)).astype(np.float32) for i in range(n)}
+
+def brute_force_top_k(query, embeddings, k):
+    # Reference: cosine similarity against every vector, as the original loop did
+    query = np.asarray(query, dtype=np.float64).flatten()
+    scores = {node: float(np.dot(query, np.asarray(v, dtype=np.float64).flatten()) /
+                          (np.linalg.norm(query) * np.linalg.norm(v)))
+              for node, v in embeddings.items()}
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+def assert_same_top_k(result, expected):
+    assert [node for node, _ in result] == [node for node, _ in expected]
+    np.testing.assert_allclose([score for _, score in result], [score for _, score in expected], rtol=1e-5, atol=1e-6)
+
+def test_top_k_matches_brute_force():
+    embeddings = gt.NodeEmbeddings(random_embeddings())
+    query = np.random.default_rng(1).normal(size=16)
+    for k in (1, 5, 200, 500):
+        assert_same_top_k(gt.find_top_k_nodes(query, embeddings, N_samples=k),
+                          brute_force_top_k(query, embeddings, k))
+
+def test_replacing_a_vector_in_place_is_seen():
+    for embeddings in (gt.NodeEmbeddings(random_embeddings()), random_embeddings(),
+                       gt.EmbeddingOverlay(random_embeddings())):
+        query = np.random.default_rng(2).normal(size=(1, 16)).astype(np.float32)
+        gt.find_top_k_nodes(query, embeddings, N_samples=3)
+        embeddings['node 7'] = query.copy()  # same keys, new vector
+        assert gt.find_top_k_nodes(query, embeddings, N_samples=1)[0][0] == 'node 7'
+        del embeddings['node 7']
+        assert gt.find_top_k_nodes(query, embeddings, N_samples=1)[0][0] != 'node 7'
+
+def test_cache_does_not_keep_embeddings_alive():
+    gt.invalidate_embedding_matrix()
+    embeddings = gt.NodeEmbeddings(random_embeddings())
+    gt.find_top_k_nodes(np.ones(16), embeddings)
+    assert len(gt._embedding_matrix_cache) == 1
+    del embeddings
+    gc.collect()
+    assert len(gt._embedding_matrix_cache) == 0
+
+def test_plain_dicts_are_not_cached():
+    gt.invalidate_embedding_matrix()
+    gt.find_top_k_nodes(np.ones(16), random_embeddings())
+    assert len(gt._embedding_matrix_cache) == 0
+
+def test_row_index_matches_matrix():
+    embeddings = gt.NodeEmbeddings(random_embeddings())
+    node_ids, matrix = gt.get_embedding_matrix(embeddings)
+    row_of = gt.get_embedding_row_index(embeddings)
+    for node, vector in embeddings.items():
+        expected = vector.flatten() / np.linalg.norm(vector)
+        np.testing.assert_allclose(matrix[row_of[node]], expected, rtol=1e-5)
+        assert node_ids[row_of[node]] == node
+
+def test_node_embeddings_pickle_round_trip(tmp_path):
+    embeddings = gt.NodeEmbeddings(random_embeddings(n=5))
+    gt.save_embeddings(embeddings, tmp_path / 'emb.pkl')
+    loaded = gt.load_embeddings(tmp_path / 'emb.pkl')
+    assert isinstance(loaded, gt.NodeEmbeddings) and loaded.keys() == embeddings.keys()
@@ -0,0 +1,49 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+@pytest.fixture
+def embeddings():
+    rng = np.random.default_rng(0)
+    return {f'node {i}': rng.normal(size=(1, 12)).astype(np.float32) for i in range(100)}
+
+def test_store_round_trip(embeddings, tmp_path):
+    gt.save_embeddings_store(embeddings, str(tmp_path / 'emb'))
+    store = gt.load_embeddings(str(tmp_path / 'emb'))
+    assert isinstance(store, gt.EmbeddingStore)
+    assert isinstance(store.matrix, np.memmap)
+    assert list(store) == list(embeddings) and len(store) == len(embeddings)
+    for node, vector in embeddings.items():
+        assert node in store
+        assert store[node].shape == (1, 12)
+        np.testing.assert_array_equal(store[node], vector)
+
+def test_float16_store(embeddings, tmp_path):
+    gt.save_embeddings_store(embeddings, str(tmp_path / 'emb'), dtype='float16')
+    store = gt.load_embeddings_store(str(tmp_path / 'emb'), mmap=False)
+    assert store.matrix.dtype == np.float16
+    np.testing.assert_allclose(store['node 3'], embeddings['node 3'], rtol=1e-2, atol=1e-2)
+
+def test_store_top_k_matches_dict(embeddings, tmp_path):
+    gt.save_embeddings_store(embeddings, str(tmp_path / 'emb'))
+    store = gt.load_embeddings(str(tmp_path / 'emb'))
+    query = np.random.default_rng(1).normal(size=12)
+    from_store = gt.find_top_k_nodes(query, store, N_samples=7)
+    from_dict = gt.find_top_k_nodes(query, gt.NodeEmbeddings(embeddings), N_samples=7)
+    assert [node for node, _ in from_store] == [node for node, _ in from_dict]
+    np.testing.assert_allclose([s for _, s in from_store], [s for _, s in from_dict], rtol=1e-5)
+
+def test_migrate_pickle(embeddings, tmp_path):
+    with open(tmp_path / 'emb.pkl', 'wb') as f:
+        pickle.dump(embeddings, f)
+    gt.migrate_embeddings_to_store(str(tmp_path / 'emb.pkl'), str(tmp_path / 'emb'))
+    store = gt.load_embeddings(str(tmp_path / 'emb.npy'))
+    np.testing.assert_array_equal(store['node 42'], embeddings['node 42'])
+
+def test_pickle_files_still_load_as_dicts(embeddings, tmp_path):
+    gt.save_embeddings(embeddings, str(tmp_path / 'emb.pkl'))
+    loaded = gt.load_embeddings(str(tmp_path / 'emb.pkl'))
+    assert isinstance(loaded, dict) and loaded.keys() == embeddings.keys()
@@ -0,0 +1,56 @@
+import copy
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_tools as gt
+from benchmarks import graph_savers
+
+def text_graph(n=300, m=900, seed=0):
+    G = nx.gnm_random_graph(n, m, seed=seed)
+    G = nx.relabel_nodes(G, {i: f'concept {i}' for i in G.nodes()})
+    for i, node in enumerate(G.nodes()):
+        G.nodes[node]['texts'] = [f'chunk {i % 40} ' * 50, f'chunk {(i + 1) % 40} ' * 50]
+        G.nodes[node]['size'] = i
+        G.nodes[node]['meta'] = {'source': 'paper', 'page': i}
+    for i, (u, v) in enumerate(G.edges()):
+        G[u][v]['title'] = f'relation {i % 3}'
+        G[u][v]['weight'] = i / 4
+    return G
+
+def assert_same_file_contents(path, reference_path):
+    H, expected = nx.read_graphml(path), nx.read_graphml(reference_path)
+    assert list(H.nodes()) == list(expected.nodes())
+    assert dict(H.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert list(H.edges(data=True)) == list(expected.edges(data=True))
+
+@pytest.mark.parametrize('name', ['with_text_as_JSON', 'without_text'])
+def test_streaming_savers_write_what_the_deepcopy_savers_wrote(tmp_path, name):
+    G = text_graph()
+    save = getattr(gt, f'save_graph_{name}')
+    reference = getattr(graph_savers, f'save_graph_{name}_deepcopy')
+    assert_same_file_contents(save(G, data_dir=str(tmp_path), graph_name='new.graphml'),
+                              reference(G, data_dir=str(tmp_path), graph_name='old.graphml'))
+
+def test_savers_leave_the_graph_unchanged(tmp_path):
+    G = text_graph(n=50, m=100)
+    before = copy.deepcopy(G)
+    gt.save_graph_with_text_as_JSON(G, data_dir=str(tmp_path))
+    gt.save_graph_without_text(G, data_dir=str(tmp_path), graph_name='no_text.graphml')
+    assert dict(G.nodes(data=True)) == dict(before.nodes(data=True))
+    assert list(G.edges(data=True)) == list(before.edges(data=True))
+
+def test_json_round_trip(tmp_path):
+    G = text_graph(n=50, m=100)
+    gt.save_graph_with_text_as_JSON(G, data_dir=str(tmp_path), graph_name='g.graphml')
+    H = gt.load_graph_with_text_as_JSON(data_dir=str(tmp_path), graph_name='g.graphml')
+    assert dict(H.nodes(data=True)) == dict(G.nodes(data=True))
+
+def test_benchmark_reports_lower_peak_memory(tmp_path):
+    stats = graph_savers.benchmark_graph_savers(text_graph(), data_dir=str(tmp_path), verbatim=False)
+    assert set(stats) == {'with_text_as_JSON', 'with_text_as_JSON_deepcopy', 'without_text', 'without_text_deepcopy'}
+    for name in ('with_text_as_JSON', 'without_text'):
+        # The deep copy holds every text once more; streaming holds one element at a time
+        assert stats[name]['peak_traced'] * 4 < stats[f'{name}_deepcopy']['peak_traced']
+        assert_same_file_contents(stats[name]['file'], stats[f'{name}_deepcopy']['file'])
+    assert all(entry['seconds'] > 0 for entry in stats.values())
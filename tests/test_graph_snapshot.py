@@ -0,0 +1,102 @@
+import json
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from GraphReasoning.graph_snapshot import (GraphSnapshot, load_graph_snapshot, read_graph,
+                                           save_graph_snapshot, write_graph)
+
+def attributed_graph(directed=False, seed=0):
+    G = nx.gnm_random_graph(60, 150, seed=seed, directed=directed)
+    G = nx.relabel_nodes(G, {i: f'concept {i} é' for i in G.nodes()})
+    G.graph['name'] = 'test'
+    for i, node in enumerate(G.nodes()):
+        G.nodes[node]['texts'] = [f'text {i}', f'text {i + 1}']
+        G.nodes[node]['size'] = i
+        if i % 3:
+            G.nodes[node]['color'] = '#ff0000'  # missing on some nodes
+    for i, (u, v) in enumerate(G.edges()):
+        G[u][v]['title'] = f'relation {i % 4}'
+        G[u][v]['weight'] = i / 4
+        G[u][v]['flag'] = bool(i % 2)
+    G.add_edge('concept 0 é', 'concept 0 é', title='self', weight=1.0, flag=True)
+    return G
+
+def assert_same_graph(H, G):
+    assert H.is_directed() == G.is_directed()
+    assert list(H.nodes()) == list(G.nodes())
+    assert dict(H.nodes(data=True)) == dict(G.nodes(data=True))
+    assert H.number_of_edges() == G.number_of_edges()
+    for u, v, data in G.edges(data=True):
+        assert H[u][v] == data
+    assert H.graph == G.graph
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('name', ['graph.npz', 'graph.snapshot'])
+def test_round_trip(tmp_path, directed, name):
+    G = attributed_graph(directed=directed)
+    save_graph_snapshot(G, str(tmp_path / name))
+    assert_same_graph(load_graph_snapshot(str(tmp_path / name)), G)
+
+def test_memory_mapped_queries_match_networkx(tmp_path):
+    G = attributed_graph()
+    save_graph_snapshot(G, str(tmp_path / 'graph.snapshot'))
+    S = load_graph_snapshot(str(tmp_path / 'graph.snapshot'), mmap=True, as_networkx=False)
+    assert isinstance(S.indices, np.memmap)
+    assert S.number_of_nodes() == G.number_of_nodes() and S.number_of_edges() == G.number_of_edges()
+    for node in G.nodes():
+        assert set(S.neighbors(node)) == set(G.neighbors(node))
+        assert S.degree(node) == G.degree(node)
+    assert S.node_attribute('size') == [data['size'] for _, data in G.nodes(data=True)]
+
+def test_shortest_path_matches_networkx():
+    G = attributed_graph()
+    S = GraphSnapshot.from_networkx(G, attributes=False)
+    nodes = list(G.nodes())
+    for source, target in [(1, 2), (5, 40), (10, 59), (0, 33)]:
+        path = S.shortest_path_indices(source, target)
+        expected = nx.shortest_path_length(G, nodes[source], nodes[target])
+        assert len(path) - 1 == expected
+        assert all(G.has_edge(nodes[a], nodes[b]) for a, b in zip(path, path[1:]))
+
+def test_integer_nodes_and_json_attributes(tmp_path):
+    G = nx.path_graph(5)
+    G.nodes[0]['meta'] = {'source': 'paper', 'pages': [1, 2]}
+    G.nodes[1]['meta'] = 'plain'
+    G[0][1]['big'] = 2**70
+    save_graph_snapshot(G, str(tmp_path / 'graph.npz'))
+    assert_same_graph(load_graph_snapshot(str(tmp_path / 'graph.npz')), G)
+
+def test_skip_attributes(tmp_path):
+    G = attributed_graph()
+    save_graph_snapshot(G, str(tmp_path / 'graph.npz'))
+    H = load_graph_snapshot(str(tmp_path / 'graph.npz'), skip_attributes=('texts',))
+    assert all('texts' not in data and 'size' in data for _, data in H.nodes(data=True))
+
+def test_npz_needs_no_pickle(tmp_path):
+    save_graph_snapshot(attributed_graph(), str(tmp_path / 'graph.npz'))
+    with np.load(tmp_path / 'graph.npz', allow_pickle=False) as data:
+        assert all(data[name].dtype != object for name in data.files)
+
+def test_read_and_write_dispatch_on_path(tmp_path):
+    G = attributed_graph()
+    nx.set_node_attributes(G, {node: ','.join(data['texts']) for node, data in G.nodes(data=True)}, 'texts')
+    write_graph(G, str(tmp_path / 'graph.graphml'))
+    write_graph(G, str(tmp_path / 'graph.npz'))
+    assert_same_graph(read_graph(str(tmp_path / 'graph.npz')), G)
+    from_graphml = read_graph(str(tmp_path / 'graph.graphml'))
+    assert set(from_graphml.nodes()) == set(G.nodes())
+    assert {frozenset(edge) for edge in from_graphml.edges()} == {frozenset(edge) for edge in G.edges()}
+
+def test_rejects_multigraphs_and_newer_versions(tmp_path):
+    with pytest.raises(TypeError):
+        GraphSnapshot.from_networkx(nx.MultiGraph([(1, 2)]))
+    save_graph_snapshot(nx.path_graph(3), str(tmp_path / 'graph.snapshot'))
+    with open(tmp_path / 'graph.snapshot' / 'meta.json') as f:
+        meta = json.load(f)
+    meta['version'] += 1
+    with open(tmp_path / 'graph.snapshot' / 'meta.json', 'w') as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        load_graph_snapshot(str(tmp_path / 'graph.snapshot'))
@@ -0,0 +1,91 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+def write_files(tmp_path, n_files=6, seed=0):
+    rng = np.random.default_rng(seed)
+    graph_files, chunk_files = [], []
+    for f in range(n_files):
+        n = 80
+        chunks = [f'chunk{i}' for i in rng.integers(15, size=n)]  # chunk ids repeat across files
+        pd.DataFrame({
+            'node_1': [f'concept {i}' for i in rng.integers(40, size=n)],
+            'node_2': [f'concept {i}' for i in rng.integers(40, size=n)],
+            'edge': [f'relation {i}' for i in rng.integers(4, size=n)],
+            'chunk_id': chunks,
+        }).to_csv(tmp_path / f'{f}_graph.csv', index=False)
+        pd.DataFrame({'chunk_id': sorted(set(chunks)),
+                      'text': [f'text of {c} in file {f}' for c in sorted(set(chunks))]}
+                     ).to_csv(tmp_path / f'{f}_chunks.csv', index=False)
+        graph_files.append(str(tmp_path / f'{f}_graph.csv'))
+        chunk_files.append(str(tmp_path / f'{f}_chunks.csv'))
+    return graph_files, chunk_files
+
+def reference_graph(graph_file_list, chunk_file_list, N_max=10):
+    # The original implementation: pd.concat of all chunk files, drop_duplicates, row mapping
+    G_total = nx.Graph()
+    all_texts_df = pd.DataFrame()
+    for idx in range(min(len(graph_file_list), N_max)):
+        try:
+            graph_df = pd.read_csv(graph_file_list[idx])
+            text_df = pd.read_csv(chunk_file_list[idx])
+            all_texts_df = pd.concat([all_texts_df, text_df], ignore_index=True)
+            graph_df.replace("", np.nan, inplace=True)
+            graph_df.dropna(subset=["node_1", "node_2", 'edge'], inplace=True)
+            graph_df['count'] = 4
+            graph_df = (graph_df.groupby(["node_1", "node_2"])
+                        .agg({"chunk_id": ",".join, "edge": ','.join, 'count': 'sum'}).reset_index())
+            for _, row in graph_df.iterrows():
+                G_total.add_edge(row['node_1'], row['node_2'], chunk_id=row['chunk_id'],
+                                 title=row['edge'], weight=row['count'] / 4)
+        except Exception:
+            pass
+    all_texts_df = all_texts_df.drop_duplicates(subset=['chunk_id'])
+    chunk_id_to_text = pd.Series(all_texts_df.text.values, index=all_texts_df.chunk_id).to_dict()
+    texts_of_node = {node: set() for node in G_total.nodes()}
+    for node1, node2, data in G_total.edges(data=True):
+        for chunk_id in data.get('chunk_id', '').split(','):
+            text = chunk_id_to_text.get(chunk_id, "")
+            if text:
+                texts_of_node[node1].add(text)
+                texts_of_node[node2].add(text)
+    for node, texts in texts_of_node.items():
+        G_total.nodes[node]['texts'] = list(texts)
+    return G_total
+
+def assert_same_graph(G, expected):
+    assert set(G.nodes()) == set(expected.nodes())
+    for node in expected.nodes():
+        assert set(G.nodes[node]['texts']) == set(expected.nodes[node]['texts'])
+    assert G.number_of_edges() == expected.number_of_edges()
+    for u, v, data in expected.edges(data=True):
+        assert G[u][v] == data
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_streaming_matches_concat(tmp_path, max_workers):
+    graph_files, chunk_files = write_files(tmp_path)
+    G = gt.make_graph_from_text_withtext(graph_files, chunk_files, max_workers=max_workers)
+    assert_same_graph(G, reference_graph(graph_files, chunk_files))
+
+def test_first_text_of_a_chunk_wins(tmp_path):
+    graph_files, chunk_files = write_files(tmp_path, n_files=3)
+    G = gt.make_graph_from_text_withtext(graph_files, chunk_files)
+    texts = {text for _, data in G.nodes(data=True) for text in data['texts']}
+    chunk_ids = {text.split(' in file ')[0] for text in texts}
+    assert len(chunk_ids) == len(texts)
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_unreadable_file_is_skipped(tmp_path, max_workers, capsys):
+    graph_files, chunk_files = write_files(tmp_path, n_files=4)
+    graph_files[1] = str(tmp_path / 'missing.csv')
+    G = gt.make_graph_from_text_withtext(graph_files, chunk_files, max_workers=max_workers)
+    assert 'idx=1' in capsys.readouterr().out
+    assert_same_graph(G, reference_graph(graph_files, chunk_files))
+
+def test_results_come_in_input_order(tmp_path):
+    graph_files, chunk_files = write_files(tmp_path, n_files=5)
+    pairs = [(idx, graph_files[idx], chunk_files[idx]) for idx in range(5)]
+    assert [idx for idx, _ in gt._read_triplet_files(iter(pairs), max_workers=2)] == list(range(5))
@@ -0,0 +1,95 @@
+import copy
+import pickle
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_tools as gt
+from test_graph_savers import text_graph
+
+def typed_graph(directed=False):
+    G = nx.gnm_random_graph(40, 100, seed=1, directed=directed)
+    G = nx.relabel_nodes(G, {i: f'node {i} <&>' for i in G.nodes()})
+    for i, node in enumerate(G.nodes()):
+        G.nodes[node].update(size=i, score=i / 3, hub=bool(i % 2), label=f'label {i}')
+        if i % 4 == 0:
+            del G.nodes[node]['label']  # missing values
+    for i, (u, v) in enumerate(G.edges()):
+        G[u][v].update(title=f'relation {i}', weight=i / 4)
+    return G
+
+def assert_same_graph(H, expected):
+    assert type(H) is type(expected)
+    assert list(H.nodes()) == list(expected.nodes())
+    assert dict(H.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert sorted(H.edges(data=True)) == sorted(expected.edges(data=True))
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_streaming_reader_matches_networkx(tmp_path, directed):
+    nx.write_graphml(typed_graph(directed), tmp_path / 'g.graphml')
+    assert_same_graph(gt.read_graphml_streaming(tmp_path / 'g.graphml'), nx.read_graphml(tmp_path / 'g.graphml'))
+
+def test_streaming_reader_skips_attributes(tmp_path):
+    nx.write_graphml(typed_graph(), tmp_path / 'g.graphml')
+    H = gt.read_graphml_streaming(tmp_path / 'g.graphml', skip_attributes=('label', 'weight'))
+    expected = nx.read_graphml(tmp_path / 'g.graphml')
+    assert all('label' not in data and data['size'] == expected.nodes[node]['size'] for node, data in H.nodes(data=True))
+    assert all('weight' not in data for _, _, data in H.edges(data=True))
+
+def test_parallel_edges_fall_back_to_networkx(tmp_path):
+    M = nx.MultiGraph([('a', 'b'), ('a', 'b'), ('b', 'c')])
+    nx.write_graphml(M, tmp_path / 'm.graphml')
+    H = gt.read_graphml_streaming(tmp_path / 'm.graphml')
+    assert H.is_multigraph() and H.number_of_edges() == 3
+
+@pytest.fixture
+def saved_graph(tmp_path):
+    G = text_graph(n=60, m=150)
+    gt.save_graph_with_text_as_JSON(G, data_dir=str(tmp_path), graph_name='g.graphml')
+    return G, str(tmp_path)
+
+def test_lazy_load_equals_eager_load(saved_graph):
+    G, data_dir = saved_graph
+    eager = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml')
+    lazy = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml', lazy=True)
+    assert_same_graph(lazy, eager)
+    assert dict(lazy.nodes(data=True)) == dict(G.nodes(data=True))
+
+def test_lazy_attributes_decode_on_access_only(saved_graph):
+    G, data_dir = saved_graph
+    H = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml', lazy=True)
+    node = 'concept 3'
+    data = H.nodes[node]
+    assert isinstance(data, gt.LazyJSONDict)
+    assert 'texts' in data and isinstance(dict.__getitem__(data, 'texts'), str)
+    assert nx.shortest_path_length(H, 'concept 0', node) == nx.shortest_path_length(G, 'concept 0', node)
+    assert isinstance(dict.__getitem__(data, 'texts'), str)  # path queries decode nothing
+    assert data['texts'] == G.nodes[node]['texts']
+    assert isinstance(dict.__getitem__(data, 'texts'), list)
+    assert data.get('meta') == G.nodes[node]['meta'] and data.get('missing', 0) == 0
+
+def test_lazy_dict_behaves_like_the_decoded_dict(saved_graph):
+    G, data_dir = saved_graph
+    H = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml', lazy=True)
+    expected = dict(G.nodes['concept 5'])
+    data = H.nodes['concept 5']
+    assert dict(data) == expected and {**data} == expected
+    assert pickle.loads(pickle.dumps(data)) == expected
+    assert copy.deepcopy(data) == expected and data.copy() == expected
+    data['texts'] = ['replaced']
+    assert data['texts'] == ['replaced']
+    assert data.pop('meta') == expected['meta'] and 'meta' not in data
+
+def test_lazy_edges_share_one_dict_per_edge(saved_graph):
+    _, data_dir = saved_graph
+    H = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml', lazy=True)
+    u, v = next(iter(H.edges()))
+    assert H[u][v] is H[v][u]
+    H[u][v]['title'] = 'changed'
+    assert H[v][u]['title'] == 'changed'
+
+def test_lazy_load_with_skipped_texts(saved_graph):
+    G, data_dir = saved_graph
+    H = gt.load_graph_with_text_as_JSON(data_dir=data_dir, graph_name='g.graphml', lazy=True, skip_attributes=('texts',))
+    for node, data in H.nodes(data=True):
+        assert 'texts' not in data and data['meta'] == G.nodes[node]['meta']
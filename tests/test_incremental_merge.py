@@ -0,0 +1,110 @@
+import zlib
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+def family_embed_texts(texts, tokenizer=None, model=None, batch_size=64, verbatim=False, cache=None):
+    # 'silk', 'silk v2', 'silk fibre' share the vector of their first word, up to a little noise,
+    # so variants of one concept are near-duplicates and different concepts are not
+    vectors = []
+    for text in texts:
+        family, _, variant = str(text).partition(' ')
+        base = np.random.default_rng(zlib.crc32(family.encode())).normal(size=32)
+        noise = np.random.default_rng(zlib.crc32(variant.encode()) + 1).normal(size=32)
+        vectors.append(base / np.linalg.norm(base) + 0.02 * noise / np.linalg.norm(noise))
+    return np.asarray(vectors, dtype=np.float32).reshape(len(texts), 32)
+
+@pytest.fixture(autouse=True)
+def family_embeddings(monkeypatch):
+    monkeypatch.setattr(gt, 'embed_texts', family_embed_texts)
+
+def base_graph(seed=0):
+    # Already simplified: one node per concept
+    G = nx.gnm_random_graph(40, 90, seed=seed)
+    G = nx.relabel_nodes(G, {i: f'c{i}' for i in G.nodes()})
+    for u, v in G.edges():
+        G[u][v]['title'] = 'base'
+    return G
+
+def new_subgraph(seed=0):
+    rng = np.random.default_rng(seed)
+    # Variants of existing concepts, new concepts with their own variants, and existing nodes
+    nodes = [f'c{i} v{j}' for i, j in zip(rng.integers(40, size=8), range(8))] + \
+            ['n1', 'n1 v2', 'n2', 'n3', 'n3 v2', 'n3 v3', 'c5', 'c6']
+    G_add = nx.Graph()
+    for u, v in zip(rng.integers(len(nodes), size=30), rng.integers(len(nodes), size=30)):
+        if u != v:
+            G_add.add_edge(nodes[u], nodes[v], title='added')
+    return G_add
+
+def full_rebuild(G, node_embeddings, G_add, tokenizer, model, tmp_path):
+    # compose + update_node_embeddings + simplify_graph, as add_new_subgraph_from_text without a merger
+    G_new = nx.compose(G, G_add)
+    embeddings = gt.update_node_embeddings(node_embeddings, G_new, tokenizer, model)
+    return gt.simplify_graph(G_new, embeddings, tokenizer, model, similarity_threshold=0.95,
+                             data_dir_output=str(tmp_path), graph_root='full')
+
+def edge_set(G):
+    return {frozenset(edge) for edge in G.edges()}
+
+@pytest.mark.parametrize('seed', range(3))
+def test_exact_incremental_merge_matches_full_rebuild(tmp_path, tokenizer, model, seed):
+    G = base_graph(seed)
+    node_embeddings = gt.embed_nodes(list(G.nodes()), tokenizer, model)
+    G_add = new_subgraph(seed)
+    expected, expected_embeddings = full_rebuild(G, node_embeddings, G_add, tokenizer, model, tmp_path)
+
+    merger = gt.IncrementalGraphMerger(G.copy(), node_embeddings, tokenizer, model,
+                                       similarity_threshold=0.95, exact=True)
+    node_mapping, merge_log = merger.merge(G_add)
+    assert node_mapping, "the subgraph should merge into the base graph"
+    assert set(merger.G.nodes()) == set(expected.nodes())
+    assert edge_set(merger.G) == edge_set(expected)
+    assert set(merger.node_embeddings) == set(expected_embeddings)
+    assert set(merger.index.node_to_row) == set(merger.G.nodes())
+    assert set(merge_log['node']) == set(node_mapping)
+
+def test_merges_stay_local(tokenizer, model):
+    G = base_graph()
+    node_embeddings = gt.embed_nodes(list(G.nodes()), tokenizer, model)
+    merger = gt.IncrementalGraphMerger(G, node_embeddings, tokenizer, model, similarity_threshold=0.95, exact=True)
+    untouched = {node: dict(G[node]) for node in G if node != 'c1'}
+    merger.merge(nx.Graph([('c1 variant', 'n9')]))
+    assert merger.G is G
+    assert 'c1 variant' not in G and G.has_edge('c1', 'n9')
+    assert all(dict(G[node]) == adjacency for node, adjacency in untouched.items())
+
+def test_remove_small_fragments_and_assign_communities(tokenizer, model):
+    G = base_graph()
+    for node in G:
+        G.nodes[node]['group'] = 1
+        G.nodes[node]['color'] = '#000000'
+    merger = gt.IncrementalGraphMerger(G, gt.embed_nodes(list(G), tokenizer, model), tokenizer, model,
+                                       similarity_threshold=0.95)
+    merger.merge(nx.Graph([('island', 'islet'), ('c3', 'p1')]), size_threshold=3, assign_communities=True)
+    assert 'island' not in G and 'islet' not in G
+    assert 'island' not in merger.node_embeddings and 'island' not in merger.index
+    assert G.nodes['p1']['group'] == 1 and G.nodes['p1']['size'] == G.degree['p1']
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_add_new_subgraph_from_text_returns(tmp_path, monkeypatch, tokenizer, model, incremental):
+    import GraphReasoning.graph_generation as gg
+    monkeypatch.setattr(gg, 'embed_texts', family_embed_texts)
+    monkeypatch.chdir(tmp_path)
+    G = base_graph()
+    nx.write_graphml(G, tmp_path / 'base.graphml')
+    node_embeddings = gt.embed_nodes(list(G.nodes()), tokenizer, model)
+    merger = gt.IncrementalGraphMerger(gt.read_graph(str(tmp_path / 'base.graphml')), node_embeddings, tokenizer,
+                                       model, similarity_threshold=0.95) if incremental else None
+    _, G_new, G_loaded, G_returned, embeddings, _ = gg.add_new_subgraph_from_text(
+        '', None, node_embeddings, tokenizer, model, str(tmp_path / 'base.graphml'), data_dir_output=str(tmp_path),
+        verbatim=False, size_threshold=0, do_Louvain_on_new_graph=False, G_to_add=new_subgraph(), merger=merger)
+    assert set(G_new) >= {'n1', 'n2', 'c0'} and set(embeddings) == set(G_new)
+    if incremental:
+        # The merger merges in place: the returned "original" graph is the merged one
+        assert G_returned is G_new is merger.G
+    else:
+        assert G_returned is not G_new and set(G_returned) == set(G)
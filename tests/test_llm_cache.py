@@ -0,0 +1,71 @@
+import time
+
+from GraphReasoning.llm_cache import LLMResponseCache, make_cached_generate
+from llm_fakes import FakeGenerate
+
+def test_cached_generate_returns_the_same_responses(tmp_path):
+    generate = FakeGenerate()
+    cache = LLMResponseCache(str(tmp_path / 'llm.sqlite'))
+    generate_cached = make_cached_generate(generate, cache, model='mistral')
+    prompts = [f'Context: ```silk fiber {i}```' for i in range(5)]
+
+    first = [generate_cached(system_prompt='sys', prompt=p) for p in prompts]
+    assert first == [generate(system_prompt='sys', prompt=p) for p in prompts]
+    generate.calls = 0
+    assert [generate_cached(system_prompt='sys', prompt=p) for p in prompts] == first
+    assert generate.calls == 0
+    assert cache.stats()['hits'] == 5
+
+def test_key_includes_model_and_sampling_parameters():
+    cache = LLMResponseCache(':memory:')
+    generate = FakeGenerate()
+    generate_cached = make_cached_generate(generate, cache, model='a')
+    generate_cached(prompt='```x y```')
+    generate_cached(prompt='```x y```', model='b')
+    generate_cached(prompt='```x y```', temperature=0.7)
+    generate_cached(prompt='```x y```', max_tokens=10)
+    assert generate.calls == 4
+    generate_cached(prompt='```x y```', temperature=0.7)
+    assert generate.calls == 4
+
+def test_bypass_refreshes_the_entry():
+    cache = LLMResponseCache(':memory:')
+    generate = FakeGenerate()
+    generate_cached = make_cached_generate(generate, cache)
+    generate_cached(prompt='```x y```')
+    generate.response = 'new answer'
+    assert generate_cached(prompt='```x y```') != 'new answer'
+    assert generate_cached(prompt='```x y```', bypass_cache=True) == 'new answer'
+    assert generate_cached(prompt='```x y```') == 'new answer'
+
+def test_ttl_and_lru_eviction():
+    cache = LLMResponseCache(':memory:', ttl=0.05)
+    cache.put('k', 'v')
+    assert cache.get('k') == 'v'
+    time.sleep(0.1)
+    assert cache.get('k') is None
+
+    cache = LLMResponseCache(':memory:', max_entries=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    cache.get('a')
+    cache.put('c', '3')
+    assert len(cache) == 2 and cache.get('b') is None and cache.get('a') == '1'
+
+def test_non_string_responses_are_not_cached():
+    cache = LLMResponseCache(':memory:')
+    cache.put('k', None)
+    assert len(cache) == 0
+
+def test_eviction_keeps_the_response_just_written(monkeypatch):
+    clock = [10.0]
+    monkeypatch.setattr('time.time', lambda: clock[0])
+    cache = LLMResponseCache(':memory:', max_entries=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    clock[0] = 30.0
+    cache.get('a')
+    cache.get('b')
+    clock[0] = 20.0  # the clock went back, or another thread read the entries after this put read the clock
+    cache.put('c', '3')
+    assert len(cache) == 2 and cache.get('c') == '3' and cache.get('b') == '2'
@@ -0,0 +1,65 @@
+import json
+import os
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_generation as gg
+from llm_fakes import FakeGenerate
+
+TEXT = ' '.join(f'word{i}' for i in range(300))
+
+def build(generate, **kwargs):
+    kwargs.setdefault('chunk_size', 200)
+    _, _, G, _, _ = gg.make_graph_from_text(TEXT, generate, data_dir='out', save_HTML=False, **kwargs)
+    return G
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def graph_signature(G):
+    return set(G.nodes()), {frozenset(edge) for edge in G.edges()}
+
+def test_checkpointing_is_off_by_default():
+    G = build(FakeGenerate())
+    assert not os.path.exists('out/graph_root_checkpoint.jsonl')
+    assert G.number_of_nodes() == 300
+
+def test_resume_after_a_crash_only_extracts_missing_chunks():
+    reference = build(FakeGenerate())
+
+    with pytest.raises(RuntimeError):
+        build(FakeGenerate(fail_on='word150 '), checkpoint=True)
+    with open('out/graph_root_checkpoint.jsonl') as f:
+        logged = [json.loads(line) for line in f]
+    assert 0 < len(logged)
+
+    generate = FakeGenerate()
+    resumed = build(generate, resume=True)
+    n_chunks = len(gg.RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0).split_text(TEXT))
+    assert generate.calls == 2 * (n_chunks - len(logged))
+    assert graph_signature(resumed) == graph_signature(reference)
+
+def test_rebuild_from_checkpoint_without_llm_calls():
+    reference = build(FakeGenerate(), checkpoint=True)
+    generate = FakeGenerate()
+    rebuilt = build(generate, regenerate=False)
+    assert generate.calls == 0
+    assert graph_signature(rebuilt) == graph_signature(reference)
+
+def test_deterministic_chunk_ids():
+    first = gg.documents2Dataframe(['a', 'b', 'a'], deterministic_ids=True)
+    second = gg.documents2Dataframe(['a', 'b', 'a'], deterministic_ids=True)
+    assert first['chunk_id'].tolist() == second['chunk_id'].tolist()
+    assert first['chunk_id'].nunique() == 3  # same text at another position is another chunk
+    assert gg.documents2Dataframe(['a'])['chunk_id'][0] != gg.documents2Dataframe(['a'])['chunk_id'][0]
+
+def test_checkpoint_log_ignores_a_torn_last_line(tmp_path):
+    path = str(tmp_path / 'log.jsonl')
+    writer = gg.make_chunk_checkpoint_writer(path)
+    writer('c1', [{'node_1': 'a', 'node_2': 'b', 'edge': 'e'}])
+    writer('c2', None)  # unparsed chunks are not logged
+    with open(path, 'a') as f:
+        f.write('{"chunk_id": "c3", "trip')
+    assert gg.load_chunk_checkpoint(path) == {'c1': [{'node_1': 'a', 'node_2': 'b', 'edge': 'e'}]}
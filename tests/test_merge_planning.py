@@ -0,0 +1,102 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+def random_pairs(n, m, seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(n, size=m), rng.integers(n, size=m)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_disjoint_set_matches_connected_components(seed):
+    n = 200
+    rows, cols = random_pairs(n, 150, seed)
+    roots = gt.DisjointSet(n).union_batch(rows, cols).roots()
+
+    reference = nx.Graph()
+    reference.add_nodes_from(range(n))
+    reference.add_edges_from(zip(rows.tolist(), cols.tolist()))
+    for component in nx.connected_components(reference):
+        component = sorted(component)
+        assert set(roots[component].tolist()) == {component[0]}  # smallest member is the root
+
+def reference_plan(graph, nodes, rows, cols):
+    # Components of the pair graph, each collapsed onto its highest-degree member (first in nodes on ties)
+    pair_graph = nx.Graph()
+    pair_graph.add_edges_from((nodes[i], nodes[j]) for i, j in zip(rows, cols) if i != j)
+    position = {node: i for i, node in enumerate(nodes)}
+    mapping = {}
+    for component in nx.connected_components(pair_graph):
+        keep = min(component, key=lambda node: (-graph.degree(node), position[node]))
+        mapping.update({node: keep for node in component if node != keep})
+    return mapping
+
+@pytest.mark.parametrize('seed', range(5))
+def test_plan_matches_reference_and_ignores_pair_order(seed):
+    graph = nx.barabasi_albert_graph(120, 2, seed=seed)
+    nodes = list(graph.nodes())
+    rows, cols = random_pairs(len(nodes), 60, seed)
+    mapping, merge_log = gt.plan_node_merges(graph, nodes, (rows, cols))
+    assert mapping == reference_plan(graph, nodes, rows.tolist(), cols.tolist())
+    assert set(merge_log['node']) == set(mapping)
+
+    order = np.random.default_rng(seed + 100).permutation(len(rows))
+    shuffled, _ = gt.plan_node_merges(graph, nodes, (cols[order], rows[order]))
+    assert shuffled == mapping
+
+def test_representative_policies():
+    graph = nx.Graph([('spider silk', 'a'), ('spider silk', 'b'), ('silk', 'c')])
+    graph.nodes['silk']['texts'] = ['t1', 't2', 't3']
+    nodes = ['spider silk', 'silk']
+    pairs = (np.array([0]), np.array([1]))
+    assert gt.plan_node_merges(graph, nodes, pairs)[0] == {'silk': 'spider silk'}
+    assert gt.plan_node_merges(graph, nodes, pairs, representative='shortest_name')[0] == {'spider silk': 'silk'}
+    assert gt.plan_node_merges(graph, nodes, pairs, representative='most_texts')[0] == {'spider silk': 'silk'}
+    assert gt.plan_node_merges(graph, nodes, pairs, representative=len)[0] == {'silk': 'spider silk'}
+    with pytest.raises(ValueError):
+        gt.plan_node_merges(graph, nodes, pairs, representative='alphabetical')
+
+def chain_embeddings(graph):
+    # 'x', 'x 1', 'x 2' lie close to each other; similarity is transitive only through 'x 1'
+    rng = np.random.default_rng(0)
+    embeddings = {}
+    for node in graph.nodes():
+        base = str(node).split(' ')[0]
+        direction = np.random.default_rng(abs(hash(base)) % 2**32).normal(size=16)
+        embeddings[node] = (direction + 0.02 * rng.normal(size=16)).reshape(1, -1).astype(np.float32)
+    return embeddings
+
+def test_simplify_entry_points_agree(tmp_path, fake_embeddings):
+    graph = nx.Graph()
+    for base in ('silk', 'bone', 'chitin', 'keratin'):
+        graph.add_edges_from([(base, f'{base} 1'), (f'{base} 1', f'{base} 2'), (base, 'hub')])
+    embeddings = chain_embeddings(graph)
+
+    simple, simple_embeddings = gt.simplify_graph_simple(graph, embeddings, None, None, similarity_threshold=0.95,
+                                                         data_dir_output=str(tmp_path))
+    full, full_embeddings = gt.simplify_graph(graph, embeddings, None, None, similarity_threshold=0.95,
+                                              data_dir_output=str(tmp_path))
+    assert set(simple.nodes()) == set(full.nodes()) == {'silk', 'bone', 'chitin', 'keratin', 'hub'}  # degree ties go to the first node
+    assert set(simple.edges()) == set(full.edges())
+    assert set(simple_embeddings) == set(full_embeddings) == set(full.nodes())
+    assert len(embeddings) == 13  # input left unchanged
+
+def test_simplify_graph_simple_renames_representatives_with_llm(tmp_path, fake_embeddings):
+    graph = nx.Graph()
+    for base in ('silk', 'bone'):
+        graph.add_edges_from([(base, f'{base} 1'), (f'{base} 1', f'{base} 2'), (base, 'hub')])
+    embeddings = chain_embeddings(graph)
+    calls = []
+
+    def generate(system_prompt='', prompt='', max_tokens=None, temperature=None):
+        calls.append((max_tokens, temperature))
+        return prompt.split("'")[1].upper()
+
+    simple, simple_embeddings = gt.simplify_graph_simple(graph, embeddings, None, None, similarity_threshold=0.95,
+                                                         use_llm=True, generate=generate, max_tokens=64,
+                                                         temperature=0.0, data_dir_output=str(tmp_path))
+    assert set(simple.nodes()) == {'SILK', 'BONE', 'hub'}
+    assert set(simple['hub']) == {'SILK', 'BONE'}
+    assert sorted(calls) == [(64, 0.0), (64, 0.0)]
+    assert set(simple_embeddings) == set(simple.nodes())
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import GraphReasoning.graph_generation as gg
+import GraphReasoning.graph_tools as gt
+from llm_fakes import FakeGenerate
+
+def triplet_frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'node_1': [f'concept {i}' for i in rng.integers(30, size=n)],
+        'node_2': [f'concept {i}' for i in rng.integers(30, size=n)],
+        'edge': [f'relation {i}' for i in rng.integers(5, size=n)],
+        'chunk_id': [f'chunk{i}' for i in rng.integers(10, size=n)],
+        'count': rng.integers(1, 5, size=n),
+    })
+
+def test_round_trip_matches_csv(tmp_path):
+    df = triplet_frame()
+    gt.save_parquet_table(df, tmp_path / 'g.parquet')
+    df.to_csv(tmp_path / 'g.csv', index=False)
+    from_parquet = gt.read_graph_table(tmp_path / 'g.parquet')
+    from_csv = gt.read_graph_table(tmp_path / 'g.csv')
+    pd.testing.assert_frame_equal(from_parquet, from_csv, check_dtype=False)
+    assert list(from_parquet['node_1']) == list(df['node_1'])
+
+def test_node_strings_are_dictionary_encoded(tmp_path):
+    gt.save_parquet_table(triplet_frame(), tmp_path / 'g.parquet')
+    schema = pq.read_schema(tmp_path / 'g.parquet')
+    for name in ('node_1', 'node_2', 'edge', 'chunk_id'):
+        assert str(schema.field(name).type).startswith('dictionary')
+    assert not str(schema.field('count').type).startswith('dictionary')
+
+def test_categorical_and_column_selection(tmp_path):
+    df = triplet_frame()
+    gt.save_parquet_table(df, tmp_path / 'g.parquet')
+    loaded = gt.load_parquet_table(tmp_path / 'g.parquet', columns=['node_1', 'edge'], categorical=True)
+    assert list(loaded.columns) == ['node_1', 'edge']
+    assert isinstance(loaded['node_1'].dtype, pd.CategoricalDtype)
+    assert list(loaded['node_1'].astype(str)) == list(df['node_1'])
+
+def test_mixed_values_in_string_columns(tmp_path):
+    # LLM output can put numbers and missing values in node columns
+    df = pd.DataFrame({'node_1': ['a', 3, None], 'node_2': ['b', 'c', 'd'], 'edge': ['x', 'y', 'z']})
+    gt.save_parquet_table(df, tmp_path / 'g.parquet')
+    loaded = gt.load_parquet_table(tmp_path / 'g.parquet')
+    assert list(loaded['node_1'][:2]) == ['a', '3'] and pd.isna(loaded['node_1'][2])
+
+def test_file_listing_by_format(tmp_path):
+    for idx in (10, 2):
+        gt.save_parquet_table(triplet_frame(n=5), tmp_path / f'graph_{idx}_graph.parquet')
+        gt.save_parquet_table(pd.DataFrame({'chunk_id': ['c'], 'text': ['t']}), tmp_path / f'graph_{idx}_chunks.parquet')
+    graph_files, chunk_files = gt.get_list_of_graphs_and_chunks(data_dir=str(tmp_path), file_format='parquet')
+    assert [gt.extract_number(f.split('/')[-1]) for f in graph_files] == [2, 10]
+    assert len(chunk_files) == 2
+
+def test_parquet_output_builds_the_same_graph(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    text = ' '.join(f'word{i}' for i in range(200))
+    graphs = {}
+    for output_format in ('csv', 'parquet'):
+        _, _, G, _, _ = gg.make_graph_from_text(text, FakeGenerate(), data_dir=output_format, save_HTML=False,
+                                                chunk_size=200, output_format=output_format)
+        graphs[output_format] = G
+    assert (tmp_path / 'parquet' / 'graph_root_graph.parquet').exists()
+    assert not list((tmp_path / 'parquet').glob('*.csv'))
+    assert set(graphs['csv'].nodes()) == set(graphs['parquet'].nodes())
+    assert {frozenset(e) for e in graphs['csv'].edges()} == {frozenset(e) for e in graphs['parquet'].edges()}
+
+    # Rebuilding from the saved Parquet triplets needs no LLM calls
+    generate = FakeGenerate()
+    _, _, rebuilt, _, _ = gg.make_graph_from_text(text, generate, data_dir='parquet', save_HTML=False,
+                                                  chunk_size=200, output_format='parquet', regenerate=False)
+    assert generate.calls == 0
+    assert set(rebuilt.nodes()) == set(graphs['parquet'].nodes())
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import GraphReasoning.graph_generation as gg
+from llm_fakes import FakeGenerate
+
+TRIPLETS = [{"node_1": "silk", "node_2": "fiber", "edge": "is"},
+            {"node_1": "beta-sheets", "node_2": "strength", "edge": "control"}]
+
+@pytest.mark.parametrize('response', [
+    json.dumps(TRIPLETS),
+    json.dumps(TRIPLETS, indent=4),
+    "```json\n" + json.dumps(TRIPLETS) + "\n```",
+    "Here is the ontology:\n" + json.dumps(TRIPLETS) + "\nLet me know if you need more.",
+    '[{"node_1": "silk", "node_2": "fiber", "edge": "is"},\n {"node_1": "beta-sheets", "node_2": "strength", "edge": "control",},\n]',
+    '[{"node_1": "silk", "node_2": "fiber", "edge": "is"}, {"node_1": "beta-sheets", "node_2": "strength", "edge": "control"}, {"node_1": "web", "no',
+    '{"node_1": "silk", "node_2": "fiber", "edge": "is"}\n{"node_1": "beta-sheets", "node_2": "strength", "edge": "control"}',
+])
+def test_recovers_triplets(response):
+    assert gg.parse_triplets(response) == TRIPLETS
+
+def test_valid_json_string_values_are_untouched():
+    response = '{"node_1":"a","node_2":"b","edge":"x, ]y"}'
+    assert gg.parse_triplets(response) == [{"node_1": "a", "node_2": "b", "edge": "x, ]y"}]
+    response = '[{"node_1": "a, }", "node_2": "b", "edge": "c\\\\d"}]'
+    assert gg.parse_triplets(response) == json.loads(response)
+
+def test_trailing_commas_are_only_stripped_outside_strings():
+    text = '[{"edge": "x, ]y", "n": [1, 2,],},]'
+    assert json.loads(gg._strip_trailing_commas(text)) == [{"edge": "x, ]y", "n": [1, 2]}]
+    assert gg._strip_trailing_commas('{"a": "\\", }"}') == '{"a": "\\", }"}'
+
+@pytest.mark.parametrize('response', [None, '', 'no json here', '[{"node_1": "a"}]', '[1, 2, 3]'])
+def test_unrecoverable_responses(response):
+    assert gg.parse_triplets(response) is None
+
+def test_graph_prompt_skips_the_format_fix_call_when_parsing_works():
+    gg.reset_graph_prompt_stats()
+    generate = FakeGenerate()
+    result = gg.graphPrompt('silk fiber web', generate, {'chunk_id': 'c'})
+    assert generate.calls == 2  # extraction and improvement, no format fix
+    assert result == [{"node_1": "silk", "node_2": "fiber", "edge": "precedes", "chunk_id": "c"},
+                      {"node_1": "fiber", "node_2": "web", "edge": "precedes", "chunk_id": "c"}]
+    assert gg.get_graph_prompt_stats()['fast_path'] == 1
+
+    generate = FakeGenerate()
+    gg.graphPrompt('silk fiber web', generate, fast_path=False)
+    assert generate.calls > 2  # format-fix calls are made
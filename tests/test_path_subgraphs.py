@@ -0,0 +1,65 @@
+import random
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_analysis as ga
+import GraphReasoning.graph_tools as gt
+
+@pytest.fixture
+def text_graph(fake_embeddings, tokenizer, model):
+    G = nx.connected_watts_strogatz_graph(80, 4, 0.2, seed=0)
+    G = nx.relabel_nodes(G, {i: f'concept {i}' for i in G.nodes()})
+    G.graph['sources'] = ['paper']
+    for i, node in enumerate(G.nodes()):
+        G.nodes[node]['texts'] = [f'text {i}']
+        G.nodes[node]['meta'] = {'page': i}
+    for u, v in G.edges():
+        G[u][v]['title'] = 'relation'
+        G[u][v]['chunks'] = ['c1']
+    return G, gt.embed_nodes(list(G.nodes()), tokenizer, model)
+
+def path_queries(G, node_embeddings, tokenizer, model):
+    kwargs = dict(save_files=False, second_hop=True)
+    yield ga.heuristic_path_with_embeddings(G, tokenizer, model, 'concept 0', 'concept 40', node_embeddings,
+                                            seed=0, **kwargs)
+    random.seed(0)
+    yield ga.heuristic_path_with_embeddings_with_randomization_waypoints(
+        G, tokenizer, model, 'concept 0', 'concept 40', node_embeddings, num_random_waypoints=1, **kwargs)
+
+def snapshot(G):
+    return ({node: {key: str(value) for key, value in data.items()} for node, data in G.nodes(data=True)},
+            {(u, v): {key: str(value) for key, value in data.items()} for u, v, data in G.edges(data=True)},
+            str(G.graph))
+
+def test_changing_the_returned_subgraph_leaves_G_unchanged(text_graph, tokenizer, model):
+    G, node_embeddings = text_graph
+    before = snapshot(G)
+    for path, subgraph, length, _, _ in path_queries(G, node_embeddings, tokenizer, model):
+        assert path[0] == 'concept 0' and path[-1] == 'concept 40' and length == len(path) - 1
+        for _, data in subgraph.nodes(data=True):
+            data.get('texts', []).append('note')
+            data.get('meta', {})['page'] = -1
+        for _, _, data in subgraph.edges(data=True):
+            data['chunks'].append('c2')
+            data['title'] = 'changed'
+        subgraph.graph.get('sources', []).append('other')
+    assert snapshot(G) == before
+
+def test_returned_subgraph_matches_the_induced_subgraph(text_graph, tokenizer, model):
+    G, node_embeddings = text_graph
+    path, subgraph, _, _, _ = next(path_queries(G, node_embeddings, tokenizer, model))
+    expected = G.subgraph(subgraph.nodes())
+    assert set(subgraph.nodes()) >= set(path)
+    assert dict(subgraph.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert {frozenset(edge) for edge in subgraph.edges()} == {frozenset(edge) for edge in expected.edges()}
+    assert all(subgraph[u][v] == expected[u][v] for u, v in subgraph.edges())
+
+def test_read_only_views_are_accepted(text_graph, tokenizer, model):
+    G, node_embeddings = text_graph
+    view = nx.restricted_view(G, [], [])
+    path, _, _, _, _ = ga.heuristic_path_with_embeddings(view, tokenizer, model, 'concept 0', 'concept 40',
+                                                         node_embeddings, save_files=False, seed=0)
+    expected, _, _, _, _ = ga.heuristic_path_with_embeddings(G, tokenizer, model, 'concept 0', 'concept 40',
+                                                             node_embeddings, save_files=False, seed=0)
+    assert path == expected
@@ -0,0 +1,114 @@
+import gc
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_analysis as ga
+import GraphReasoning.graph_snapshot as gs
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    gs.invalidate_adjacency_snapshot()
+    yield
+    gs.invalidate_adjacency_snapshot()
+
+def hub_graph(n=2000, seed=0):
+    return nx.relabel_nodes(nx.barabasi_albert_graph(n, 2, seed=seed), lambda i: f'n{i}')
+
+def query(G, source, target, **kwargs):
+    path, path_graph, length, _, _ = ga.find_shortest_path_with2hops(G, source, target, save_files=False, **kwargs)
+    return path, set(path_graph.nodes()), length
+
+def reference_hops(G, path, k=2):
+    # nodes within k hops of the path, from networkx
+    within = set()
+    for node in path:
+        within |= set(nx.single_source_shortest_path_length(G, node, cutoff=k))
+    return within
+
+def random_pairs(G, seed, n=10):
+    rng = np.random.default_rng(seed)
+    return [tuple(pair) for pair in rng.choice(list(G.nodes()), size=(n, 2), replace=False).tolist()]
+
+@pytest.mark.parametrize('kwargs', [{}, {'use_snapshot': True}])
+@pytest.mark.parametrize('second_hop', [True, False])
+def test_matches_networkx(kwargs, second_hop):
+    G = hub_graph()
+    for source, target in random_pairs(G, 0):
+        path, within, length = query(G, source, target, second_hop=second_hop, **kwargs)
+        assert length == nx.shortest_path_length(G, source, target)
+        assert path[0] == source and path[-1] == target
+        assert all(G.has_edge(u, v) for u, v in zip(path, path[1:]))
+        assert within == reference_hops(G, path, k=2 if second_hop else 1)
+
+def test_cached_snapshot_sees_added_edges():
+    G = hub_graph()
+    assert query(G, 'n5', 'n1500', use_snapshot=True)[2] > 1
+    G.add_edge('n5', 'n1500')
+    path, within, length = query(G, 'n5', 'n1500', use_snapshot=True)
+    assert length == 1 and path == ['n5', 'n1500']
+    assert within == reference_hops(G, path)
+
+def test_cached_snapshot_sees_removed_edges_and_nodes():
+    G = hub_graph()
+    path, _, _ = query(G, 'n7', 'n1900', use_snapshot=True)
+    G.remove_edge(path[0], path[1])
+    if len(path) > 2:
+        G.remove_node(path[-2])
+    path, within, length = query(G, 'n7', 'n1900', use_snapshot=True)
+    assert length == nx.shortest_path_length(G, 'n7', 'n1900')
+    assert within == reference_hops(G, path)
+
+def test_cached_snapshot_sees_swapped_edges_on_the_path():
+    # One edge removed and another added leaves both counts unchanged
+    G = nx.path_graph(['a', 'b', 'c', 'd', 'e'])
+    G.add_edge('x', 'y')
+    assert query(G, 'a', 'e', use_snapshot=True)[2] == 4
+    G.remove_edge('c', 'd')
+    G.add_edge('c', 'x')
+    with pytest.raises(nx.NetworkXNoPath):
+        query(G, 'a', 'e', use_snapshot=True)
+
+def test_cache_does_not_keep_graphs_alive():
+    G = hub_graph(n=200)
+    gs.get_adjacency_snapshot(G)
+    assert len(gs._adjacency_cache) == 1
+    del G
+    gc.collect()
+    assert len(gs._adjacency_cache) == 0
+
+def test_cache_holds_at_most_a_few_graphs():
+    graphs = [hub_graph(n=100, seed=seed) for seed in range(gs._ADJACENCY_CACHE_SIZE + 2)]
+    for G in graphs:
+        gs.get_adjacency_snapshot(G)
+    assert len(gs._adjacency_cache) == gs._ADJACENCY_CACHE_SIZE
+    assert gs.get_adjacency_snapshot(graphs[-1]) is gs.get_adjacency_snapshot(graphs[-1])
+
+def test_networkx_by_default_and_explicit_snapshot():
+    G = hub_graph()
+    query(G, 'n1', 'n2')
+    assert len(gs._adjacency_cache) == 0
+    snapshot = gs.GraphSnapshot.from_networkx(G, attributes=False)
+    for source, target in random_pairs(G, 1):
+        path, within, length = query(G, source, target, snapshot=snapshot)
+        assert length == nx.shortest_path_length(G, source, target)
+        assert within == reference_hops(G, path)
+    assert len(gs._adjacency_cache) == 0
+
+def test_max_neighbors_caps_the_neighborhood():
+    G = hub_graph()
+    source, target = 'n0', 'n1999'  # n0 is a hub
+    path, full, _ = query(G, source, target, use_snapshot=True)
+    _, capped, _ = query(G, source, target, max_neighbors=5, seed=0)
+    assert set(path) <= capped < full
+    assert query(G, source, target, max_neighbors=5, seed=0)[1] == capped
+
+def test_k_hop_frontier_matches_networkx():
+    G = hub_graph(n=500)
+    snapshot = gs.GraphSnapshot.from_networkx(G, attributes=False)
+    nodes = snapshot.nodes
+    for k in (1, 2, 3):
+        seeds = [snapshot.node_to_index[node] for node in ('n3', 'n250', 'n499')]
+        within = {nodes[i] for i in snapshot.k_hop_indices(seeds, k=k).tolist()}
+        assert within == reference_hops(G, ['n3', 'n250', 'n499'], k=k)
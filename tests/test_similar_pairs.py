@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import GraphReasoning.graph_tools as gt
+
+def near_duplicate_embeddings(n=300, d=16, seed=0):
+    # Groups of near-identical vectors, so there are pairs above a high threshold
+    rng = np.random.default_rng(seed)
+    bases = rng.normal(size=(n // 3, d))
+    vectors = np.repeat(bases, 3, axis=0) + 0.05 * rng.normal(size=(n // 3 * 3, d))
+    return {f'node {i}': vectors[i:i + 1].astype(np.float32) for i in range(len(vectors))}
+
+def dense_pairs(embeddings, threshold):
+    # Reference: the full N x N similarity matrix the original simplify_graph built
+    matrix = np.vstack([v.reshape(1, -1) for v in embeddings.values()]).astype(np.float64)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    similarities = matrix @ matrix.T
+    rows, cols = np.where(similarities > threshold)
+    keep = rows != cols
+    return rows[keep], cols[keep]
+
+@pytest.mark.parametrize('max_block_elements', [2**25, 1000, 1])
+def test_blocked_matches_dense(max_block_elements):
+    embeddings = near_duplicate_embeddings()
+    rows, cols = gt.find_similar_node_pairs(embeddings, 0.95, method='blocked', max_block_elements=max_block_elements)
+    expected_rows, expected_cols = dense_pairs(embeddings, 0.95)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(cols, expected_cols)
+    assert len(rows) > 0
+
+def test_ann_finds_the_dense_pairs():
+    embeddings = near_duplicate_embeddings()
+    from GraphReasoning.embedding_index import IVFIndex
+    index = IVFIndex(n_lists=8, n_probe=8).build(embeddings)  # probing every list makes the join exact
+    rows, cols = gt.find_similar_node_pairs(embeddings, 0.95, method='ann', index=index)
+    expected_rows, expected_cols = dense_pairs(embeddings, 0.95)
+    assert set(zip(rows.tolist(), cols.tolist())) == set(zip(expected_rows.tolist(), expected_cols.tolist()))
+    # row-major order and symmetric, like the dense result
+    assert np.all(np.diff(rows) >= 0)
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        gt.find_similar_node_pairs(near_duplicate_embeddings(n=9), 0.9, method='faiss')
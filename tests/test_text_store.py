@@ -0,0 +1,94 @@
+import os
+
+import networkx as nx
+import pytest
+
+import GraphReasoning.graph_tools as gt
+import GraphReasoning.text_store as ts
+from test_graph_withtext import write_files
+
+@pytest.fixture(autouse=True)
+def fresh_stores(monkeypatch):
+    monkeypatch.setattr(ts, '_text_stores', {})
+
+def texts_graph():
+    G = nx.Graph()
+    G.add_edge('silk', 'protein')
+    G.add_edge('protein', 'bone')
+    shared = 'silk is a protein fibre'
+    G.nodes['silk']['texts'] = [shared]
+    G.nodes['protein']['texts'] = [shared, 'bone contains collagen']
+    G.nodes['bone']['texts'] = ['bone contains collagen']
+    return G
+
+def test_each_text_is_stored_once():
+    store = ts.TextStore(':memory:')
+    keys = store.put_many(['a', 'b', 'a'])
+    assert keys[0] == keys[2] and len(store) == 2
+    assert store.get_many(keys + ['missing']) == ['a', 'b', 'a', None]
+
+def test_externalize_and_internalize_round_trip():
+    G = texts_graph()
+    expected = {node: list(data['texts']) for node, data in G.nodes(data=True)}
+    store = ts.TextStore(':memory:')
+    ts.externalize_texts(G, store)
+    assert len(store) == 2
+    assert all('texts' not in data and 'text_ids' in data for _, data in G.nodes(data=True))
+    assert {node: ts.node_texts(G, node, text_store=store) for node in G.nodes()} == expected
+    ts.internalize_texts(G, store)
+    assert {node: data['texts'] for node, data in G.nodes(data=True)} == expected
+
+def test_store_path_is_absolute_and_found_from_another_directory(tmp_path, monkeypatch):
+    (tmp_path / 'work').mkdir()
+    (tmp_path / 'elsewhere').mkdir()
+    monkeypatch.chdir(tmp_path / 'work')
+    G = ts.externalize_texts(texts_graph(), ts.TextStore('texts.sqlite'))
+    assert G.graph['text_store'] == str(tmp_path / 'work' / 'texts.sqlite')
+    gt.save_graph_with_text_as_JSON(G, data_dir=str(tmp_path), graph_name='graph.graphml')
+
+    # A new session in another working directory, with no store open yet
+    ts._text_stores.clear()
+    monkeypatch.chdir(tmp_path / 'elsewhere')
+    H = gt.load_graph_with_text_as_JSON(data_dir=str(tmp_path), graph_name='graph.graphml')
+    assert ts.node_texts(H, 'bone') == ['bone contains collagen']
+    assert not os.path.exists('texts.sqlite')
+
+def test_graph_with_store_has_the_same_texts(tmp_path):
+    graph_files, chunk_files = write_files(tmp_path, n_files=3)
+    inline = gt.make_graph_from_text_withtext(graph_files, chunk_files)
+    store = ts.TextStore(str(tmp_path / 'texts.sqlite'))
+    external = gt.make_graph_from_text_withtext(graph_files, chunk_files, text_store=store)
+    assert os.path.isabs(external.graph['text_store'])
+    all_texts = {text for _, data in inline.nodes(data=True) for text in data['texts']}
+    assert len(store) == len(all_texts)
+    for node, data in inline.nodes(data=True):
+        assert 'texts' not in external.nodes[node]
+        assert set(ts.node_texts(external, node)) == set(data['texts'])
+
+def test_printing_and_lookup_read_from_the_store(tmp_path, capsys):
+    G = ts.externalize_texts(texts_graph(), ts.TextStore(str(tmp_path / 'texts.sqlite')))
+    gt.print_graph_nodes_with_texts(G, N=200)
+    assert 'Node: bone, Texts: bone contains collagen' in capsys.readouterr().out
+    assert gt.get_text_associated_with_node(G, 'silk') == 'silk is a protein fibre'
+
+def test_missing_store_is_an_error():
+    G = texts_graph()
+    ts.externalize_texts(G, ts.TextStore(':memory:'))
+    with pytest.raises(ValueError):
+        ts.node_texts(G, 'silk')
+
+def test_closed_stores_are_reopened(tmp_path):
+    path = str(tmp_path / 'texts.sqlite')
+    store = ts.TextStore(path)
+    G = ts.externalize_texts(texts_graph(), store)
+    assert ts.get_text_store(path) is store
+    store.close()
+    store.close()  # closing twice is harmless
+    assert ts._text_stores == {}
+    assert ts.node_texts(G, 'bone') == ['bone contains collagen']
+    reopened = ts.get_text_store(path)
+    assert reopened is not store and not reopened.closed
+
+    memory_store = ts.TextStore(':memory:')
+    memory_store.close()
+    assert list(ts._text_stores.values()) == [reopened]
@@ -0,0 +1,46 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+import GraphReasoning.graph_tools as gt
+
+def triplet_frame(n=500, n_nodes=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'node_1': [f'concept {i}' for i in rng.integers(n_nodes, size=n)],
+        'node_2': [f'concept {i}' for i in rng.integers(n_nodes, size=n)],
+        'edge': [f'relation {i}' for i in rng.integers(5, size=n)],
+        'chunk_id': [f'chunk{i}' for i in rng.integers(20, size=n)],
+        'count': 4,
+    })
+
+def reference_graph(dfg):
+    # The original row-by-row construction
+    G = nx.Graph()
+    for node in pd.concat([dfg['node_1'], dfg['node_2']], axis=0).unique():
+        G.add_node(str(node))
+    for _, row in dfg.iterrows():
+        G.add_edge(str(row["node_1"]), str(row["node_2"]), title=row["edge"], weight=row['count'] / 4)
+    return G
+
+def test_bulk_build_matches_row_by_row():
+    dfg = gt.aggregate_triplets(triplet_frame())
+    expected = reference_graph(dfg)
+    G = nx.Graph()
+    G.add_nodes_from(map(str, pd.concat([dfg['node_1'], dfg['node_2']], axis=0).unique()))
+    gt.graph_from_triplets(dfg, G)
+    assert list(G.nodes()) == list(expected.nodes())
+    assert nx.utils.edges_equal(G.edges(data=True), expected.edges(data=True))
+    for u, v, data in G.edges(data=True):
+        assert data == expected[u][v]
+
+def test_aggregation_joins_and_sums():
+    df = pd.DataFrame({'node_1': ['a', 'a', 'b'], 'node_2': ['b', 'b', 'c'], 'edge': ['x', 'y', 'z'],
+                       'chunk_id': ['c1', 'c2', 'c3'], 'count': [4, 4, 1]})
+    dfg = gt.aggregate_triplets(df)
+    row = dfg[(dfg.node_1 == 'a') & (dfg.node_2 == 'b')].iloc[0]
+    assert row['edge'] == 'x,y' and row['chunk_id'] == 'c1,c2' and row['count'] == 8
+
+def test_include_chunk_id():
+    G = gt.graph_from_triplets(gt.aggregate_triplets(triplet_frame(n=50)), include_chunk_id=True)
+    assert all('chunk_id' in data for _, _, data in G.edges(data=True))